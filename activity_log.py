@@ -0,0 +1,126 @@
+import bisect
+import datetime
+import json
+import os
+import threading
+
+import instrumentation
+
+class ActivityLogIndex:
+    """
+    Read side of the append-only activity log (one JSON entry per line, oldest first).
+    Keeps a time index and a per-user index over entry positions, and picks up lines
+    appended by any process on the next refresh() without re-reading the whole file.
+    One index serves every thread of the process; its lock keeps refreshes and queries apart.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.entries = []
+        self._timestamps = []  # epoch seconds per position; entries are appended in time order
+        self._by_user = {}  # user name -> ascending positions
+        self._offset = 0
+
+    @instrumentation.timed(name="ActivityLogIndex.refresh")
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.file_path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if size < self._offset:
+            self._reset()  # File was replaced or truncated
+        if size == self._offset:
+            return
+        with open(self.file_path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        instrumentation.count_read(len(chunk))
+        complete = chunk.rfind(b'\n') + 1  # Leave a partially written last line for the next refresh
+        for line in chunk[:complete].splitlines():
+            if line.strip():
+                self._add(json.loads(line))
+        self._offset += complete
+
+    def _add(self, entry):
+        """Indexes one entry. Call under the lock."""
+        # Workflow events written here by older versions carry whole records; only the log fields are kept.
+        entry = {'timestamp': entry.get('timestamp'), 'user': entry.get('user'), 'action': entry.get('action')}
+        timestamp = entry['timestamp']
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.datetime.fromisoformat(timestamp)
+            except ValueError:
+                timestamp = None
+        entry['timestamp'] = timestamp
+        position = len(self.entries)
+        self.entries.append(entry)
+        previous = self._timestamps[-1] if self._timestamps else float('-inf')
+        self._timestamps.append(max(timestamp.timestamp(), previous) if timestamp else previous)
+        self._by_user.setdefault(entry.get('user'), []).append(position)
+
+    def newest_first(self):
+        """Every entry, newest first."""
+        with self._lock:
+            self._refresh()
+            return self.entries[::-1]
+
+    def users(self):
+        with self._lock:
+            return sorted(user for user in self._by_user if user)
+
+    def _candidates(self, user, start, end):
+        """Returns the ascending positions matching the user and time filters."""
+        low = bisect.bisect_left(self._timestamps, start.timestamp()) if start else 0
+        high = bisect.bisect_right(self._timestamps, end.timestamp()) if end else len(self.entries)
+        if user is None:
+            return range(low, high)
+        positions = self._by_user.get(user, [])
+        return positions[bisect.bisect_left(positions, low):bisect.bisect_left(positions, high)]
+
+    def query(self, user=None, start=None, end=None, text=None, cursor=None, limit=25):
+        """
+        Returns one page of entries, newest first, as
+        {'entries': [...], 'next_cursor': str or None, 'prev_cursor': str or None}.
+        Pass next_cursor back to get older entries and prev_cursor to get newer ones.
+        """
+        with self._lock:
+            self._refresh()
+            return self._query(user, start, end, text, cursor, limit)
+
+    def _query(self, user, start, end, text, cursor, limit):
+        candidates = self._candidates(user, start, end)
+        needle = text.lower().strip() if text else ''
+
+        def matches(position):
+            entry = self.entries[position]
+            return not needle or needle in f"{entry.get('user', '')} {entry.get('action', '')}".lower()
+
+        direction, _, anchor = (cursor or 'before:').partition(':')
+        anchor = int(anchor) if anchor else len(self.entries)
+        if direction == 'after':
+            # Walk forward from the anchor to collect newer entries, then present them newest first.
+            newer = (p for p in candidates[bisect.bisect_right(candidates, anchor):] if matches(p))
+            page = [p for _, p in zip(range(limit + 1), newer)]
+            has_newer = len(page) > limit
+            page = page[:limit][::-1]
+            has_older = bool(page)  # The anchor entry itself is older
+        else:
+            older = (p for p in reversed(candidates[:bisect.bisect_left(candidates, anchor)]) if matches(p))
+            page = [p for _, p in zip(range(limit + 1), older)]
+            has_older = len(page) > limit
+            page = page[:limit]
+            has_newer = cursor is not None and bool(page)
+        return {
+            'entries': [self.entries[p] for p in page],
+            'next_cursor': f"before:{page[-1]}" if page and has_older else None,
+            'prev_cursor': f"after:{page[0]}" if page and has_newer else None,
+        }
@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Columns of the analytics frame, by storage type. Free text stays as Python strings; everything
+# the dashboard, forecast and reports compute on is a typed NumPy array.
+ID_COLUMNS = ('id',)
+CATEGORICAL_COLUMNS = ('user', 'category', 'status')
+TEXT_COLUMNS = ('description', 'transaction_id')
+AMOUNT_COLUMNS = ('amount',)
+DATETIME_COLUMNS = ('submitted_at', 'reimbursed_at')  # int64 nanoseconds since the epoch
+COLUMNS = ID_COLUMNS + CATEGORICAL_COLUMNS + TEXT_COLUMNS + AMOUNT_COLUMNS + DATETIME_COLUMNS
+NAT = np.datetime64('NaT', 'ns').astype(np.int64)
+
+def _to_ns(value):
+    """Nanoseconds since the epoch for an ISO string or datetime; NAT when missing or unparseable."""
+    if value is None or value == '':
+        return NAT
+    try:
+        return int(np.datetime64(value, 'ns').astype(np.int64))
+    except (ValueError, TypeError):
+        return NAT
+
+def _to_amount(value):
+    """Like pd.to_numeric(errors='coerce').fillna(0) for one value."""
+    try:
+        amount = float(value)
+    except (ValueError, TypeError):
+        return 0.0
+    return amount if amount == amount else 0.0
+
+def _codes_dtype(category_count):
+    """The integer type pandas keeps category codes in, so Categorical.from_codes does not copy."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if category_count < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+class ExpenseColumns:
+    """
+    Columnar copy of a list of expense records for the analytics paths: int64 ids, float64
+    amounts, int64 nanosecond timestamps, category codes for user/category/status and object
+    arrays for free text, built once instead of on every render.
+
+    sync() converts only the records that are new or were replaced since the last call; the
+    event store replaces a record on every change, so object identity tells what changed.
+    frame() wraps the current arrays in a DataFrame without copying them. The arrays are
+    read-only and never modified once handed out (an update builds new ones), so a frame
+    keeps showing the data it was made from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = []  # The record object each row was converted from
+        self._ids = []
+        self._categories = {name: {} for name in CATEGORICAL_COLUMNS}  # value -> code, in first-seen order
+        self._columns = self._convert([])
+
+    def _code(self, name, value):
+        if value is None:
+            return -1
+        codes = self._categories[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def _convert(self, records):
+        """Column arrays for the records, in order."""
+        n = len(records)
+        columns = {
+            'id': np.fromiter((r['id'] for r in records), np.int64, n),
+            'amount': np.fromiter((_to_amount(r.get('amount')) for r in records), np.float64, n),
+        }
+        for name in CATEGORICAL_COLUMNS:
+            columns[name] = np.fromiter((self._code(name, r.get(name)) for r in records), np.int64, n)
+        for name in TEXT_COLUMNS:
+            values = np.empty(n, dtype=object)
+            values[:] = [r.get(name) for r in records]
+            columns[name] = values
+        for name in DATETIME_COLUMNS:
+            columns[name] = np.fromiter((_to_ns(r.get(name)) for r in records), np.int64, n)
+        return columns
+
+    def _finish(self, columns):
+        """Narrows category codes to the type pandas expects and freezes every array."""
+        for name in CATEGORICAL_COLUMNS:
+            columns[name] = columns[name].astype(_codes_dtype(len(self._categories[name])), copy=False)
+        for values in columns.values():
+            values.flags.writeable = False
+        return columns
+
+    def sync(self, records):
+        """Brings the columns up to date with `records` (the full, ordered list) and returns self."""
+        with self._lock:
+            n = len(self._sources)
+            ids = [r['id'] for r in records]
+            if len(records) < n or ids[:n] != self._ids:
+                columns = self._finish(self._convert(records))  # Rows removed or reordered: start over
+            else:
+                changed = [i for i in range(n) if records[i] is not self._sources[i]]
+                added = records[n:]
+                if not changed and not added:
+                    return self
+                columns = dict(self._columns)
+                if changed:
+                    patch = self._convert([records[i] for i in changed])
+                    rows = np.array(changed)
+                    for name, values in patch.items():
+                        columns[name] = np.array(columns[name], dtype=np.result_type(columns[name], values))
+                        columns[name][rows] = values
+                if added:
+                    extra = self._convert(added)
+                    columns = {name: np.concatenate([columns[name], extra[name]]) for name in columns}
+                columns = self._finish(columns)
+            self._columns, self._sources, self._ids = columns, list(records), ids
+        return self
+
+    def frame(self):
+        """The records as a typed DataFrame over the current arrays. Read-only: copy before changing it."""
+        with self._lock:
+            columns = self._columns
+            categories = {name: list(codes) for name, codes in self._categories.items()}
+        data = {}
+        for name in COLUMNS:
+            values = columns[name]
+            if name in CATEGORICAL_COLUMNS:
+                values = pd.Categorical.from_codes(values, categories=categories[name], validate=False)
+            elif name in DATETIME_COLUMNS:
+                values = values.view('datetime64[ns]')
+            data[name] = values
+        return pd.DataFrame(data, copy=False)
@@ -1,12 +1,11 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import mock_api as api
+import instrumentation
 from ui_components import render_expense_card
-import ocr_processor
-import report_generator
-import predictions 
 import datetime
+import os
+# pandas, plotly, predictions (scikit-learn), ocr_processor (pytesseract), report_generator (fpdf) and the
+# modules built on them are imported inside the pages that use them, so login and list pages never load them.
 
 # Initialize database and page config
 api.setup_database()
@@ -17,6 +16,21 @@ def load_css(file_name):
         st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 load_css("styles.css")
 
+ACTIVITY_LOG_PAGE_SIZE = 25
+REPORT_POLL_SECONDS = 1.0
+CHANGE_POLL_SECONDS = 5.0  # How often an idle page checks the change feed for other sessions' writes
+# The collections each page shows (the header's pending badge counts expenses and advances). Idle
+# sessions on these pages redraw when another session changes one; form pages are left alone.
+PAGE_FEEDS = {
+    "Dashboard": ("expenses", "advances"),
+    "My Submitted Expenses": ("expenses", "advances", "comments"),
+    "Manage Approvals": ("expenses", "advances", "comments"),
+    "My Approvals": ("expenses", "advances", "comments"),
+    "Approve Advances": ("expenses", "advances"),
+    "My Advances": ("expenses", "advances"),
+    "Activity Log": ("expenses", "advances", "activity_log"),
+}
+
 # --- State Management ---
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
@@ -24,6 +38,9 @@ if 'logged_in' not in st.session_state:
 def main():
     if not st.session_state.logged_in:
         display_login_form()
+    elif st.session_state.get('profile_reruns'):
+        with instrumentation.profile_rerun(on_finish=save_profile):
+            display_main_app()
     else:
         display_main_app()
 
@@ -50,9 +67,14 @@ def display_login_form():
 
 def display_main_app():
     user = st.session_state.user_info
-    current_event = api.get_events_for_user(user)[0]
+    events = api.get_events_for_user(user)
+    current_event = events[0]
 
     with st.sidebar:
+        if len(events) > 1:
+            names = {e['id']: e['name'] for e in events}
+            event_id = st.selectbox("Event", list(names), format_func=names.get, key="current_event_id")
+            current_event = next(e for e in events if e['id'] == event_id)
         st.title(f"💸 {current_event['name']}")
         st.write(f"Welcome, **{user['name']}**")
         st.caption(f"Role: {user['role'].replace('_', ' ').title()}")
@@ -83,40 +105,121 @@ def display_main_app():
                 del st.session_state[key]
             st.rerun()
 
+        if user['role'] == 'treasurer':
+            st.toggle("⏱️ Profile reruns", key="profile_reruns", help="Times storage, OCR, charts, reports and page renders on every rerun of this session.")
+            if st.session_state.profile_reruns:
+                st.checkbox(f"Append to {instrumentation.METRICS_FILE}", key="export_profiles")
+
+    profile = instrumentation.active()
+    if profile:
+        profile.label = page
+    if page in PAGE_FEEDS:
+        st.session_state.feed_seen = None  # Recorded by this run's watch_changes
+        watch_changes(PAGE_FEEDS[page])
+
     title, notif_area = st.columns([4, 1])
     with title:
         st.header(page)
     with notif_area:
-        pending_count = len(api.get_pending_requests(user['role']))
+        pending_count = sum(api.get_pending_counts(user['role'], current_event['id']).values())
         if pending_count > 0:
             st.success(f"**Action Required!**\nYou have **{pending_count}** request(s) waiting.", icon="🔔")
 
-    if page == "Dashboard":
-        render_dashboard(current_event)
-    elif page == "Submit Expense":
-        render_submit_expense_form(current_event, user)
-    elif page == "My Submitted Expenses":
-        render_expense_list(user, my_expenses=True)
-    elif page == "Manage Approvals":
-        render_expense_list(user, my_expenses=False)
-    elif page == "My Approvals":
-        render_my_approvals(user)  # <-- New handler function
-    elif page == "Generate Report":
-        render_report_page(current_event)
-    elif page == "Approve Advances":
-        render_advances_for_approval(user)
-    elif page == "Request Advance":
-        render_request_advance_form(current_event, user)
-    elif page == "My Advances":
-        render_advance_list(user)
-    elif page == "Activity Log":
-        render_activity_log_page()
-    elif page == "Edit My UPI ID":  # ✅ NEW PAGE ROUTE
-        render_upi_editor_student(user)
-
-def render_advances_for_approval(user):
+    if profile:
+        render_profile_panel()
+
+    with instrumentation.span(f"page: {page}"):
+        if page == "Dashboard":
+            render_dashboard(current_event)
+        elif page == "Submit Expense":
+            render_submit_expense_form(current_event, user)
+        elif page == "My Submitted Expenses":
+            render_expense_list(current_event, user, my_expenses=True)
+        elif page == "Manage Approvals":
+            render_expense_list(current_event, user, my_expenses=False)
+        elif page == "My Approvals":
+            render_my_approvals(current_event, user)  # <-- New handler function
+        elif page == "Generate Report":
+            render_report_page(current_event, events)
+        elif page == "Approve Advances":
+            render_advances_for_approval(current_event, user)
+        elif page == "Request Advance":
+            render_request_advance_form(current_event, user)
+        elif page == "My Advances":
+            render_advance_list(current_event, user)
+        elif page == "Activity Log":
+            render_activity_log_page()
+        elif page == "Edit My UPI ID":  # ✅ NEW PAGE ROUTE
+            render_upi_editor_student(user)
+
+# --- Change Feed ---
+def cached_view(key, collections, load, inputs=None):
+    """
+    load()'s result, kept in this session until one of `collections` moves in the change feed or
+    `inputs` changes, so reruns that only touch widgets skip the reload. Treat it as read-only.
+    """
+    versions = api.get_versions()
+    stamp = (tuple(versions[c] for c in collections), inputs)
+    views = st.session_state.setdefault('views', {})
+    view = views.get(key)
+    if view is None or view[0] != stamp:
+        view = views[key] = (stamp, load())
+    return view[1]
+
+def cached_threads(collection, parent_ids):
+    """api.get_comments for the records on screen, reloaded only when comments change or the records do."""
+    return cached_view(("threads", collection), ("comments",), lambda: api.get_comments(collection, parent_ids), tuple(parent_ids))
+
+@st.fragment(run_every=CHANGE_POLL_SECONDS)
+def watch_changes(collections):
+    """
+    Polls the change feed and redraws the page as soon as another session changes what it shows.
+    Inside a full run it only records the versions: rerunning there would drop the click that
+    started the run.
+    """
+    versions = api.get_versions()
+    seen = st.session_state.feed_seen
+    if seen is None:
+        st.session_state.feed_seen = versions
+    elif any(versions[c] != seen[c] for c in collections):
+        st.rerun()
+
+# --- Rerun Profiling (treasurer, opt-in) ---
+def save_profile(profile):
+    """Keeps the finished rerun's profile for the panel and, if asked, appends it to the metrics file."""
+    data = profile.to_dict()
+    history = st.session_state.setdefault('profile_history', [])
+    history.append(data)
+    del history[:-instrumentation.PROFILE_HISTORY_SIZE]
+    if st.session_state.get('export_profiles'):
+        instrumentation.export({**data, "user": st.session_state.user_info['username']})
+
+def render_profile_panel():
+    """Shows the previous rerun's profile; the current one is only complete once this rerun ends."""
+    history = st.session_state.get('profile_history')
+    with st.expander("⏱️ Rerun profile", expanded=False):
+        if not history:
+            st.caption("Timings appear from the next rerun on.")
+            return
+        last = history[-1]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(f"Previous rerun ({last['label']})", f"{last['wall_s'] * 1000:,.0f} ms")
+        col2.metric("Instrumented calls", f"{sum(c['count'] for c in last['calls'].values()):,}")
+        col3.metric("Read from storage", f"{last['bytes_read'] / 1024:,.1f} KB")
+        col4.metric("Written to storage", f"{last['bytes_written'] / 1024:,.1f} KB")
+        st.caption("Calls nest, so a function's total includes the instrumented calls it makes.")
+        st.dataframe([{"function": name, "calls": c['count'], "total ms": round(c['total_s'] * 1000, 2),
+                       "max ms": round(c['max_s'] * 1000, 2)} for name, c in last['calls'].items()],
+                     hide_index=True, use_container_width=True)
+        st.caption("Recent reruns")
+        st.dataframe([{"page": h['label'], "wall ms": round(h['wall_s'] * 1000, 1), "read KB": round(h['bytes_read'] / 1024, 1),
+                       "written KB": round(h['bytes_written'] / 1024, 1)} for h in reversed(history)],
+                     hide_index=True, use_container_width=True)
+
+def render_advances_for_approval(event, user):
     st.subheader("Approve Advance Requests")
-    all_advances = api.load_data("db_advances.json")
+    show_bulk_results()
+    all_advances = cached_view(("advances", event['id']), ("advances",), lambda: api.get_advances(event['id']))
 
     # Filter for pending advances team_lead or treasurer need to act on
     shown = []
@@ -131,6 +234,7 @@ def render_advances_for_approval(user):
         return
 
     shown.sort(key=lambda a: a['id'], reverse=True)
+    render_bulk_advance_actions(shown, user)
 
     for adv in shown:
         with st.container(border=True):
@@ -146,17 +250,12 @@ def render_advances_for_approval(user):
                 approve_col, reject_col = st.columns(2)
                 with approve_col:
                     if st.button("Approve", key=f"a{adv['id']}"):
-                        adv['status'] = "Approved by Team Lead"
-                        adv['approved_by'] = user['name']
-                        api.save_data("db_advances.json", all_advances)
-                        api.log_activity(user['name'], f"approved advance #{adv['id']}")
+                        api.approve_advance(adv['id'], user)
                         st.success("Approved.")
                         st.rerun()
                 with reject_col:
                     if st.button("Reject", key=f"r{adv['id']}"):
-                        adv['status'] = "Rejected"
-                        api.save_data("db_advances.json", all_advances)
-                        api.log_activity(user['name'], f"rejected advance #{adv['id']}")
+                        api.reject_advance(adv['id'], user)
                         st.warning("Rejected.")
                         st.rerun()
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -168,12 +267,7 @@ def render_advances_for_approval(user):
                     if not txn_id:
                         st.warning("Please provide a transaction ID.")
                     else:
-                        adv['status'] = "Paid"
-                        adv['paid_txn_id'] = txn_id
-                        adv['paid_time'] = datetime.datetime.now().isoformat()
-                        adv['paid_by'] = user['name']       # <--- Save who paid!
-                        api.save_data("db_advances.json", all_advances)
-                        api.log_activity(user['name'], f"marked advance #{adv['id']} as paid (txn: {txn_id})")
+                        api.pay_advance(adv['id'], user, txn_id)
                         st.success("Marked as Paid.")
                         st.rerun()
 
@@ -193,9 +287,9 @@ def render_request_advance_form(event, user):
                 api.add_advance_request(user, event['id'], vendor, purpose, amount, quote_file)
                 st.success("Advance request submitted.")
 
-def render_advance_list(user):
+def render_advance_list(event, user):
     st.subheader("My Advance Requests")
-    advances = api.get_advances_for_user(user['username'])
+    advances = cached_view(("my_advances", event['id']), ("advances",), lambda: api.get_advances_for_user(user['username'], event['id']))
 
     if not advances:
         st.info("You have not submitted any advance requests yet.")
@@ -233,11 +327,12 @@ def suggest_category(ocr_text):
             return category
     return "Miscellaneous"
 
-def render_my_approvals(user):
+def render_my_approvals(event, user):
     st.header("My Approvals")
 
     # Expenses (as before)
-    all_expenses = api.parse_datetimes(api.load_data(api.EXPENSES_FILE))
+    all_expenses = cached_view(("all_expenses", event['id']), ("expenses",),
+                               lambda: api.parse_datetimes(api.get_expenses(event['id'], include_archived=True)))
     approvals = []
     for expense in all_expenses:
         for step in expense.get('approvals', []):
@@ -254,11 +349,12 @@ def render_my_approvals(user):
         approvals.sort(key=lambda x: x['submitted_at'], reverse=True)
         def on_update_exp():
             st.rerun()
+        threads = cached_threads("expenses", [e['id'] for e in approvals])
         for expense in approvals:
-            render_expense_card(expense, user, on_update_exp)
+            render_expense_card(expense, user, on_update_exp, threads[expense['id']])
 
     # Advances
-    all_advances = api.load_data("db_advances.json")
+    all_advances = cached_view(("all_advances", event['id']), ("advances",), lambda: api.get_advances(event['id'], include_archived=True))
     st.subheader("Advance Requests You've Approved")
 
     if user['role'] == "team_lead":
@@ -269,8 +365,9 @@ def render_my_approvals(user):
         advances_to_show = []
 
     from ui_components import render_advance_card
+    threads = cached_threads("advances", [a['id'] for a in advances_to_show])
     for adv in advances_to_show:
-        render_advance_card(adv)
+        render_advance_card(adv, comments=threads[adv['id']])
 
 def render_upi_editor_student(user):
     st.subheader("Edit Your UPI ID")
@@ -293,25 +390,16 @@ def render_upi_editor_student(user):
             st.success("Your UPI ID has been updated successfully.")
 
 def render_dashboard(event):
+    import chart_data
+    import plotly.express as px
+    import predictions
     st.markdown("A real-time overview of the event's financial health and activity.")
     st.divider()
 
-    all_expenses_raw = api.load_data(api.EXPENSES_FILE)
-    if not all_expenses_raw:
+    df = cached_view(("dashboard", event['id']), ("expenses",), lambda: build_expense_frame(event))
+    if df is None:
         st.info("No expenses have been submitted yet. The dashboard will populate as data comes in.")
         return
-    
-    all_expenses = api.parse_datetimes(all_expenses_raw)
-    df = pd.DataFrame(all_expenses)
-
-    # --- THE MAIN DATAFRAME CLEANING STEP ---
-    # 1. Force conversion to datetime, turning any errors into 'NaT' (Not a Time)
-    df['submitted_at'] = pd.to_datetime(df['submitted_at'], errors='coerce')
-    # 2. Force 'amount' to numeric, turning errors into 0
-    df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0)
-    # 3. Drop any rows where the date conversion failed
-    df.dropna(subset=['submitted_at'], inplace=True)
-    # --- END OF CLEANING ---
 
     # --- Financial Overview KPIs ---
     st.subheader("Financial Overview")
@@ -345,32 +433,58 @@ def render_dashboard(event):
     with col1:
         st.subheader("Spending by Category (Approved)")
         if total_spent > 0:
-            category_spend = df[df['status'].isin(['Approved', 'Reimbursed'])].groupby('category')['amount'].sum()
-            fig_pie = px.pie(category_spend, values='amount', names=category_spend.index, hole=0.4)
-            fig_pie.update_layout(showlegend=True, margin=dict(l=10, r=10, t=10, b=10))
+            category_spend = df[df['status'].isin(['Approved', 'Reimbursed'])].groupby('category', observed=True)['amount'].sum()
+            fig_pie = chart_data.cached_figure(chart_data.fingerprint('category_pie', category_spend), lambda: build_category_pie(category_spend))
             st.plotly_chart(fig_pie, use_container_width=True)
         else:
             st.info("No approved spending yet.")
 
         st.subheader("Top Spenders (by total amount submitted)")
-        user_spend = df.groupby('user')['amount'].sum().sort_values(ascending=True).tail(5)
-        fig_bar_h = px.bar(user_spend, x='amount', y=user_spend.index, orientation='h', labels={'amount': 'Total Amount (₹)', 'y': 'User'})
-        fig_bar_h.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+        user_spend = df.groupby('user', observed=True)['amount'].sum().sort_values(ascending=True).tail(5)
+        fig_bar_h = chart_data.cached_figure(chart_data.fingerprint('top_spenders', user_spend), lambda: build_top_spenders_bar(user_spend))
         st.plotly_chart(fig_bar_h, use_container_width=True)
 
     with col2:
         st.subheader("Expense Workflow Status")
         status_counts = df['status'].value_counts()
-        fig_bar = px.bar(status_counts, x=status_counts.index, y=status_counts.values, labels={'x': 'Status', 'y': 'Number of Expenses'})
+        status_counts = status_counts[status_counts > 0]  # Categorical counts include statuses no expense has now
+        fig_bar = chart_data.cached_figure(
+            chart_data.fingerprint('status_counts', status_counts),
+            lambda: px.bar(status_counts, x=status_counts.index, y=status_counts.values, labels={'x': 'Status', 'y': 'Number of Expenses'}))
         st.plotly_chart(fig_bar, use_container_width=True)
         
         st.subheader("Average Expense Amount per Category")
         if not df.empty:
-            avg_cat_spend = df.groupby('category')['amount'].mean().sort_values(ascending=False).reset_index()
-            fig_funnel = px.funnel(avg_cat_spend, x='amount', y='category', labels={'amount': 'Average Amount (₹)', 'category': 'Category'})
+            avg_cat_spend = df.groupby('category', observed=True)['amount'].mean().sort_values(ascending=False).reset_index()
+            fig_funnel = chart_data.cached_figure(
+                chart_data.fingerprint('category_average', avg_cat_spend),
+                lambda: px.funnel(avg_cat_spend, x='amount', y='category', labels={'amount': 'Average Amount (₹)', 'category': 'Category'}))
             st.plotly_chart(fig_funnel, use_container_width=True)
 
+def build_expense_frame(event):
+    """The dashboard's expense DataFrame, or None when nothing has been submitted yet."""
+    with instrumentation.span("dashboard: build DataFrame"):
+        # Already typed: unparseable dates are NaT and unparseable amounts 0 (see analytics_store.py).
+        df = api.get_expense_frame(event['id'])
+        if df.empty:
+            return None
+        # Drop any rows where the date conversion failed
+        return df[df['submitted_at'].notna()]
+
+def build_category_pie(category_spend):
+    import plotly.express as px
+    fig = px.pie(category_spend, values='amount', names=category_spend.index, hole=0.4)
+    fig.update_layout(showlegend=True, margin=dict(l=10, r=10, t=10, b=10))
+    return fig
+
+def build_top_spenders_bar(user_spend):
+    import plotly.express as px
+    fig = px.bar(user_spend, x='amount', y=user_spend.index, orientation='h', labels={'amount': 'Total Amount (₹)', 'y': 'User'})
+    fig.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+    return fig
+
 def render_submit_expense_form(event, user):
+    import ocr_processor
     st.subheader("Upload a receipt to auto-scan details")
     receipt_file = st.file_uploader("Upload Receipt", type=["png", "jpg", "jpeg","webp"], label_visibility="collapsed")
     if 'ocr_amount' not in st.session_state: st.session_state.ocr_amount = 0.0
@@ -399,32 +513,37 @@ def render_submit_expense_form(event, user):
             if not receipt_file: st.error("A receipt upload is mandatory.")
             elif not description: st.warning("Please provide a description.")
             else:
-                api.add_expense(event['id'], user, amount, category, description, receipt_file)
+                api.add_expense(event['id'], user, amount, category, description, receipt_file, st.session_state.get('ocr_text', ''))
                 st.success("Expense submitted for Team Lead approval!")
                 st.session_state.ocr_amount = 0.0
 
-def render_expense_list(user, my_expenses=False):
+def render_expense_list(event, user, my_expenses=False):
     if my_expenses:
         st.caption("Track the status of all expenses you have submitted.")
-        expense_list = api.get_expenses_for_user(user['username'])
+        expense_list = cached_view(("my_expenses", event['id']), ("expenses",), lambda: api.get_expenses_for_user(user['username'], event['id']))
     else:
         st.caption("Review and action expenses waiting for your attention.")
-        expense_list = api.get_pending_requests(user['role'])
+        show_bulk_results()
+        expense_list = cached_view(("pending_expenses", event['id']), ("expenses",), lambda: api.get_pending_requests(user['role'], event['id']))
 
     if not expense_list:
         st.info("No expenses found.")
         return
 
     # -------- FILTER UI --------
-    description_query = st.text_input("🔍 Search Description...")
+    description_query = st.text_input("🔍 Search descriptions, comments and receipt text...")
     statuses = sorted(list(set(e['status'] for e in expense_list)))
     selected_statuses = st.multiselect("Filter by Status:", statuses, default=statuses)
     amounts = [e['amount'] for e in expense_list]
     amt_min, amt_max = st.slider("Filter by Amount", 0.0, max(amounts + [0]), (0.0, max(amounts + [0])), step=0.5)
     # -------- FILTERING --------
+    # Search is answered by the full-text index; rank holds the position of each hit.
+    rank = None
+    if description_query.strip():
+        rank = {expense_id: i for i, expense_id in enumerate(api.search_expenses(description_query, event_id=event['id']))}
     filtered_expenses = []
     for e in expense_list:
-        if description_query.lower() not in e['description'].lower():
+        if rank is not None and e['id'] not in rank:
             continue
         if e['status'] not in selected_statuses:
             continue
@@ -436,19 +555,122 @@ def render_expense_list(user, my_expenses=False):
         st.warning("No matching results found.")
         return
 
-    filtered_expenses.sort(key=lambda x: x['submitted_at'], reverse=True)
+    if rank is not None:
+        filtered_expenses.sort(key=lambda x: rank[x['id']])
+    else:
+        filtered_expenses.sort(key=lambda x: x['submitted_at'], reverse=True)
+
+    if not my_expenses:
+        render_bulk_expense_actions(filtered_expenses, user)
 
     def on_update(): st.rerun()
+    threads = cached_threads("expenses", [e['id'] for e in filtered_expenses])
     for e in filtered_expenses:
-        render_expense_card(e, user, on_update)
+        render_expense_card(e, user, on_update, threads[e['id']])
+
+# --- Bulk Actions ---
+def show_bulk_results():
+    """Shows the outcome of the last bulk action, which survives the rerun that refreshes the list."""
+    summary = st.session_state.pop('bulk_results', None)
+    if not summary:
+        return
+    verb, results = summary
+    done = [r['id'] for r in results if r['ok']]
+    if done:
+        st.success(f"{verb} {len(done)} request(s): " + ", ".join(f"#{i}" for i in done))
+    for r in results:
+        if not r['ok']:
+            st.warning(f"#{r['id']} skipped: {r['error']}")
+
+def finish_bulk_action(verb, results):
+    st.session_state.bulk_results = (verb, results)
+    st.rerun()
+
+def render_bulk_selection(form_key, items, label):
+    """Multi-select of item ids inside a form, with a select-all toggle outside it."""
+    select_all = st.checkbox("Select all", key=f"{form_key}_all")
+    return st.multiselect(label, list(items), default=list(items) if select_all else [],
+                          format_func=lambda item_id: items[item_id], key=f"{form_key}_ids")
+
+def render_reimbursement_editor(form_key, rows, on_submit, submit_label):
+    """Editable table of id/details/transaction id; submits every row that has a transaction id."""
+    import pandas as pd
+    with st.form(form_key):
+        edited = st.data_editor(
+            pd.DataFrame(rows, columns=["id", "details", "amount", "transaction_id"]),
+            disabled=["id", "details", "amount"], hide_index=True, use_container_width=True, key=f"{form_key}_table")
+        if st.form_submit_button(submit_label, use_container_width=True):
+            filled = edited[edited['transaction_id'].fillna('').str.strip() != '']
+            if filled.empty:
+                st.warning("Enter a transaction ID for at least one row.")
+            else:
+                on_submit({int(row.id): row.transaction_id.strip() for row in filled.itertuples()})
+
+def render_bulk_expense_actions(expenses, user):
+    actionable = {e['id']: f"#{e['id']} · {e['description']} · ₹{e['amount']:.2f}" for e in expenses
+                  if e['status'].startswith("Pending")
+                  and any(step['role'] == user['role'] and not step['approved'] for step in e.get('approvals', []))}
+    reimbursable = [e for e in expenses if e['status'] == 'Approved' and user['role'] == 'treasurer']
+    if not actionable and not reimbursable:
+        return
+    with st.expander("☑️ Bulk actions"):
+        if actionable:
+            selected = render_bulk_selection("bulk_exp", actionable, "Expenses to approve or reject")
+            with st.form("bulk_exp_form"):
+                reason = st.text_input("Reason for rejection (required to reject)")
+                approve_col, reject_col = st.columns(2)
+                approve = approve_col.form_submit_button("✅ Approve selected", use_container_width=True)
+                reject = reject_col.form_submit_button("❌ Reject selected", use_container_width=True)
+                if (approve or reject) and not selected:
+                    st.warning("Select at least one expense.")
+                elif approve:
+                    finish_bulk_action("Approved", api.approve_expenses(selected, user))
+                elif reject:
+                    if not reason.strip():
+                        st.warning("You must provide a reason to reject.")
+                    else:
+                        finish_bulk_action("Rejected", api.reject_expenses(selected, user, reason.strip()))
+        if reimbursable:
+            st.markdown("**Reimburse approved expenses**")
+            rows = [[e['id'], e['description'], e['amount'], ""] for e in reimbursable]
+            render_reimbursement_editor("bulk_reimburse_form", rows,
+                                        lambda txns: finish_bulk_action("Reimbursed", api.reimburse_expenses(txns, user)),
+                                        "💸 Reimburse rows with a transaction ID")
+
+def render_bulk_advance_actions(advances, user):
+    with st.expander("☑️ Bulk actions"):
+        if user['role'] == "team_lead":
+            items = {a['id']: f"#{a['id']} · {a['vendor']} · ₹{a['amount']:.2f}" for a in advances if a['status'] == "Pending"}
+            selected = render_bulk_selection("bulk_adv", items, "Advances to approve or reject")
+            with st.form("bulk_adv_form"):
+                reason = st.text_input("Reason for rejection (optional)")
+                approve_col, reject_col = st.columns(2)
+                approve = approve_col.form_submit_button("✅ Approve selected", use_container_width=True)
+                reject = reject_col.form_submit_button("❌ Reject selected", use_container_width=True)
+                if (approve or reject) and not selected:
+                    st.warning("Select at least one advance.")
+                elif approve:
+                    finish_bulk_action("Approved", api.approve_advances(selected, user))
+                elif reject:
+                    finish_bulk_action("Rejected", api.reject_advances(selected, user, reason.strip() or None))
+        elif user['role'] == "treasurer":
+            rows = [[a['id'], f"{a['vendor']} — {a['purpose']}", a['amount'], ""] for a in advances if a['status'] == "Approved by Team Lead"]
+            render_reimbursement_editor("bulk_pay_form", rows,
+                                        lambda txns: finish_bulk_action("Paid", api.pay_advances(txns, user)),
+                                        "💸 Mark rows with a transaction ID as paid")
+
+def render_report_page(event, events):
+    import report_jobs
+    scope = "This event"
+    if len(events) > 1:
+        scope = st.radio("Report scope", ["This event", "All events (consolidated)"], horizontal=True)
+    if scope != "This event":
+        render_consolidated_report(events)
+        return
 
-def render_report_page(event):
     st.info("Generate a final, consolidated report for all reimbursed expenses.")
 
-    expenses_df_raw = api.parse_datetimes(api.load_data(api.EXPENSES_FILE))
-    expenses_df = pd.DataFrame(expenses_df_raw)
-    
-    reimbursed_df = expenses_df[expenses_df['status'] == 'Reimbursed'].copy()
+    reimbursed_df = api.get_reimbursed_frame(event['id'])
 
     if reimbursed_df.empty:
         st.warning("There are no reimbursed expenses to report on yet.")
@@ -458,21 +680,14 @@ def render_report_page(event):
 
     with col1:
         if st.button("⬇️ Generate PDF Report", use_container_width=True):
-            with st.spinner("Compiling data and creating your PDF report..."):
-                pdf_data = report_generator.generate_report(event, reimbursed_df)
-            st.success("PDF Report Generated!")
-            st.download_button(
-                "Download PDF", 
-                pdf_data, 
-                f"{event['name']}_Financial_Report.pdf", 
-                "application/pdf",
-                key="pdf_download"
-            )
+            # Built on a worker thread so large reports don't block this session.
+            st.session_state.pdf_report_job = report_jobs.submit_pdf_report(event, reimbursed_df)
+        render_report_job('pdf_report_job')
 
     with col2:
         if st.button("📄 Generate JSON Report", use_container_width=True, type="primary"):
             with st.spinner("Compiling data and creating your JSON report..."):
-                json_data = report_generator.generate_json_report(event, reimbursed_df)
+                json_data = report_jobs.generate_json_report_cached(event, reimbursed_df)
             st.success("JSON Report Generated!")
             st.download_button(
                 "Download JSON",
@@ -482,18 +697,114 @@ def render_report_page(event):
                 key="json_download"
             )
 
+    render_ledger_export(event)
+
+def render_consolidated_report(events):
+    import report_jobs
+    st.info(f"One statement covering all {len(events)} events, with per-event sections and overall totals.")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if st.button("⬇️ Generate Consolidated PDF", use_container_width=True):
+            st.session_state.consolidated_report_job = report_jobs.submit_consolidated_report(events)
+        render_report_job('consolidated_report_job')
+
+    with col2:
+        if st.button("📄 Generate Consolidated JSON", use_container_width=True, type="primary"):
+            st.session_state.consolidated_json_job = report_jobs.submit_consolidated_json_report(events)
+        render_report_job('consolidated_json_job', "JSON", "application/json")
+
+def render_report_job(job_key, kind="PDF", mime="application/pdf"):
+    """Shows progress, the error, or the download button for the report job stored under job_key."""
+    import report_jobs
+    job = report_jobs.get_job(st.session_state.get(job_key))
+    if job and job['status'] in ("queued", "running"):
+        render_report_progress(job['id'], kind)
+    elif job and job['status'] == "failed":
+        st.error(f"{kind} report failed: {job['error']}")
+    elif job and not os.path.exists(job['path']):
+        st.warning("This report's file has been cleaned up. Generate it again.")
+        del st.session_state[job_key]
+    elif job:
+        st.success(f"{kind} Report Generated!")
+        with open(job['path'], 'rb') as report_file:
+            st.download_button(
+                f"Download {kind}",
+                report_file,
+                job['file_name'],
+                mime,
+                key=f"{job_key}_download"
+            )
+
+def render_ledger_export(event):
+    import ledger_export
+    with st.expander("📤 Export ledger (CSV / NDJSON / Parquet)"):
+        st.caption("Streams every reimbursed transaction in the selected range to a file, for audit and accounting.")
+        fmt_col, scope_col, date_col = st.columns(3)
+        fmt = fmt_col.selectbox("Format", ledger_export.available_formats())
+        scope = scope_col.radio("Events", [f"Only {event['name']}", "All events"])
+        date_range = date_col.date_input("Reimbursed between", value=(), key="ledger_dates")
+        columns = st.multiselect("Columns", ledger_export.LEDGER_COLUMNS, default=ledger_export.LEDGER_COLUMNS)
+        if st.button("Prepare export", use_container_width=True, disabled=not columns):
+            start = datetime.datetime.combine(date_range[0], datetime.time.min) if date_range else None
+            end = datetime.datetime.combine(date_range[-1], datetime.time.max) if date_range else None
+            event_id = None if scope == "All events" else event['id']
+            with st.spinner("Exporting ledger..."):
+                export_path = ledger_export.export_ledger_to_temp_path(fmt, event_id=event_id, start=start, end=end, columns=columns)
+            mime, extension = ledger_export.FORMATS[fmt]
+            try:
+                with open(export_path, 'rb') as export_file:
+                    st.download_button(f"Download {fmt.upper()}", export_file, f"{event['name']}_Ledger.{extension}", mime, key="ledger_download")
+            finally:
+                os.remove(export_path)
+
+@st.fragment(run_every=REPORT_POLL_SECONDS)
+def render_report_progress(job_id, kind="PDF"):
+    import report_jobs
+    job = report_jobs.get_job(job_id)
+    if job is None or job['status'] not in ("queued", "running"):
+        st.rerun()  # Redraw the whole page with the download button or the error
+    st.progress(job['progress'], text=f"Compiling {kind} report: {job['message']}")
+
 def render_activity_log_page():
     st.caption("A complete, immutable audit trail of all actions performed in the system.")
-    log_data = api.get_activity_log()
-    if not log_data:
-        st.info("No activity has been logged yet.")
+
+    # -------- FILTER UI --------
+    user_col, date_col, text_col = st.columns([1, 1, 2])
+    user_filter = user_col.selectbox("User", ["All users"] + api.get_activity_log_users())
+    date_range = date_col.date_input("Date range", value=())
+    text_filter = text_col.text_input("🔍 Search actions...")
+
+    start = end = None
+    if len(date_range) >= 1:
+        start = datetime.datetime.combine(date_range[0], datetime.time.min)
+        end = datetime.datetime.combine(date_range[-1], datetime.time.max)
+    user_name = None if user_filter == "All users" else user_filter
+
+    # Changing a filter starts again from the newest page.
+    filters = (user_name, start, end, text_filter)
+    if st.session_state.get('activity_log_filters') != filters:
+        st.session_state.activity_log_filters = filters
+        st.session_state.activity_log_cursor = None
+
+    page = api.query_activity_log(user_name, start, end, text_filter, st.session_state.activity_log_cursor, ACTIVITY_LOG_PAGE_SIZE)
+    if not page['entries']:
+        st.info("No activity has been logged yet." if filters == (None, None, None, '') else "No matching activity found.")
         return
-    for log in log_data:
+    for log in page['entries']:
         with st.container(border=True):
             st.markdown(f"**{log['user']}** {log['action']}")
             # Robustly display timestamp
             ts_str = log.get('timestamp').strftime('%d %b %Y, %I:%M:%S %p') if log.get('timestamp') else 'N/A'
             st.caption(ts_str)
 
+    newer_col, older_col = st.columns(2)
+    if newer_col.button("⬅️ Newer", use_container_width=True, disabled=page['prev_cursor'] is None):
+        st.session_state.activity_log_cursor = page['prev_cursor']
+        st.rerun()
+    if older_col.button("Older ➡️", use_container_width=True, disabled=page['next_cursor'] is None):
+        st.session_state.activity_log_cursor = page['next_cursor']
+        st.rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Maintenance commands for the expense and advance store.
+
+    python archive.py archive --older-than-days 90   # move settled records into compressed archive segments
+    python archive.py compact                        # fold event logs into snapshots and merge archive segments
+    python archive.py convert records                # rewrite users, events, etc. in the compact record format (or: json)
+    python archive.py normalize-uploads              # re-encode existing receipt and quote images like new uploads
+
+Archived records stay visible in history views, reports and exports, but are read-only.
+Run compact and convert while the app and the HTTP API are stopped.
+"""
+import argparse
+
+import mock_api as api
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive settled records and compact storage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="Move settled records into the cold archive")
+    archive.add_argument("--older-than-days", type=int, default=api.ARCHIVE_AFTER_DAYS)
+    archive.add_argument("--event", type=int, action="append", help="Only this event id (repeatable)")
+    commands.add_parser("compact", help="Fold event logs into snapshots and merge archive segments")
+    convert = commands.add_parser("convert", help="Rewrite the document files (users, events, ...) in another format")
+    convert.add_argument("format", choices=list(api.CODECS))
+    normalize = commands.add_parser("normalize-uploads", help="Re-encode the images in uploads/ upright, size-capped and without metadata")
+    normalize.add_argument("--keep-originals", action="store_true", help=f"Move the originals to {api.UPLOAD_ORIGINALS_DIR}")
+    args = parser.parse_args()
+
+    api.setup_database()
+    if args.command == "archive":
+        summary = api.archive_settled(args.older_than_days, args.event)
+        for event_id, counts in summary.items():
+            print(f"Event {event_id}: archived " + ", ".join(f"{n} {collection}" for collection, n in counts.items()))
+        if not summary:
+            print("Nothing to archive.")
+    elif args.command == "compact":
+        for event_id, result in api.compact_storage().items():
+            print(f"Event {event_id}: reclaimed {result['log_bytes']} log bytes, merged {result['segments_merged']} segment(s)")
+    elif args.command == "convert":
+        for path, (before, after) in api.convert_storage(args.format).items():
+            print(f"{path}: {before} -> {after} bytes")
+    else:
+        import receipt_ingest
+        receipt_ingest.KEEP_ORIGINALS = receipt_ingest.KEEP_ORIGINALS or args.keep_originals
+        summary = api.normalize_uploads()
+        print(f"Normalized {summary['normalized']} file(s): {summary['bytes_before']} -> {summary['bytes_after']} bytes; "
+              f"{summary['records_updated']} record(s) updated, {summary['unchanged']} already normalized or not images, "
+              f"{summary['archived']} kept for archived records")
+
+if __name__ == "__main__":
+    main()
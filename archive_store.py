@@ -0,0 +1,152 @@
+import gzip
+import heapq
+import json
+import os
+import time
+
+import instrumentation
+
+class ArchiveStore:
+    """
+    Cold storage for settled records: gzip-compressed, read-only JSON-lines segments per event
+    (one record per line, with its collection), plus a per-event index.json mapping each archived
+    id to its segment. Segments are never modified once written, so reads are cached in memory.
+    Writers must hold the caller's write lock.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._segment_cache = {}  # segment path -> records by collection
+        self._index_cache = {}  # event id -> (stamp, index)
+        self._last_ids = {}  # (event id, collection) -> (index, highest archived id)
+
+    def _event_dir(self, event_id):
+        return os.path.join(self.directory, f"event_{event_id}")
+
+    def _index_path(self, event_id):
+        return os.path.join(self._event_dir(event_id), 'index.json')
+
+    def index(self, event_id):
+        """{'segments': {name: {...}}, 'ids': {collection: {id: segment name}}} for the event."""
+        path = self._index_path(event_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return {"segments": {}, "ids": {}}
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self._index_cache.get(event_id)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self._index_cache[event_id] = (stamp, index)
+        return index
+
+    def last_id(self, collection, event_id):
+        """The highest archived id of the collection for the event, or 0."""
+        index = self.index(event_id)
+        cached = self._last_ids.get((event_id, collection))
+        if cached is None or cached[0] is not index:
+            ids = index['ids'].get(collection, {})
+            cached = self._last_ids[(event_id, collection)] = (index, max(map(int, ids), default=0))
+        return cached[1]
+
+    def _save_index(self, event_id, index):
+        path = self._index_path(event_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, path)
+
+    def _read_segment(self, event_id, name):
+        path = os.path.join(self._event_dir(event_id), name)
+        records = self._segment_cache.get(path)
+        if records is None:
+            records = {}
+            instrumentation.count_read(os.path.getsize(path))
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    item = json.loads(line)
+                    records.setdefault(item['collection'], []).append(item['record'])
+            self._segment_cache[path] = records
+        return records
+
+    def records(self, collection, event_id):
+        """Every archived record of the collection for the event, in id order."""
+        index = self.index(event_id)
+        records = [r for name in index['segments'] for r in self._read_segment(event_id, name).get(collection, [])]
+        return sorted(records, key=lambda r: r['id'])
+
+    def _iter_segment(self, event_id, name, collection):
+        path = os.path.join(self._event_dir(event_id), name)
+        cached = self._segment_cache.get(path)
+        if cached is not None:
+            yield from cached.get(collection, [])
+            return
+        instrumentation.count_read(os.path.getsize(path))
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                item = json.loads(line)
+                if item['collection'] == collection:
+                    yield item['record']
+
+    def iter_records(self, collection, event_id):
+        """
+        Like records(), but streams the segments from disk instead of loading and caching them,
+        for one pass over a large archive. In id order, as each segment is written in id order.
+        """
+        segments = [self._iter_segment(event_id, name, collection) for name in self.index(event_id)['segments']]
+        return heapq.merge(*segments, key=lambda r: r['id'])
+
+    def get(self, collection, event_id, record_id):
+        name = self.index(event_id)['ids'].get(collection, {}).get(str(record_id))
+        if name is None:
+            return None
+        return next((r for r in self._read_segment(event_id, name).get(collection, []) if r['id'] == record_id), None)
+
+    def _write_segment(self, event_id, records_by_collection, default=None):
+        """Writes a new segment atomically and returns its file name."""
+        os.makedirs(self._event_dir(event_id), exist_ok=True)
+        name = f"segment_{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}_{len(self.index(event_id)['segments'])}.jsonl.gz"
+        path = os.path.join(self._event_dir(event_id), name)
+        with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8') as f:
+            for collection, records in records_by_collection.items():
+                for record in records:
+                    f.write(json.dumps({'collection': collection, 'record': record}, default=default) + '\n')
+        os.replace(f"{path}.tmp", path)
+        return name
+
+    def add_segment(self, event_id, records_by_collection, default=None):
+        """Archives the records into a new segment and indexes them. Returns the segment name."""
+        name = self._write_segment(event_id, records_by_collection, default)
+        index = self.index(event_id)
+        index = {"segments": dict(index['segments']), "ids": {c: dict(ids) for c, ids in index['ids'].items()}}
+        index['segments'][name] = {"created_at": time.time(),
+                                   "counts": {c: len(records) for c, records in records_by_collection.items()}}
+        for collection, records in records_by_collection.items():
+            index['ids'].setdefault(collection, {}).update({str(r['id']): name for r in records})
+        self._save_index(event_id, index)
+        return name
+
+    def merge_segments(self, event_id):
+        """Rewrites all of the event's segments as one. Returns the number of segments merged away."""
+        index = self.index(event_id)
+        names = list(index['segments'])
+        if len(names) < 2:
+            return 0
+        merged = {}
+        for name in names:
+            for collection, records in self._read_segment(event_id, name).items():
+                merged.setdefault(collection, []).extend(records)
+        for records in merged.values():
+            records.sort(key=lambda r: r['id'])
+        new_name = self._write_segment(event_id, merged)
+        self._save_index(event_id, {
+            "segments": {new_name: {"created_at": time.time(), "counts": {c: len(r) for c, r in merged.items()}}},
+            "ids": {c: {str(r['id']): new_name for r in records} for c, records in merged.items()},
+        })
+        for name in names:
+            path = os.path.join(self._event_dir(event_id), name)
+            self._segment_cache.pop(path, None)
+            os.remove(path)
+        return len(names) - 1
@@ -0,0 +1,205 @@
+"""
+Deterministic synthetic festival data, for benchmarks and load tests.
+
+Writes a complete database (users, events, expenses with approval chains and comments,
+advances, the activity log and historical spending curves) into an empty directory, at any
+scale. The same arguments always produce the same data:
+
+    python benchmarks/datagen.py --out /tmp/fest_10k --expenses 10000 [--events 4] [--students 200] [--seed 42]
+
+Records are written in the old whole-file layout and then migrated by mock_api.setup_database,
+so they land in the same partitions, comment stores and counters the app itself would build.
+Every user's password is "pw"; the usernames treasurer, team_lead and student1 always exist.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIES = ['Printing', 'Food', 'Decoration', 'Logistics', 'Prizes', 'Marketing', 'Equipment Rental', 'Travel']
+VENDORS = ['Sound Co', 'Print Hub', 'Campus Caterers', 'Stage Works', 'Light House', 'Trophy Mart', 'City Cabs']
+WORDS = ['banner', 'poster', 'lunch', 'snacks', 'tea', 'stage', 'lights', 'speakers', 'trophies', 'certificates',
+         'tape', 'chairs', 'cab', 'fuel', 'badges', 'lanyards', 'flex', 'xerox', 'water', 'decor', 'urgent', 'bulk']
+COMMENTS = ['Please attach a clearer receipt.', 'Looks fine.', 'Was this pre-approved?', 'Urgent, vendor waiting.',
+            'Split across two bills.', 'Matches the quote.', 'Paid from pocket, please expedite.']
+# Share of expenses in each status; the approval chain and timestamps follow from the status.
+EXPENSE_STATUS_WEIGHTS = {'Pending Team Lead': 15, 'Pending Treasurer': 10, 'Approved': 10, 'Reimbursed': 55, 'Rejected': 10}
+ADVANCE_STATUS_WEIGHTS = {'Pending': 15, 'Approved by Team Lead': 10, 'Paid': 15, 'Closed': 50, 'Rejected': 10}
+EVENT_DAYS = 30
+FIRST_EVENT_START = datetime.datetime(2024, 1, 5, 9, 0)
+
+def _spread(rng, start, max_hours):
+    return start + datetime.timedelta(hours=rng.uniform(0.1, max_hours))
+
+def make_users(students, team_leads=2):
+    users = [{"username": "treasurer", "password": "pw", "name": "Sanjai", "role": "treasurer"},
+             {"username": "team_lead", "password": "pw", "name": "Ronaldo", "role": "team_lead"}]
+    users += [{"username": f"team_lead{i}", "password": "pw", "name": f"Lead {i}", "role": "team_lead"}
+              for i in range(2, team_leads + 1)]
+    users += [{"username": f"student{i}", "password": "pw", "name": f"Student {i}", "role": "student",
+               "upi_id": f"student{i}@okhdfcbank" if i % 7 else ""} for i in range(1, students + 1)]
+    return users
+
+def make_events(count, total_expenses):
+    return [{"id": i, "name": f"Fest {2024 + (i - 1) // 4} #{i}", "budget": max(50000, total_expenses // count * 1500),
+             "start_date": (FIRST_EVENT_START + datetime.timedelta(days=45 * (i - 1))).date().isoformat()}
+            for i in range(1, count + 1)]
+
+def make_historical(rng, fests=3):
+    """Cumulative spend per day for past fests, including the "TechFest 2023" curve the forecast reads."""
+    curves = {}
+    for name in ["TechFest 2023"] + [f"Past Fest {i}" for i in range(2, fests + 1)]:
+        total = rng.uniform(35000, 60000)
+        spend, curve = 0.0, []
+        for day in range(1, EVENT_DAYS + 1):
+            spend += total / EVENT_DAYS * rng.uniform(0.3, 1.7) * (0.5 + day / EVENT_DAYS)
+            curve.append((day, round(spend, 2)))
+        curves[name] = curve
+    return curves
+
+def _comments(rng, users_by_role, start, count):
+    comments = []
+    for _ in range(count):
+        author = rng.choice(users_by_role[rng.choice(['student', 'team_lead', 'treasurer'])])
+        comments.append({"user": author['name'], "role": author['role'], "text": rng.choice(COMMENTS),
+                         "timestamp": _spread(rng, start, 72).isoformat()})
+    return sorted(comments, key=lambda c: c['timestamp'])
+
+def make_expense(rng, expense_id, event, users_by_role, comments_per_expense, log):
+    student = rng.choice(users_by_role['student'])
+    lead, treasurer = rng.choice(users_by_role['team_lead']), users_by_role['treasurer'][0]
+    start = datetime.datetime.fromisoformat(event['start_date'])
+    submitted = start + datetime.timedelta(days=rng.randrange(EVENT_DAYS), seconds=rng.randrange(86400))
+    status = rng.choices(list(EXPENSE_STATUS_WEIGHTS), weights=list(EXPENSE_STATUS_WEIGHTS.values()))[0]
+    description = ' '.join(rng.sample(WORDS, 3))
+    amount = round(rng.lognormvariate(6, 0.9), 2)
+    expense = {
+        "id": expense_id, "event_id": event['id'], "user": student['username'], "amount": amount,
+        "category": rng.choice(CATEGORIES), "description": description, "submitted_at": submitted.isoformat(),
+        "receipt_url": f"uploads/receipt_{expense_id}.png", "ocr_text": f"{description} total {amount:.2f}", "status": status,
+        "approvals": [{"role": "team_lead", "approved": False, "approved_by": None, "timestamp": None},
+                      {"role": "treasurer", "approved": False, "approved_by": None, "timestamp": None}],
+    }
+    log.append((submitted, student['name'], f"submitted an expense of ₹{amount} for '{description}'."))
+    # Rejections happen at either level; everything past a level was approved there.
+    levels = {'Pending Team Lead': 0, 'Pending Treasurer': 1, 'Approved': 2, 'Reimbursed': 2,
+              'Rejected': rng.choice([0, 1])}[status]
+    when = submitted
+    for step, approver in zip(expense['approvals'][:levels], (lead, treasurer)):
+        when = _spread(rng, when, 48)
+        step.update(approved=True, approved_by=approver['name'], timestamp=when.isoformat())
+        log.append((when, approver['name'], f"approved expense #{expense_id} at the {approver['role']} level."))
+    thread = _comments(rng, users_by_role, submitted, min(int(rng.expovariate(1 / comments_per_expense)), 10)) if comments_per_expense else []
+    if status == 'Rejected':
+        when = _spread(rng, when, 48)
+        rejecter = (lead, treasurer)[levels]
+        thread.append({"user": rejecter['name'], "role": rejecter['role'], "text": "Receipt does not match the amount.",
+                       "timestamp": when.isoformat()})
+        log.append((when, rejecter['name'], f"rejected expense #{expense_id}: 'Receipt does not match the amount.'"))
+    if status == 'Reimbursed':
+        when = _spread(rng, when, 96)
+        expense.update(reimbursed_at=when.isoformat(), transaction_id=f"UPI{expense_id:010d}")
+        log.append((when, treasurer['name'], f"reimbursed expense #{expense_id} (₹{amount}). Transaction ID: UPI{expense_id:010d}"))
+    for comment in thread:
+        log.append((datetime.datetime.fromisoformat(comment['timestamp']), comment['user'],
+                    f"commented on expense #{expense_id}: '{comment['text']}'"))
+    expense["comments"] = thread
+    return expense
+
+def make_advance(rng, advance_id, event, users_by_role, log):
+    student = rng.choice(users_by_role['student'])
+    lead, treasurer = rng.choice(users_by_role['team_lead']), users_by_role['treasurer'][0]
+    start = datetime.datetime.fromisoformat(event['start_date'])
+    submitted = start + datetime.timedelta(days=rng.randrange(EVENT_DAYS), seconds=rng.randrange(86400))
+    status = rng.choices(list(ADVANCE_STATUS_WEIGHTS), weights=list(ADVANCE_STATUS_WEIGHTS.values()))[0]
+    vendor, amount = rng.choice(VENDORS), round(rng.lognormvariate(8, 0.6), 2)
+    advance = {"id": advance_id, "user": student['username'], "event_id": event['id'], "vendor": vendor,
+               "purpose": ' '.join(rng.sample(WORDS, 2)), "amount": amount, "quote_url": "", "status": status,
+               "submitted_at": submitted.isoformat(), "receipt_url": None, "comments": []}
+    log.append((submitted, student['name'], f"requested advance of ₹{amount:.2f} for {vendor}"))
+    when = _spread(rng, submitted, 48)
+    if status == 'Rejected':
+        log.append((when, lead['name'], f"rejected advance #{advance_id}"))
+    elif status != 'Pending':
+        advance['approved_by'] = lead['name']
+        log.append((when, lead['name'], f"approved advance #{advance_id}"))
+        if status in ('Paid', 'Closed'):
+            when = _spread(rng, when, 48)
+            advance.update(paid_txn_id=f"ADV{advance_id:08d}", paid_time=when.isoformat(), paid_by=treasurer['name'])
+            log.append((when, treasurer['name'], f"marked advance #{advance_id} as paid (txn: ADV{advance_id:08d})"))
+        if status == 'Closed':
+            when = _spread(rng, when, 120)
+            advance['receipt_url'] = f"uploads/advance_receipt_{advance_id}.png"
+            log.append((when, student['name'], f"closed advance #{advance_id}"))
+    return advance
+
+def generate(out_dir, expenses=1000, events=3, students=50, advances=None, comments_per_expense=0.5, seed=42):
+    """
+    Writes the dataset into out_dir (created if missing, must not hold a database yet) and
+    returns a summary of what was generated. Changes the working directory to out_dir, since
+    mock_api's files are relative to it; call it in a process that has not used mock_api yet.
+    """
+    sys.path.insert(0, REPO_DIR)
+    import mock_api as api
+
+    os.makedirs(out_dir, exist_ok=True)
+    os.chdir(out_dir)
+    if os.path.exists(api.PARTITIONS_DIR) or os.path.exists(api.USERS_FILE):
+        raise SystemExit(f"{out_dir} already holds a database")
+    rng = random.Random(seed)
+    advances = expenses // 10 if advances is None else advances
+    users = make_users(students)
+    users_by_role = {}
+    for user in users:
+        users_by_role.setdefault(user['role'], []).append(user)
+    event_list = make_events(events, expenses)
+
+    # Ids are contiguous per event, as they would be after each fest's submissions.
+    log, expense_records, advance_records = [], [], []
+    for index, event in enumerate(event_list):
+        first = len(expense_records) + 1
+        expense_records += [make_expense(rng, expense_id, event, users_by_role, comments_per_expense, log)
+                            for expense_id in range(first, first + expenses // events + (index < expenses % events))]
+        first = len(advance_records) + 1
+        advance_records += [make_advance(rng, advance_id, event, users_by_role, log)
+                            for advance_id in range(first, first + advances // events + (index < advances % events))]
+
+    api.save_data(api.USERS_FILE, users)
+    api.save_data(api.EVENTS_FILE, event_list)
+    api.save_data(api.HISTORICAL_FILE, make_historical(rng))
+    for path, records in ((api.EXPENSES_FILE, expense_records), (api.ADVANCES_FILE, advance_records)):
+        with open(path, 'w') as f:
+            json.dump(records, f)
+    log.sort(key=lambda entry: entry[0])
+    with open(api.LOG_FILE, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'timestamp': FIRST_EVENT_START.isoformat(), 'user': 'System', 'action': 'Database initialized.'}) + '\n')
+        f.writelines(json.dumps({'timestamp': when.isoformat(), 'user': user, 'action': action}) + '\n' for when, user, action in log)
+
+    api.setup_database()  # Partitions the records, moves comment threads out and builds the counters
+    api.compact_storage()  # Start from a bare snapshot per fest, like a deployment that has been compacted
+    os.remove(api.EXPENSES_FILE)
+    os.remove(api.ADVANCES_FILE)
+    return {"seed": seed, "users": len(users), "events": len(event_list), "expenses": len(expense_records),
+            "advances": len(advance_records), "comments": sum(len(e['comments']) for e in expense_records),
+            "log_entries": len(log) + 1}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", required=True, help="Directory to create the database in")
+    parser.add_argument("--expenses", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=3)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--advances", type=int, default=None, help="Defaults to a tenth of --expenses")
+    parser.add_argument("--comments-per-expense", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    summary = generate(os.path.abspath(args.out), args.expenses, args.events, args.students, args.advances,
+                       args.comments_per_expense, args.seed)
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
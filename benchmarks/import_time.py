@@ -0,0 +1,66 @@
+"""
+Import-time benchmark for app startup.
+
+Each scenario runs in a fresh interpreter, in a throwaway copy of the working directory, and
+reports wall time plus which heavy libraries ended up loaded:
+
+    python benchmarks/import_time.py [--repeat 5]
+
+"login page" renders app.py headlessly the way a new session does; "all page modules" imports
+every heavy module that app.py used to import up front, i.e. the old cost of every cold start.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['pandas', 'plotly.express', 'sklearn', 'fpdf', 'pytesseract', 'pyarrow']
+
+SCENARIOS = {
+    "login page": (
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file('app.py', default_timeout=120).run()\n"
+    ),
+    "all page modules": (
+        "import streamlit, mock_api, ui_components\n"
+        "import pandas, plotly.express, predictions, ocr_processor, report_generator, report_jobs, ledger_export\n"
+    ),
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_scenario(code, workdir):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                            cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="festflow_bench_")
+    try:
+        shutil.copy(os.path.join(REPO_DIR, "app.py"), workdir)
+        shutil.copy(os.path.join(REPO_DIR, "styles.css"), workdir)
+        for name, code in SCENARIOS.items():
+            runs = [run_scenario(code, workdir) for _ in range(args.repeat)]
+            median = statistics.median(r["seconds"] for r in runs)
+            print(f"{name:<18} median {median * 1000:8.0f} ms   heavy modules loaded: {', '.join(runs[-1]['loaded']) or 'none'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,545 @@
+"""
+Multi-session load test that drives the real app headlessly with Streamlit's AppTest.
+
+Simulated students, team leads and treasurers log in and click through app.py at the same
+time: students submit expenses and comment, team leads and treasurers approve, comment and
+reimburse. Each session runs in its own process, since AppTest is not thread-safe, so the
+storage layer sees truly concurrent writers coordinated only by its file lock. It runs
+against a temporary database, generated by benchmarks/datagen.py or copied from --data, and
+reports throughput and latency percentiles per action. Afterwards a fresh interpreter
+re-reads the database and checks that every submission, approval, comment and reimbursement
+the sessions made is there exactly once, that no id is duplicated and that the pending
+counters still match the data:
+
+    python benchmarks/load_test.py [--students 8] [--team-leads 2] [--treasurers 1] [--actions 15]
+                                   [--expenses 300 | --data path/to/db] [--output load_test.json]
+
+With --mode stress the same roles call mock_api directly from their writer processes instead,
+while --readers threads in one more process keep listing, searching and fetching comments,
+pending queues and the activity log through that process's shared stores and indexes. This
+covers what the session mode cannot: many threads reading one process's in-memory state while
+other processes write. A reader that fails, or sees an id twice in one listing, is an error:
+
+    python benchmarks/load_test.py --mode stress [--readers 8] [--students 4] [--actions 200]
+
+Exits with status 1 if the consistency check finds a problem, or in stress mode on any error.
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSION_TIMEOUT_SECONDS = 120  # Per rerun; a slower rerun is reported as an error
+# Relative frequency of each action per role.
+ROLE_ACTIONS = {
+    "student": {"submit": 3, "comment": 1, "browse": 1},
+    "team_lead": {"approve": 3, "comment": 1},
+    "treasurer": {"approve": 2, "reimburse": 2, "dashboard": 1},
+}
+# Stress mode: writer actions per role, and what the reader threads do.
+STRESS_WRITER_ACTIONS = {
+    "student": {"submit": 3, "comment": 1},
+    "team_lead": {"approve": 3, "comment": 1},
+    "treasurer": {"approve": 2, "reimburse": 2},
+}
+STRESS_READS = ("list", "search", "comments", "pending", "activity log")
+STRESS_SWITCH_INTERVAL_S = 1e-5  # Reader process switches threads this often, so unguarded sections interleave
+DATABASE_FILES = ('db_users.json', 'db_events.json', 'db_historical.json', 'db_activity_log.jsonl', 'db_pending_counters.json')
+
+def _percentile(sorted_samples, p):
+    return sorted_samples[max(math.ceil(p / 100 * len(sorted_samples)) - 1, 0)]
+
+def _receipt_png():
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (60, 40), 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+class Recorder:
+    """One session's rerun latencies, errors and the changes it made."""
+
+    def __init__(self):
+        self.latencies = {}  # action -> seconds per rerun
+        self.errors = []
+        self.expected = {"submitted": [], "approved": [], "comments": [], "reimbursed": {}}
+
+    def timed_run(self, at, action):
+        start = time.perf_counter()
+        at.run()
+        self.latencies.setdefault(action, []).append(time.perf_counter() - start)
+        if at.exception:
+            self.errors.append(f"{action}: {at.exception[0].value}")
+        return not at.exception
+
+    def expect(self, kind, item):
+        if kind == "reimbursed":
+            self.expected[kind].setdefault(str(item[0]), []).append(item[1])
+        else:
+            self.expected[kind].append(item)
+
+    def merge(self, other):
+        for action, samples in other['latencies'].items():
+            self.latencies.setdefault(action, []).extend(samples)
+        self.errors += other['errors']
+        for kind, items in other['expected'].items():
+            if kind == "reimbursed":
+                for expense_id, transaction_ids in items.items():
+                    self.expected[kind].setdefault(expense_id, []).extend(transaction_ids)
+            else:
+                self.expected[kind] += items
+
+# --- Sessions ---
+class Session:
+    def __init__(self, name, username, role, recorder, rng, receipt):
+        from streamlit.testing.v1 import AppTest
+        self.name, self.username, self.role = name, username, role
+        self.recorder, self.rng, self.receipt = recorder, rng, receipt
+        self.at = AppTest.from_file(os.path.join(REPO_DIR, "app.py"), default_timeout=SESSION_TIMEOUT_SECONDS)
+        self.counter = 0
+
+    def _token(self, prefix):
+        self.counter += 1
+        return f"{prefix}-{self.name}-{self.counter}"
+
+    def login(self):
+        self.at.run()
+        self.at.selectbox[0].select(self.username)
+        self.at.text_input[0].input("pw")
+        self.at.button[0].click()
+        return self.recorder.timed_run(self.at, "login")
+
+    def open_page(self, page):
+        radio = self.at.sidebar.radio[0]
+        if radio.value != page:
+            radio.set_value(page)
+            return self.recorder.timed_run(self.at, f"open {page}")
+        return True
+
+    def _form_button(self, label, form_id):
+        return next((b for b in self.at.button if b.label == label and b.proto.form_id == form_id), None)
+
+    def _card_ids(self, key_prefix):
+        return [int(t.key[len(key_prefix):]) for t in self.at.text_input if t.key and t.key.startswith(key_prefix)]
+
+    def submit(self):
+        if not self.open_page("Submit Expense"):
+            return
+        self.at.file_uploader[0].set_value((f"{self._token('receipt')}.png", self.receipt, "image/png"))
+        description = self._token("LT")
+        self.at.number_input[0].set_value(round(self.rng.uniform(50, 2000), 2))
+        self.at.text_area[0].input(description)
+        button = next(b for b in self.at.button if b.label == "Submit for Approval")
+        button.click()
+        if self.recorder.timed_run(self.at, "submit expense") and any("submitted" in s.value for s in self.at.success):
+            self.recorder.expect("submitted", description)
+
+    def comment(self):
+        page = "My Submitted Expenses" if self.role == "student" else "Manage Approvals"
+        if not self.open_page(page):
+            return
+        ids = self._card_ids("cmt_exp_")
+        if not ids:
+            return
+        expense_id, text = self.rng.choice(ids), self._token("LT-comment")
+        self.at.text_input(key=f"cmt_exp_{expense_id}").input(text)
+        self.at.button(key=f"btn_cmt_exp_{expense_id}").click()
+        if self.recorder.timed_run(self.at, "comment"):
+            self.recorder.expect("comments", [expense_id, text])
+
+    def approve(self):
+        if not self.open_page("Manage Approvals"):
+            return
+        buttons = [b for b in self.at.button if b.label == "✅ Approve"]
+        if not buttons:
+            return
+        button = self.rng.choice(buttons)
+        expense_id = int(button.proto.form_id[len("form_exp_"):])
+        button.click()
+        if self.recorder.timed_run(self.at, "approve"):
+            self.recorder.expect("approved", [expense_id, self.role])
+
+    def reimburse(self):
+        if not self.open_page("Manage Approvals"):
+            return
+        ids = self._card_ids("txn_")
+        if not ids:
+            return
+        expense_id, transaction_id = self.rng.choice(ids), self._token("LT-txn")
+        self.at.text_input(key=f"txn_{expense_id}").input(transaction_id)
+        self._form_button("💸 Reimburse", f"reimburse_form_{expense_id}").click()
+        if self.recorder.timed_run(self.at, "reimburse"):
+            self.recorder.expect("reimbursed", (expense_id, transaction_id))
+
+    def browse(self):
+        self.open_page("My Advances")
+        self.open_page("My Submitted Expenses")
+
+    def dashboard(self):
+        self.open_page("Manage Approvals")
+        self.open_page("Dashboard")
+
+    def run(self, actions, deadline):
+        try:
+            if not self.login():
+                return
+            weights = ROLE_ACTIONS[self.role]
+            for _ in range(actions):
+                if time.monotonic() > deadline:
+                    break
+                getattr(self, self.rng.choices(list(weights), weights=list(weights.values()))[0])()
+        except Exception as e:  # A broken page or a timeout ends this session, not the whole test
+            self.recorder.errors.append(f"{self.name}: {type(e).__name__}: {e}")
+
+def run_session(spec, data_dir, args, barrier, results):
+    """Process entry point: one session, started together with the others, reporting back on `results`."""
+    logging.disable(logging.WARNING)  # AppTest warns about the missing browser context on every rerun
+    os.chdir(data_dir)  # mock_api's files are relative to the working directory
+    sys.path.insert(0, REPO_DIR)
+    recorder = Recorder()
+    session = Session(spec['name'], spec['username'], spec['role'], recorder, random.Random(spec['seed']), _receipt_png())
+    barrier.wait()
+    start = time.time()
+    session.run(args.actions, time.monotonic() + args.duration if args.duration else float('inf'))
+    results.put({"latencies": recorder.latencies, "errors": recorder.errors, "expected": recorder.expected,
+                 "start": start, "end": time.time()})
+
+# --- Stress Mode (mock_api directly, no AppTest) ---
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+class StressWriter:
+    """One writer process's mock_api calls, recorded with the same expectations as a session's."""
+
+    def __init__(self, name, username, role, recorder, rng, receipt):
+        import mock_api as api
+        self.api, self.name, self.role = api, name, role
+        self.user = api.get_user_details(username)
+        self.recorder, self.rng, self.receipt = recorder, rng, receipt
+        self.event_id = api.get_events_for_user(self.user)[0]['id']
+        self.counter = 0
+
+    def _token(self, prefix):
+        self.counter += 1
+        return f"{prefix}-{self.name}-{self.counter}"
+
+    def _timed(self, action, call):
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self.recorder.latencies.setdefault(action, []).append(time.perf_counter() - start)
+
+    def submit(self):
+        description = self._token("LT")
+        receipt = Upload(f"{self._token('receipt')}.png", self.receipt)
+        self._timed("submit expense", lambda: self.api.add_expense(self.event_id, self.user, round(self.rng.uniform(50, 2000), 2),
+                                                                  "Printing", description, receipt))
+        self.recorder.expect("submitted", description)
+
+    def comment(self):
+        if self.role == "student":
+            expenses = self.api.get_expenses_for_user(self.user['username'], self.event_id)
+        else:
+            expenses = self.api.get_pending_requests(self.role, self.event_id)
+        if not expenses:
+            return
+        expense_id, text = self.rng.choice(expenses)['id'], self._token("LT-comment")
+        if self._timed("comment", lambda: self.api.add_comment_to_expense(expense_id, self.user, text)):
+            self.recorder.expect("comments", [expense_id, text])
+
+    def approve(self):
+        pending = self.api.get_pending_requests(self.role, self.event_id)
+        if not pending:
+            return
+        expense_id = self.rng.choice(pending)['id']
+        if self._timed("approve", lambda: self.api.approve_expense_step(expense_id, self.user)):
+            self.recorder.expect("approved", [expense_id, self.role])
+
+    def reimburse(self):
+        approved = [e for e in self.api.get_expenses(self.event_id) if e['status'] == "Approved"]
+        if not approved:
+            return
+        expense_id, transaction_id = self.rng.choice(approved)['id'], self._token("LT-txn")
+        if self._timed("reimburse", lambda: self.api.reimburse_expense(expense_id, self.user, transaction_id)):
+            self.recorder.expect("reimbursed", (expense_id, transaction_id))
+
+    def run(self, actions, deadline):
+        weights = STRESS_WRITER_ACTIONS[self.role]
+        for _ in range(actions):
+            if time.monotonic() > deadline:
+                break
+            action = self.rng.choices(list(weights), weights=list(weights.values()))[0]
+            try:
+                getattr(self, action)()
+            except Exception as e:  # Recorded and counted; the writer carries on
+                self.recorder.errors.append(f"{self.name} {action}: {type(e).__name__}: {e}")
+
+def run_stress_writer(spec, data_dir, args, barrier, results):
+    """Process entry point: one writer, started together with the others and the readers."""
+    os.chdir(data_dir)
+    sys.path.insert(0, REPO_DIR)
+    recorder = Recorder()
+    writer = StressWriter(spec['name'], spec['username'], spec['role'], recorder, random.Random(spec['seed']), _receipt_png())
+    barrier.wait()
+    start = time.time()
+    writer.run(args.actions, time.monotonic() + args.duration if args.duration else float('inf'))
+    results.put({"latencies": recorder.latencies, "errors": recorder.errors, "expected": recorder.expected,
+                 "start": start, "end": time.time()})
+
+def _stress_read(api, rng, event_id, read):
+    if read == "list":
+        ids = Counter(e['id'] for e in api.get_expenses(event_id, include_archived=True))
+        duplicated = [expense_id for expense_id, n in ids.items() if n > 1]
+        if duplicated:
+            raise AssertionError(f"expense ids {duplicated[:5]} listed more than once")
+    elif read == "search":
+        api.search_expenses(rng.choice(["lt", "lt comment", "student1", "print"]), event_id=event_id)
+    elif read == "comments":
+        expenses = api.get_expenses(event_id)
+        api.get_comments("expenses", [e['id'] for e in rng.sample(expenses, min(len(expenses), 20))])
+    elif read == "pending":
+        api.get_pending_requests(rng.choice(["team_lead", "treasurer"]), event_id)
+    else:
+        api.get_activity_log()
+
+def run_stress_readers(data_dir, args, barrier, writers_done, results):
+    """
+    Process entry point: args.readers threads sharing this process's mock_api state, reading
+    until the writers are done. Reports like a session, with every failed read as an error.
+    """
+    os.chdir(data_dir)
+    sys.path.insert(0, REPO_DIR)
+    import mock_api as api
+    event_id = api.get_events_for_user(None)[0]['id']
+    recorder, recorder_lock = Recorder(), threading.Lock()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while not writers_done.is_set():
+            read = rng.choice(STRESS_READS)
+            start = time.perf_counter()
+            try:
+                _stress_read(api, rng, event_id, read)
+                error = None
+            except Exception as e:
+                error = f"reader {read}: {type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - start
+            with recorder_lock:
+                recorder.latencies.setdefault(f"read {read}", []).append(elapsed)
+                if error:
+                    recorder.errors.append(error)
+
+    threads = [threading.Thread(target=reader, args=(args.seed * 1000 + 500 + i,), name=f"reader{i + 1}")
+               for i in range(args.readers)]
+    sys.setswitchinterval(STRESS_SWITCH_INTERVAL_S)
+    barrier.wait()
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put({"latencies": recorder.latencies, "errors": recorder.errors, "expected": recorder.expected,
+                 "start": start, "end": time.time()})
+
+# --- Consistency Check (runs in a fresh interpreter inside the database directory) ---
+def verify(expected):
+    sys.path.insert(0, REPO_DIR)
+    import mock_api as api
+    problems = []
+    expenses = api.get_expenses(None, include_archived=True)
+    by_id = {e['id']: e for e in expenses}
+    problems += [f"expense id {i} appears {n} times" for i, n in Counter(e['id'] for e in expenses).items() if n > 1]
+    advances = api.get_advances(None, include_archived=True)
+    problems += [f"advance id {i} appears {n} times" for i, n in Counter(a['id'] for a in advances).items() if n > 1]
+
+    descriptions = Counter(e['description'] for e in expenses)
+    for description in expected['submitted']:
+        if descriptions[description] != 1:
+            problems.append(f"submission '{description}' stored {descriptions[description]} times")
+    logged = Counter(entry['action'] for entry in api.get_activity_log())
+    for description in expected['submitted']:
+        if not any(description in action for action in logged):
+            problems.append(f"submission '{description}' missing from the activity log")
+
+    step_index = {"team_lead": 0, "treasurer": 1}
+    for expense_id, role in expected['approved']:
+        expense = by_id.get(expense_id)
+        if expense is None or not expense['approvals'][step_index[role]]['approved']:
+            problems.append(f"{role} approval of expense #{expense_id} lost")
+
+    threads = api.get_comments("expenses", list({expense_id for expense_id, _ in expected['comments']}))
+    for expense_id, text in expected['comments']:
+        found = sum(1 for c in threads[expense_id] if c['text'] == text)
+        if found != 1:
+            problems.append(f"comment '{text}' on expense #{expense_id} stored {found} times")
+
+    for expense_id, transaction_ids in expected['reimbursed'].items():
+        expense = by_id.get(int(expense_id))
+        if expense is None or expense['status'] != 'Reimbursed' or expense.get('transaction_id') not in transaction_ids:
+            problems.append(f"reimbursement of expense #{expense_id} lost")
+
+    for event in api.get_events_for_user(None):
+        if not api.verify_pending_counters(event['id'], repair=False):
+            problems.append(f"pending counters of event {event['id']} do not match its data")
+    print(json.dumps(problems))
+
+# --- Driver ---
+def prepare_database(args):
+    data_dir = tempfile.mkdtemp(prefix="festflow_load_")
+    if args.data:
+        for name in DATABASE_FILES:
+            if os.path.exists(os.path.join(args.data, name)):
+                shutil.copy(os.path.join(args.data, name), data_dir)
+        shutil.copytree(os.path.join(args.data, 'db_partitions'), os.path.join(data_dir, 'db_partitions'))
+    else:
+        subprocess.run([sys.executable, os.path.join(BENCH_DIR, "datagen.py"), "--out", data_dir, "--expenses", str(args.expenses),
+                        "--events", "1", "--students", str(max(args.students, 5)), "--seed", str(args.seed)],
+                       check=True, capture_output=True)
+    shutil.copy(os.path.join(REPO_DIR, "styles.css"), data_dir)
+    return data_dir
+
+def _session_specs(data_dir, args):
+    sys.path.insert(0, REPO_DIR)
+    import mock_api as api
+    users = api.load_data(os.path.join(data_dir, api.USERS_FILE))  # Either storage format
+    by_role = {role: [u['username'] for u in users if u['role'] == role] for role in ROLE_ACTIONS}
+    specs = []
+    for role, count in (("student", args.students), ("team_lead", args.team_leads), ("treasurer", args.treasurers)):
+        for i in range(count):
+            specs.append({"name": f"{role}{i + 1}", "username": by_role[role][i % len(by_role[role])], "role": role,
+                          "seed": args.seed * 1000 + len(specs)})
+    return specs
+
+def _merge_reports(reports):
+    recorder = Recorder()
+    for report in reports:
+        recorder.merge(report)
+    return recorder, max(r['end'] for r in reports) - min(r['start'] for r in reports)
+
+def run_sessions(data_dir, args):
+    """Runs every session to completion; returns the merged Recorder and the wall time of the busy period."""
+    specs = _session_specs(data_dir, args)
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(len(specs)), context.Queue()
+    processes = [context.Process(target=run_session, args=(spec, data_dir, args, barrier, results), name=spec['name'])
+                 for spec in specs]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return _merge_reports(reports)
+
+def run_stress(data_dir, args):
+    """Like run_sessions, for stress mode: the writers' processes plus one process of reader threads."""
+    specs = _session_specs(data_dir, args)
+    context = multiprocessing.get_context("spawn")
+    barrier, results, reader_results = context.Barrier(len(specs) + 1), context.Queue(), context.Queue()
+    writers_done = context.Event()
+    processes = [context.Process(target=run_stress_writer, args=(spec, data_dir, args, barrier, results), name=spec['name'])
+                 for spec in specs]
+    processes.append(context.Process(target=run_stress_readers, args=(data_dir, args, barrier, writers_done, reader_results),
+                                     name="readers"))
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in specs]
+    writers_done.set()
+    reports.append(reader_results.get())
+    for process in processes:
+        process.join()
+    return _merge_reports(reports)
+
+def summarize(recorder, wall_s, problems, args):
+    unit = "calls" if args.mode == "stress" else "reruns"
+    actions = {}
+    for action, samples in sorted(recorder.latencies.items()):
+        samples = sorted(samples)
+        actions[action] = {"count": len(samples), "p50_s": _percentile(samples, 50), "p90_s": _percentile(samples, 90),
+                           "p99_s": _percentile(samples, 99), "max_s": samples[-1]}
+    count = sum(a['count'] for a in actions.values())
+    sessions = {"students": args.students, "team_leads": args.team_leads, "treasurers": args.treasurers}
+    if args.mode == "stress":
+        sessions["reader_threads"] = args.readers
+    return {"mode": args.mode, "sessions": sessions,
+            "wall_s": wall_s, unit: count, f"{unit}_per_s": count / wall_s if wall_s else 0.0,
+            "changes": {"submitted": len(recorder.expected['submitted']), "approved": len(recorder.expected['approved']),
+                        "comments": len(recorder.expected['comments']), "reimbursed": len(recorder.expected['reimbursed'])},
+            "actions": actions, "errors": recorder.errors, "consistency_problems": problems}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["sessions", "stress"], default="sessions",
+                        help="Drive app.py with AppTest sessions, or call mock_api from writer processes and reader threads")
+    parser.add_argument("--readers", type=int, default=8, help="Reader threads in stress mode")
+    parser.add_argument("--students", type=int, default=8)
+    parser.add_argument("--team-leads", type=int, default=2)
+    parser.add_argument("--treasurers", type=int, default=1)
+    parser.add_argument("--actions", type=int, default=15, help="Actions per session")
+    parser.add_argument("--duration", type=float, default=None, help="Stop starting new actions after this many seconds")
+    parser.add_argument("--expenses", type=int, default=300, help="Size of the generated database")
+    parser.add_argument("--data", help="Directory of an existing database to copy instead of generating one")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_test.json")
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument("--verify", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.verify:
+        with open(args.verify, 'r', encoding='utf-8') as f:
+            verify(json.load(f))
+        return
+
+    if args.students + args.team_leads + args.treasurers < 1:
+        parser.error("at least one session is needed")
+    data_dir = prepare_database(args)
+    try:
+        recorder, wall_s = (run_stress if args.mode == "stress" else run_sessions)(data_dir, args)
+        expected_path = os.path.join(data_dir, 'load_test_expected.json')
+        with open(expected_path, 'w', encoding='utf-8') as f:
+            json.dump(recorder.expected, f)
+        check = subprocess.run([sys.executable, os.path.abspath(__file__), "--verify", expected_path],
+                               cwd=data_dir, capture_output=True, text=True, check=True)
+        problems = json.loads(check.stdout.strip().splitlines()[-1])
+    finally:
+        if args.keep_data:
+            print(f"database kept in {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = summarize(recorder, wall_s, problems, args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    unit = "calls" if args.mode == "stress" else "reruns"
+    writers = args.students + args.team_leads + args.treasurers
+    sessions = f"{writers} writers, {args.readers} readers" if args.mode == "stress" else f"{writers} sessions"
+    print(f"{sessions}, {report[unit]} {unit} in {wall_s:.1f} s ({report[f'{unit}_per_s']:.1f} {unit}/s); changes: {report['changes']}")
+    for action, stats in report['actions'].items():
+        print(f"    {action:<28} n={stats['count']:<5} p50 {stats['p50_s'] * 1000:8.0f} ms   p90 {stats['p90_s'] * 1000:8.0f} ms"
+              f"   p99 {stats['p99_s'] * 1000:8.0f} ms   max {stats['max_s'] * 1000:8.0f} ms")
+    for error in report['errors']:
+        print(f"ERROR {error}")
+    for problem in problems:
+        print(f"INCONSISTENT {problem}")
+    print(f"Results written to {args.output}")
+    if problems or (args.mode == "stress" and report['errors']):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
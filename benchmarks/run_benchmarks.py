@@ -0,0 +1,190 @@
+"""
+Benchmark suite for the hot storage, workflow, dashboard and report paths.
+
+For each scale it generates a synthetic dataset with benchmarks/datagen.py, then times the
+operations below in a fresh interpreter (so the first load is really cold), and writes every
+timing to a JSON file that later runs can be compared against:
+
+    python benchmarks/run_benchmarks.py [--scales 1000,10000] [--repeat 3] [--output results.json]
+    python benchmarks/run_benchmarks.py --compare results.json     # flags operations that got slower
+
+Read operations run against one event of the dataset (a third of its expenses by default);
+approve and reimburse use a fresh batch of records on every repeat.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCALES = [1000, 10000]
+BATCH_SIZE = 100  # Records per approve/reimburse call, like a bulk action in the UI
+REGRESSION_THRESHOLD = 1.2  # --compare flags operations whose median grew by more than this factor...
+NOISE_FLOOR_S = 0.001  # ...and by more than this many seconds, so sub-millisecond jitter is not flagged
+
+# --- Worker (runs inside the dataset directory) ---
+def _timed(fn, repeat):
+    """Runs fn() `repeat` times; returns its timing summary and the last result."""
+    samples, result = [], None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = fn(i)
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "max_s": max(samples), "samples": samples}, result
+
+def dashboard_frame(api, event):
+    """The dashboard's aggregation work: the cleaned expense frame plus its KPI and chart groupings."""
+    df = api.get_expense_frame(event['id'])
+    df = df[df['submitted_at'].notna()]
+    approved = df[df['status'].isin(['Approved', 'Reimbursed'])]
+    approved['amount'].sum()
+    approved.groupby('category', observed=True)['amount'].sum()
+    df.groupby('user', observed=True)['amount'].sum().sort_values(ascending=True).tail(5)
+    df['status'].value_counts()
+    df.groupby('category', observed=True)['amount'].mean().sort_values(ascending=False).reset_index()
+    return df
+
+def run_worker(event_id, repeat, batch_size):
+    sys.path.insert(0, REPO_DIR)
+    import mock_api as api
+    results = {}
+    start = time.perf_counter()
+    api.get_expenses(event_id)
+    results["load (cold)"] = {"median_s": time.perf_counter() - start, "samples": 1}
+
+    import chart_data
+    import predictions
+    import report_generator
+    event = api.get_event_by_id(event_id)
+    users = {u['username']: u for u in api.load_data(api.USERS_FILE)}
+    team_lead, treasurer = users['team_lead'], users['treasurer']
+
+    def measure(name, fn, **details):
+        results[name], result = _timed(fn, repeat)
+        results[name].update(details)
+        return result
+
+    measure("load event", lambda i: api.get_expenses(event_id))
+    measure("load all events", lambda i: api.get_expenses(None, include_archived=True))
+    measure("pending queue (team lead)", lambda i: api.get_pending_requests('team_lead', event_id))
+    measure("pending queue (treasurer)", lambda i: api.get_pending_requests('treasurer', event_id))
+    measure("pending counts", lambda i: api.get_pending_counts('treasurer', event_id))
+    measure("search", lambda i: api.search_expenses('banner', event_id=event_id))
+    measure("analytics frame (cold)", lambda i: api._expense_columns.clear() or api.get_expense_frame(event_id))
+    df = measure("dashboard aggregation", lambda i: dashboard_frame(api, event))
+
+    def forecast(i):
+        chart_data._figure_cache.clear()  # Time the build, not a cache hit
+        return predictions.generate_forecast_chart(event, df.copy())
+    measure("forecast", forecast)
+
+    reimbursed_df = api.get_reimbursed_frame(event_id)
+    measure("report JSON", lambda i: report_generator.generate_json_report(event, reimbursed_df))
+    measure("report PDF", lambda i: report_generator.generate_report(event, reimbursed_df))
+
+    # Writes last, each repeat on records no earlier repeat touched.
+    expenses = api.get_expenses(event_id)
+    pending = [e['id'] for e in expenses if e['status'] == 'Pending Team Lead']
+    approved = [e['id'] for e in expenses if e['status'] == 'Approved']
+    measure("approve one", lambda i: api.approve_expense_step(pending[i], team_lead))
+    pending = pending[repeat:]
+    # Small datasets may not hold `repeat` full batches; the batch size used is recorded.
+    batch = max(min(batch_size, len(pending) // repeat), 1)
+    measure("approve batch", lambda i: api.approve_expenses(pending[i * batch:(i + 1) * batch], team_lead), batch_size=batch)
+    batch = max(min(batch_size, len(approved) // repeat), 1)
+    measure("reimburse batch", lambda i: api.reimburse_expenses({e: f"BENCH{e}" for e in approved[i * batch:(i + 1) * batch]}, treasurer),
+            batch_size=batch)
+    print(json.dumps(results))
+
+# --- Driver ---
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _python(args, cwd=None):
+    result = subprocess.run([sys.executable] + args, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_scale(expenses, args):
+    data_dir = tempfile.mkdtemp(prefix=f"festflow_bench_{expenses}_")
+    try:
+        start = time.perf_counter()
+        dataset = _python([os.path.join(BENCH_DIR, "datagen.py"), "--out", data_dir, "--expenses", str(expenses),
+                           "--events", str(args.events), "--seed", str(args.seed)])
+        generate_seconds = time.perf_counter() - start
+        operations = _python([os.path.abspath(__file__), "--worker", "--event-id", "1", "--repeat", str(args.repeat),
+                              "--batch", str(args.batch)], cwd=data_dir)
+    finally:
+        if args.keep_data:
+            print(f"dataset kept in {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return {"scale": expenses, "dataset": dataset, "generate_s": generate_seconds, "operations": operations}
+
+def compare(old, new, threshold):
+    """Prints each operation's median against the old run; returns the number of regressions."""
+    old_runs = {run['scale']: run['operations'] for run in old['results']}
+    regressions = 0
+    for run in new['results']:
+        for name, timing in run['operations'].items():
+            before = old_runs.get(run['scale'], {}).get(name)
+            if not before:
+                continue
+            ratio = timing['median_s'] / max(before['median_s'], 1e-9)
+            slower = ratio > threshold and timing['median_s'] - before['median_s'] > NOISE_FLOOR_S
+            flag = "  REGRESSION" if slower else ""
+            regressions += bool(flag)
+            print(f"{run['scale']:>9,}  {name:<28} {before['median_s'] * 1000:10.1f} ms -> {timing['median_s'] * 1000:10.1f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="Comma-separated expense counts")
+    parser.add_argument("--events", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--keep-data", action="store_true", help="Keep the generated datasets")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--event-id", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.event_id, args.repeat, args.batch)
+        return
+
+    report = {"generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "git_commit": _git_commit(),
+              "python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat, "results": []}
+    for expenses in (int(s) for s in args.scales.split(",")):
+        run = run_scale(expenses, args)
+        report['results'].append(run)
+        print(f"{expenses:>9,} expenses  (generated in {run['generate_s']:.1f} s)")
+        for name, timing in run['operations'].items():
+            print(f"    {name:<28} median {timing['median_s'] * 1000:10.1f} ms")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        if compare(old, report, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
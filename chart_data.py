@@ -0,0 +1,78 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import instrumentation
+
+# --- Chart Data Reduction Settings ---
+MAX_POINTS_PER_TRACE = 2000  # Time series longer than this are downsampled with LTTB
+WEBGL_POINT_THRESHOLD = 1000  # Traces with more points than this are drawn with Scattergl
+FIGURE_CACHE_SIZE = 32
+
+_figure_cache = OrderedDict()
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of at most `threshold`
+    points that keep the visual shape of the series; the first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)  # Bucket boundaries over the inner points
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # Twice the triangle area between the previous pick, each candidate and the next bucket's average
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+def line_trace(x, y, **trace_kwargs):
+    """Builds a line trace, downsampled to MAX_POINTS_PER_TRACE and drawn with WebGL when it is large."""
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x) > MAX_POINTS_PER_TRACE:
+        # LTTB needs numeric x; datetimes are compared as int64 nanoseconds.
+        numeric_x = x.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+        keep = lttb_indices(numeric_x, y, MAX_POINTS_PER_TRACE)
+        x, y = x[keep], y[keep]
+    trace_class = go.Scattergl if len(x) > WEBGL_POINT_THRESHOLD else go.Scatter
+    return trace_class(x=x, y=y, **trace_kwargs)
+
+def fingerprint(*parts):
+    """Stable hash of the data a chart is built from. DataFrames and Series are hashed by content."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+@instrumentation.timed
+def cached_figure(key, build):
+    """
+    Returns the figure stored under `key`, calling build() only on a miss. Keys should come
+    from fingerprint() over everything the figure depends on, so unchanged data skips the
+    Plotly figure construction on every rerun.
+    """
+    if key in _figure_cache:
+        _figure_cache.move_to_end(key)
+        return _figure_cache[key]
+    value = build()
+    _figure_cache[key] = value
+    if len(_figure_cache) > FIGURE_CACHE_SIZE:
+        _figure_cache.popitem(last=False)
+    return value
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+
+import instrumentation
+
+def _json_default(o):
+    return o.isoformat() if hasattr(o, 'isoformat') else str(o)
+
+class CommentStore:
+    """
+    Comment threads kept apart from the records they belong to: an append-only file with one
+    JSON comment per line, tagged with its parent's collection and id. Nothing is read until a
+    thread is asked for; after that, refresh() picks up lines appended by any process since.
+    A store is shared by the threads of a process, so reading the file tail and indexing it are
+    done under the store's lock.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._threads = {}  # (collection, parent id) -> comments, oldest first
+        self.offset = 0
+
+    @instrumentation.timed(name="CommentStore.refresh")
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.file_path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if size < self.offset:
+            self._reset()  # File was replaced
+        if size == self.offset:
+            return
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        instrumentation.count_read(len(chunk))
+        complete = chunk.rfind(b'\n') + 1  # Leave a partially written last line for the next refresh
+        for line in chunk[:complete].splitlines():
+            if line.strip():
+                comment = json.loads(line)
+                key = (comment.pop('collection'), comment.pop('parent_id'))
+                self._threads.setdefault(key, []).append(comment)
+        self.offset += complete
+
+    def threads(self, collection, parent_ids=None):
+        """{parent id: comments} for the given parents (every parent with comments if None)."""
+        with self._lock:
+            self._refresh()
+            if parent_ids is None:
+                return {parent_id: comments for (c, parent_id), comments in self._threads.items() if c == collection}
+            return {parent_id: self._threads.get((collection, parent_id), []) for parent_id in parent_ids}
+
+    def comments_since(self, offset):
+        """The comments appended from byte `offset` up to what has been read, after a refresh, tagged with their parent."""
+        with self._lock:
+            self._refresh()
+            if offset >= self.offset:
+                return []
+            with open(self.file_path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(self.offset - offset)
+        instrumentation.count_read(len(chunk))
+        return [json.loads(line) for line in chunk.splitlines() if line.strip()]
+
+    def add(self, collection, comments_by_parent):
+        """Appends comments given as {parent id: [comment, ...]} in one write."""
+        lines = [json.dumps({'collection': collection, 'parent_id': parent_id, **comment}, default=_json_default) + '\n'
+                 for parent_id, comments in comments_by_parent.items() for comment in comments]
+        if lines:
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+            instrumentation.count_written(sum(map(len, lines)))
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+
+import instrumentation
+
+SNAPSHOT_EVERY_EVENTS = 500  # Write a new snapshot once this many events have been applied since the last one
+
+def _json_default(o):
+    return o.isoformat() if hasattr(o, 'isoformat') else str(o)
+
+def diff_record(old, new):
+    """
+    Returns the (set, append) patch that turns `old` into `new`: changed top-level fields,
+    except lists that only grew at the end, whose new items go to `append`.
+    """
+    changed, appended = {}, {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if previous == value:
+            continue
+        if isinstance(previous, list) and isinstance(value, list) and value[:len(previous)] == previous:
+            appended[key] = value[len(previous):]
+        else:
+            changed[key] = value
+    return changed, appended
+
+class EventStore:
+    """
+    Records of several collections kept as an append-only event stream (one JSON event per line)
+    plus periodic snapshots. Current state is the latest snapshot folded with the events written
+    after it, so a change costs one appended line. Every event also carries 'timestamp', 'user' and
+    'action', so the stream doubles as the activity log; lines without a 'collection' are plain
+    log entries and are skipped here.
+
+    Writers must hold an exclusive lock around refresh(), validation and append(); readers only
+    call refresh(), which picks up lines appended by any process since the last call. One store
+    is shared by every thread of a process, so the in-memory state is guarded by a lock of its own.
+
+    compact() folds the log into a snapshot and starts a new, empty log generation
+    (events.jsonl, events.1.jsonl, ...); the snapshot names the generation it continues from.
+    """
+
+    def __init__(self, log_path, snapshot_path, collections, snapshot_every=SNAPSHOT_EVERY_EVENTS):
+        self.base_log_path = log_path
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.collections = tuple(collections)
+        self.snapshot_every = snapshot_every
+        self._loaded = False
+        self._records = {c: {} for c in self.collections}
+        self.offset = 0
+        self.generation = 0
+        self._since_snapshot = 0
+        self._snapshot_stamp = None
+        self._lock = threading.RLock()  # Guards the records and offsets against concurrent refreshes
+
+    # --- Loading ---
+    def has_snapshot(self):
+        return os.path.exists(self.snapshot_path)
+
+    def _generation_path(self, generation):
+        if generation == 0:
+            return self.base_log_path
+        root, ext = os.path.splitext(self.base_log_path)
+        return f"{root}.{generation}{ext}"
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @instrumentation.timed(name="EventStore.load_snapshot")
+    def _load_snapshot(self):
+        self._records = {c: {} for c in self.collections}
+        self.offset = 0
+        self.generation = 0
+        self._since_snapshot = 0
+        self._snapshot_stamp = self._stamp()
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                instrumentation.count_read(os.fstat(f.fileno()).st_size)
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            snapshot = {'offset': 0, 'collections': {}}
+        self.offset = snapshot['offset']
+        self.generation = snapshot.get('log_generation', 0)
+        self.log_path = self._generation_path(self.generation)
+        for collection, records in snapshot['collections'].items():
+            self._records[collection] = {r['id']: r for r in records}
+
+    @instrumentation.timed(name="EventStore.refresh")
+    def refresh(self):
+        """Applies the lines appended since the last call, from any process."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        if not self._loaded:
+            self._load_snapshot()
+            self._loaded = True
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            size = 0
+            if self._stamp() != self._snapshot_stamp:
+                self._load_snapshot()  # Compacted by another process; continue from its snapshot
+                return self._refresh()
+        if size < self.offset:
+            self._load_snapshot()  # The log was replaced; start over from the snapshot
+        if size <= self.offset:
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        instrumentation.count_read(len(chunk))
+        complete = chunk.rfind(b'\n') + 1  # Leave a partially written last line for the next refresh
+        for line in chunk[:complete].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self.offset += complete
+
+    def _apply(self, event):
+        collection = event.get('collection')
+        if collection not in self._records:
+            return
+        records = self._records[collection]
+        if event['type'] == 'create':
+            records[event['id']] = event['record']
+        elif event['type'] == 'archive':
+            for record_id in event['ids']:
+                records.pop(record_id, None)  # Moved to a cold archive segment
+        else:
+            record = records.get(event['id'])
+            if record is None:
+                return
+            # Copy on write, so records handed out earlier never change underneath their reader.
+            record = {**record, **event.get('set', {})}
+            for field, items in event.get('append', {}).items():
+                record[field] = record.get(field, []) + items
+            for field in event.get('unset', ()):
+                record.pop(field, None)
+            records[event['id']] = record
+        self._since_snapshot += 1
+
+    # --- Reading ---
+    def records(self, collection):
+        """The collection's current records in id order. Nested values are shared; treat them as read-only."""
+        with self._lock:
+            self._refresh()
+            return list(self._records[collection].values())
+
+    def get(self, collection, record_id):
+        self.refresh()
+        return self._records[collection].get(record_id)
+
+    def events_since(self, offset):
+        """
+        The events and log entries of the current log generation from byte `offset` up to what
+        has been applied, after a refresh. Callers compare `generation` to know the offset still applies.
+        """
+        with self._lock:
+            self._refresh()
+            if offset >= self.offset:
+                return []
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(self.offset - offset)
+        instrumentation.count_read(len(chunk))
+        return [json.loads(line) for line in chunk.splitlines() if line.strip()]
+
+    def next_id(self, collection):
+        with self._lock:
+            self._refresh()
+            records = self._records[collection]
+            return max(records) + 1 if records else 1
+
+    # --- Writing ---
+    @staticmethod
+    def create_event(collection, record, **entry):
+        return {**entry, 'collection': collection, 'id': record['id'], 'type': 'create', 'record': record}
+
+    @staticmethod
+    def archive_event(collection, record_ids, **entry):
+        return {**entry, 'collection': collection, 'ids': list(record_ids), 'type': 'archive'}
+
+    @staticmethod
+    def update_event(collection, record_id, changed=None, appended=None, unset=None, **entry):
+        event = {**entry, 'collection': collection, 'id': record_id, 'type': 'update'}
+        if changed:
+            event['set'] = changed
+        if appended:
+            event['append'] = appended
+        if unset:
+            event['unset'] = unset
+        return event
+
+    def append(self, events):
+        """Appends events (or plain log entries) in one write and applies them. Call under the write lock."""
+        if not events:
+            return
+        lines = ''.join(json.dumps(event, default=_json_default) + '\n' for event in events)
+        with self._lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            instrumentation.count_written(len(lines))
+            self._refresh()
+            if self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+    def snapshot(self):
+        """Writes the current state and the log offset it corresponds to. Call under the write lock."""
+        with self._lock:
+            self._refresh()
+            self._write_snapshot(self.generation, self.offset)
+
+    def _write_snapshot(self, generation, offset):
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'log_generation': generation, 'offset': offset,
+                       'collections': {c: list(records.values()) for c, records in self._records.items()}},
+                      f, default=_json_default)
+            instrumentation.count_written(f.tell())
+        os.replace(temp_path, self.snapshot_path)
+        self._snapshot_stamp = self._stamp()
+        self._since_snapshot = 0
+
+    def compact(self):
+        """
+        Folds every event into a new snapshot and switches to a fresh, empty log generation, then
+        deletes the old log. Returns the bytes of log reclaimed. Call under the write lock.
+        """
+        with self._lock:
+            self._refresh()
+            if self.offset == 0:
+                return 0
+            old_path, reclaimed = self.log_path, self.offset
+            new_generation = self.generation + 1
+            new_path = self._generation_path(new_generation)
+            open(new_path, 'a').close()  # Exists before the snapshot points at it
+            self._write_snapshot(new_generation, 0)  # The switch-over: atomic, so a crash leaves one consistent pair
+            self.generation, self.log_path, self.offset = new_generation, new_path, 0
+        os.remove(old_path)
+        return reclaimed
+
+    def import_records(self, records_by_collection):
+        """Seeds the store from existing record lists (e.g. the old JSON files) and snapshots it."""
+        with self._lock:
+            self._refresh()
+            for collection, records in records_by_collection.items():
+                self._records[collection] = {r['id']: r for r in records}
+            self.snapshot()
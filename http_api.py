@@ -0,0 +1,383 @@
+"""
+Headless HTTP API over mock_api, for integrations and bulk clients that should not drive the UI.
+
+Runs on the standard library's asyncio; the blocking mock_api calls go to a bounded thread pool,
+and writes are serialized by mock_api's storage lock. Requests use HTTP Basic auth with the
+app's usernames and passwords, and bodies and responses are JSON.
+
+    python http_api.py --host 127.0.0.1 --port 8502
+
+    GET  /events
+    GET  /expenses?event_id=&status=&user=&archived=1&comments=1&offset=&limit=
+    GET  /expenses/pending?event_id=&offset=&limit=
+    POST /expenses               {"event_id", "amount", "category", "description", "receipt": {"name", "content_base64"}}
+                                 or {"event_id", "items": [...]} to submit many at once
+    POST /expenses/approve       {"ids": [...]}
+    POST /expenses/reject        {"ids": [...], "reason"}
+    POST /expenses/reimburse     {"transactions": {"<id>": "<transaction id>", ...}}
+    POST /expenses/<id>/comments {"text"}
+    GET  /advances?event_id=&status=&user=&archived=1&comments=1&offset=&limit=
+    GET  /advances/pending?event_id=&offset=&limit=
+    POST /advances               {"event_id", "vendor", "purpose", "amount", "quote": {"name", "content_base64"}}
+    POST /advances/approve | /advances/reject | /advances/pay   (same bodies as for expenses)
+    POST /advances/<id>/comments {"text"}
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import io
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import mock_api as api
+
+API_WORKERS = 8  # Threads for blocking storage calls; bounds the work in flight
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BODY_BYTES = 50 * 1024 * 1024
+MAX_BATCH_SIZE = 1000
+KEEP_ALIVE_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+            404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+APPROVER_ROLES = ("team_lead", "treasurer")
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# --- Request Helpers ---
+def _require(body, *fields):
+    missing = [f for f in fields if body.get(f) in (None, '')]
+    if missing:
+        raise HTTPError(400, f"Missing field(s): {', '.join(missing)}")
+
+def _require_role(user, *roles):
+    if user['role'] not in roles:
+        raise HTTPError(403, f"Requires role: {' or '.join(roles)}")
+
+def _require_visible(user, record, label):
+    """404s if the record is missing or, for a student, someone else's: students only ever see their own."""
+    if record is None or (user['role'] == 'student' and record.get('user') != user['username']):
+        raise HTTPError(404, f"{label} not found")
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{name}' must be an integer")
+
+def _amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "'amount' must be a number")
+    if amount <= 0:
+        raise HTTPError(400, "'amount' must be positive")
+    return amount
+
+def _decode_file(value, name):
+    """Turns {"name", "content_base64"} into the file-like object mock_api expects from st.file_uploader."""
+    if not isinstance(value, dict) or not value.get('name') or not value.get('content_base64'):
+        raise HTTPError(400, f"'{name}' must be an object with 'name' and 'content_base64'")
+    try:
+        f = io.BytesIO(base64.b64decode(value['content_base64'], validate=True))
+    except (binascii.Error, ValueError):
+        raise HTTPError(400, f"'{name}.content_base64' is not valid base64")
+    f.name = value['name']
+    return f
+
+def _ids(body):
+    ids = body.get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise HTTPError(400, "'ids' must be a non-empty list")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPError(400, f"At most {MAX_BATCH_SIZE} ids per request")
+    return [_int(i, 'ids') for i in ids]
+
+def _transactions(body):
+    transactions = body.get('transactions')
+    if not isinstance(transactions, dict) or not transactions:
+        raise HTTPError(400, "'transactions' must be a non-empty object of id -> transaction id")
+    if len(transactions) > MAX_BATCH_SIZE:
+        raise HTTPError(400, f"At most {MAX_BATCH_SIZE} transactions per request")
+    if not all(isinstance(t, str) and t.strip() for t in transactions.values()):
+        raise HTTPError(400, "Every transaction id must be a non-empty string")
+    return {_int(k, 'transactions'): v.strip() for k, v in transactions.items()}
+
+def _batch_response(results):
+    return {"results": results, "succeeded": sum(1 for r in results if r['ok']), "failed": sum(1 for r in results if not r['ok'])}
+
+def _query_event_id(query):
+    """The ?event_id= filter; reads are routed to that event's partition."""
+    return _int(query['event_id'], 'event_id') if query.get('event_id') else None
+
+def _query_archived(query):
+    """?archived=1 also lists settled records moved to the archive."""
+    return query.get('archived', '').lower() in ('1', 'true', 'yes')
+
+def _query_comments(query):
+    """?comments=1 attaches each listed record's comment thread, fetched for the whole page at once."""
+    return query.get('comments', '').lower() in ('1', 'true', 'yes')
+
+def _slice(records, query):
+    """The ?offset=&limit= page of records, with the total and the offset of the next page."""
+    offset = max(_int(query.get('offset', 0), 'offset'), 0)
+    limit = min(max(_int(query.get('limit', DEFAULT_PAGE_SIZE), 'limit'), 1), MAX_PAGE_SIZE)
+    page = records[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(records) else None
+    return {"items": page, "total": len(records), "offset": offset, "next_offset": next_offset}
+
+def _page(records, query, user):
+    """Filters records by status/user (students only ever see their own) and slices a page."""
+    if user['role'] == 'student':
+        records = [r for r in records if r.get('user') == user['username']]
+    elif query.get('user'):
+        records = [r for r in records if r.get('user') == query['user']]
+    if query.get('status'):
+        records = [r for r in records if r.get('status') == query['status']]
+    return _slice(records, query)
+
+# --- Handlers ---
+# Each handler runs on the worker pool as handler(user, query, body, *path_args) -> (status, payload).
+def list_events(user, query, body):
+    return 200, {"items": api.get_events_for_user(user)}
+
+def _list(records, collection, query, user):
+    page = _page(records, query, user)
+    if _query_comments(query):
+        threads = api.get_comments(collection, [r['id'] for r in page['items']])
+        page['items'] = [{**r, "comments": threads[r['id']]} for r in page['items']]
+    return 200, page
+
+def list_expenses(user, query, body):
+    return _list(api.get_expenses(_query_event_id(query), _query_archived(query)), "expenses", query, user)
+
+def list_advances(user, query, body):
+    return _list(api.get_advances(_query_event_id(query), _query_archived(query)), "advances", query, user)
+
+def _pending(records, collection, query, user):
+    _require_role(user, *APPROVER_ROLES)
+    statuses = api.PENDING_STATUSES[collection][user['role']]
+    return 200, _slice([r for r in records if r.get('status') in statuses], query)
+
+def pending_expenses(user, query, body):
+    return _pending(api.get_expenses(_query_event_id(query)), "expenses", query, user)
+
+def pending_advances(user, query, body):
+    return _pending(api.get_advances(_query_event_id(query)), "advances", query, user)
+
+def _event_id(body):
+    event_id = _int(body.get('event_id'), 'event_id')
+    if api.get_event_by_id(event_id) is None:
+        raise HTTPError(400, f"Unknown event {event_id}")
+    return event_id
+
+def submit_expenses(user, query, body):
+    event_id = _event_id(body)
+    items = body['items'] if 'items' in body else [body]
+    if not isinstance(items, list) or not items or len(items) > MAX_BATCH_SIZE:
+        raise HTTPError(400, f"'items' must be a list of 1 to {MAX_BATCH_SIZE} expenses")
+    expenses = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise HTTPError(400, "Every entry of 'items' must be an object")
+        _require(item, 'amount', 'category', 'description', 'receipt')
+        expenses.append({"amount": _amount(item['amount']), "category": item['category'],
+                         "description": item['description'], "receipt_file": _decode_file(item['receipt'], 'receipt'),
+                         "ocr_text": item.get('ocr_text', '')})
+    return 201, {"items": api.add_expenses(event_id, user, expenses)}
+
+def approve_expenses(user, query, body):
+    _require_role(user, *APPROVER_ROLES)
+    return 200, _batch_response(api.approve_expenses(_ids(body), user))
+
+def reject_expenses(user, query, body):
+    _require_role(user, *APPROVER_ROLES)
+    _require(body, 'reason')
+    return 200, _batch_response(api.reject_expenses(_ids(body), user, body['reason']))
+
+def reimburse_expenses(user, query, body):
+    _require_role(user, "treasurer")
+    return 200, _batch_response(api.reimburse_expenses(_transactions(body), user))
+
+def comment_on_expense(user, query, body, expense_id):
+    _require(body, 'text')
+    _require_visible(user, api.get_expense(int(expense_id)), f"Expense {expense_id}")
+    if not api.add_comment_to_expense(int(expense_id), user, body['text']):
+        raise HTTPError(404, f"Expense {expense_id} not found")
+    return 201, {"ok": True}
+
+def submit_advance(user, query, body):
+    _require(body, 'vendor', 'purpose', 'amount')
+    quote = _decode_file(body['quote'], 'quote') if body.get('quote') else None
+    return 201, api.add_advance_request(user, _event_id(body), body['vendor'], body['purpose'], _amount(body['amount']), quote)
+
+def approve_advances(user, query, body):
+    _require_role(user, "team_lead")
+    return 200, _batch_response(api.approve_advances(_ids(body), user))
+
+def reject_advances(user, query, body):
+    _require_role(user, "team_lead")
+    return 200, _batch_response(api.reject_advances(_ids(body), user, body.get('reason')))
+
+def pay_advances(user, query, body):
+    _require_role(user, "treasurer")
+    return 200, _batch_response(api.pay_advances(_transactions(body), user))
+
+def comment_on_advance(user, query, body, advance_id):
+    _require(body, 'text')
+    _require_visible(user, api.get_advance(int(advance_id)), f"Advance {advance_id}")
+    if not api.add_comment_to_advance(int(advance_id), user, body['text']):
+        raise HTTPError(404, f"Advance {advance_id} not found")
+    return 201, {"ok": True}
+
+ROUTES = [
+    ("GET", r"/events", list_events),
+    ("GET", r"/expenses", list_expenses),
+    ("GET", r"/expenses/pending", pending_expenses),
+    ("POST", r"/expenses", submit_expenses),
+    ("POST", r"/expenses/approve", approve_expenses),
+    ("POST", r"/expenses/reject", reject_expenses),
+    ("POST", r"/expenses/reimburse", reimburse_expenses),
+    ("POST", r"/expenses/(\d+)/comments", comment_on_expense),
+    ("GET", r"/advances", list_advances),
+    ("GET", r"/advances/pending", pending_advances),
+    ("POST", r"/advances", submit_advance),
+    ("POST", r"/advances/approve", approve_advances),
+    ("POST", r"/advances/reject", reject_advances),
+    ("POST", r"/advances/pay", pay_advances),
+    ("POST", r"/advances/(\d+)/comments", comment_on_advance),
+]
+_COMPILED_ROUTES = [(method, re.compile(pattern + r"/?"), handler) for method, pattern, handler in ROUTES]
+
+def _resolve(method, path):
+    allowed = False
+    for route_method, pattern, handler in _COMPILED_ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            if route_method == method:
+                return handler, match.groups()
+            allowed = True
+    raise HTTPError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+def _authenticate(headers):
+    scheme, _, credentials = headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'basic':
+        raise HTTPError(401, "Basic authentication required")
+    try:
+        username, _, password = base64.b64decode(credentials).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPError(401, "Malformed credentials")
+    user = api.authenticate_user(username, password)
+    if user is None:
+        raise HTTPError(401, "Invalid username or password")
+    return user
+
+def handle_request(method, target, headers, raw_body):
+    """Authenticates, routes and runs one request. Blocking; called on the worker pool."""
+    url = urlsplit(target)
+    handler, path_args = _resolve(method, url.path)
+    user = _authenticate(headers)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    body = {}
+    if raw_body:
+        try:
+            body = json.loads(raw_body)
+        except ValueError:
+            raise HTTPError(400, "Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+    return handler(user, query, body, *path_args)
+
+def _run_request(method, target, headers, raw_body):
+    try:
+        return handle_request(method, target, headers, raw_body)
+    except HTTPError as e:
+        return e.status, {"error": e.message}
+    except Exception:
+        logger.exception("Unhandled error in %s %s", method, target)
+        return 500, {"error": "Internal server error"}
+
+# --- Server ---
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, target, version = request_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, version, headers, body
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, default=api.json_default_converter, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 401:
+        head += 'WWW-Authenticate: Basic realm="FestFlow"\r\n'
+    return (head + "\r\n").encode('latin-1') + body
+
+async def _serve_connection(reader, writer):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                request = await asyncio.wait_for(_read_request(reader), KEEP_ALIVE_SECONDS)
+            except HTTPError as e:
+                writer.write(_response(e.status, {"error": e.message}, False))
+                break
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(_response(400, {"error": "Malformed request"}, False))
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+            status, payload = await loop.run_in_executor(_executor, _run_request, method, target, headers, body)
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host, port):
+    await asyncio.get_running_loop().run_in_executor(_executor, api.setup_database)
+    server = await asyncio.start_server(_serve_connection, host, port)
+    print(f"FestFlow API listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the FestFlow HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
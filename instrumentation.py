@@ -0,0 +1,117 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = 'metrics.jsonl'  # One JSON line per profiled rerun, when exporting is switched on
+MAX_METRICS_BYTES = 5 * 1024 * 1024  # Past this size metrics.jsonl rolls over to metrics.1.jsonl
+PROFILE_HISTORY_SIZE = 20  # Reruns kept per session for the profile panel
+
+# The profile being recorded on this thread. Streamlit runs each session's rerun on its own
+# script thread, so concurrent sessions never mix their numbers; with no profile active,
+# every hook below costs one attribute lookup.
+_local = threading.local()
+
+class RerunProfile:
+    """Call counts, wall time and storage bytes read/written during one rerun."""
+
+    def __init__(self, label=''):
+        self.label = label
+        self.started_at = time.time()
+        self.wall_s = 0.0
+        self.calls = {}  # name -> [count, total seconds, max seconds]
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def record(self, name, seconds):
+        stats = self.calls.get(name)
+        if stats is None:
+            self.calls[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def to_dict(self):
+        return {
+            "label": self.label, "started_at": self.started_at, "wall_s": self.wall_s,
+            "bytes_read": self.bytes_read, "bytes_written": self.bytes_written,
+            "calls": {name: {"count": c, "total_s": t, "max_s": m}
+                      for name, (c, t, m) in sorted(self.calls.items(), key=lambda item: -item[1][1])},
+        }
+
+def active():
+    """The profile being recorded on this thread, or None."""
+    return getattr(_local, 'profile', None)
+
+@contextmanager
+def profile_rerun(label='', on_finish=None):
+    """
+    Records everything the instrumented code does on this thread until the block exits, then
+    calls on_finish(profile), also when the block was cut short (e.g. by st.rerun()).
+    """
+    profile = RerunProfile(label)
+    _local.profile = profile
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.wall_s = time.perf_counter() - start
+        _local.profile = None
+        if on_finish:
+            on_finish(profile)
+
+@contextmanager
+def span(name):
+    """Times a block under `name` in the active profile, if there is one."""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, time.perf_counter() - start)
+
+def timed(func=None, name=None):
+    """Decorator: counts and times each call in the active profile, as module.function unless `name` is given."""
+    if func is None:
+        return lambda f: timed(f, name)
+    label = name or f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.record(label, time.perf_counter() - start)
+    return wrapper
+
+def count_read(nbytes):
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.bytes_read += nbytes
+
+def count_written(nbytes):
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.bytes_written += nbytes
+
+# --- Export ---
+def export(profile_dict, path=METRICS_FILE, max_bytes=MAX_METRICS_BYTES):
+    """Appends a finished profile to the rolling metrics file, first rolling it over if it is full."""
+    try:
+        if os.path.getsize(path) >= max_bytes:
+            root, ext = os.path.splitext(path)
+            os.replace(path, f"{root}.1{ext}")
+    except FileNotFoundError:
+        pass
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(profile_dict) + '\n')
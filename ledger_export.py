@@ -0,0 +1,152 @@
+"""
+Streaming export of the reimbursed-expense ledger as CSV, NDJSON or Parquet.
+
+Expenses are read one event at a time (archived ones streamed from their segments) and rows
+are written in bounded chunks straight to a file or file-like object, so exporting a full year
+does not build a list of every expense, a DataFrame or one large string in memory. Parquet
+needs pyarrow.
+
+    python ledger_export.py ledger_2024.csv --from 2024-01-01 --to 2024-12-31
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+
+import mock_api as api
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+LEDGER_COLUMNS = ['id', 'event_id', 'user', 'description', 'amount', 'category', 'transaction_id', 'submitted_at', 'reimbursed_at']
+EXPORT_CHUNK_ROWS = 5000
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt != 'parquet' or pq is not None]
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+def iter_ledger(event_id=None, start=None, end=None, columns=None):
+    """Yields reimbursed expenses as dicts of the selected columns, filtered by event and reimbursement date."""
+    columns = columns or LEDGER_COLUMNS
+    for expense in api.iter_expenses(event_id, include_archived=True):
+        if expense.get('status') != 'Reimbursed':
+            continue
+        if start or end:
+            reimbursed_at = _as_datetime(expense.get('reimbursed_at'))
+            if reimbursed_at is None or (start and reimbursed_at < start) or (end and reimbursed_at > end):
+                continue
+        yield {column: expense.get(column) for column in columns}
+
+def _chunks(rows, chunk_rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _write_csv(out, rows, columns, chunk_rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for chunk in _chunks(rows, chunk_rows):
+        writer.writerows(chunk)
+        out.write(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+    out.write(buffer.getvalue().encode('utf-8'))
+
+def _write_ndjson(out, rows, columns, chunk_rows):
+    for chunk in _chunks(rows, chunk_rows):
+        out.write(''.join(json.dumps(row, default=api.json_default_converter, ensure_ascii=False) + '\n' for row in chunk).encode('utf-8'))
+
+def _parquet_type(column):
+    if column in ('id', 'event_id'):
+        return pa.int64()
+    if column == 'amount':
+        return pa.float64()
+    if column in ('submitted_at', 'reimbursed_at'):
+        return pa.timestamp('us')
+    return pa.string()
+
+def _write_parquet(out, rows, columns, chunk_rows):
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    schema = pa.schema([(column, _parquet_type(column)) for column in columns])
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in _chunks(rows, chunk_rows):
+            arrays = {column: [_as_datetime(row[column]) if pa.types.is_timestamp(schema.field(column).type) else row[column]
+                               for row in chunk] for column in columns}
+            writer.write_table(pa.table(arrays, schema=schema))
+
+_WRITERS = {'csv': _write_csv, 'ndjson': _write_ndjson, 'parquet': _write_parquet}
+
+def export_ledger(out, fmt='csv', event_id=None, start=None, end=None, columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Streams the ledger into `out`, a binary file object or a file path. Returns the number of rows written."""
+    columns = columns or LEDGER_COLUMNS
+    counted = [0]
+
+    def counting(rows):
+        for row in rows:
+            counted[0] += 1
+            yield row
+
+    rows = counting(iter_ledger(event_id, start, end, columns))
+    if isinstance(out, str):
+        with open(out, 'wb') as f:
+            _WRITERS[fmt](f, rows, columns, chunk_rows)
+    else:
+        _WRITERS[fmt](out, rows, columns, chunk_rows)
+    return counted[0]
+
+def export_ledger_to_temp_path(fmt='csv', **filters):
+    """Exports into a new temporary file and returns its path; the caller deletes it when done."""
+    fd, path = tempfile.mkstemp(suffix=f".{FORMATS[fmt][1]}")
+    with os.fdopen(fd, 'wb') as out:
+        export_ledger(out, fmt, **filters)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the reimbursed-expense ledger.")
+    parser.add_argument("path", help="Output file; the format defaults to its extension")
+    parser.add_argument("--format", choices=list(FORMATS))
+    parser.add_argument("--event", type=int, help="Only this event id")
+    parser.add_argument("--from", dest="start", type=datetime.date.fromisoformat, help="First reimbursement date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=datetime.date.fromisoformat, help="Last reimbursement date (YYYY-MM-DD)")
+    parser.add_argument("--columns", help=f"Comma-separated subset of: {', '.join(LEDGER_COLUMNS)}")
+    args = parser.parse_args()
+
+    fmt = args.format or args.path.rsplit('.', 1)[-1].lower()
+    if fmt not in FORMATS:
+        parser.error(f"Unknown format '{fmt}'; pass --format.")
+    start = datetime.datetime.combine(args.start, datetime.time.min) if args.start else None
+    end = datetime.datetime.combine(args.end, datetime.time.max) if args.end else None
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+    unknown = set(columns or []) - set(LEDGER_COLUMNS)
+    if unknown:
+        parser.error(f"Unknown column(s): {', '.join(sorted(unknown))}")
+    count = export_ledger(args.path, fmt, args.event, start, end, columns)
+    print(f"Wrote {count} rows to {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,485 @@
+import copy
+import heapq
 import json
 import os
 import datetime
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from search_index import SearchIndex
+from activity_log import ActivityLogIndex
+from event_store import EventStore, diff_record
+from partitions import PartitionedStore
+from archive_store import ArchiveStore
+from comment_store import CommentStore
+import instrumentation
+import record_codec
 
 # --- File Paths for our JSON 'Database' ---
 USERS_FILE = 'db_users.json'
 EVENTS_FILE = 'db_events.json'
-EXPENSES_FILE = 'db_expenses.json'
-LOG_FILE = 'db_activity_log.json'
+LOG_FILE = 'db_activity_log.jsonl'  # Append-only, one JSON entry per line
+LEGACY_LOG_FILE = 'db_activity_log.json'
 HISTORICAL_FILE = 'db_historical.json'
+PARTITIONS_DIR = 'db_partitions'  # One event log and snapshot per fest, plus catalog.json
+ARCHIVE_DIR = os.path.join(PARTITIONS_DIR, 'archive')  # Compressed, read-only segments of settled records
+ARCHIVE_AFTER_DAYS = 90  # Settled records older than this are moved to the archive by archive.py
+# Earlier layouts, read once to seed the partitions when upgrading: a single workflow snapshot
+# over the activity log, and before that whole-collection JSON files.
+SNAPSHOT_FILE = 'db_workflow_snapshot.json'
+EXPENSES_FILE = 'db_expenses.json'
+ADVANCES_FILE = 'db_advances.json'
+PENDING_COUNTERS_FILE = 'db_pending_counters.json'
+LOCK_FILE = 'db.lock'
+CHANGE_FEED_FILE = 'db_versions.json'  # A version per collection, bumped by every write (see get_versions)
+# The whole-document files behind load_data/save_data, which `archive.py convert` rewrites.
+DOCUMENT_FILES = (USERS_FILE, EVENTS_FILE, HISTORICAL_FILE, PENDING_COUNTERS_FILE, CHANGE_FEED_FILE)
+STORAGE_FORMAT = 'json'  # Format for new document files: 'json' (indented) or 'records' (see Storage Codecs)
+UPLOADS_DIR = 'uploads'
+UPLOAD_ORIGINALS_DIR = os.path.join(UPLOADS_DIR, 'originals')  # Images as uploaded, if receipt_ingest.KEEP_ORIGINALS
 
 # --- Datetime Handling for JSON ---
 def json_default_converter(o):
     if isinstance(o, (datetime.datetime, datetime.date)):
         return o.isoformat()
 
+# --- Storage Codecs ---
+# A document file is either indented JSON or in the compact record format (record_codec.py:
+# length-prefixed records plus an offset table, so get_record reads one record through mmap
+# without parsing the rest). load_data reads both; save_data keeps a file's current format.
+CODECS = {
+    'json': (lambda data: json.dumps(data, indent=4, default=json_default_converter).encode('utf-8'), json.loads),
+    'records': (lambda data: record_codec.dumps(data, default=json_default_converter), record_codec.loads),
+}
+
+def _file_format(file_path):
+    """The format of an existing file, or None if there is none."""
+    try:
+        with open(file_path, 'rb') as f:
+            return 'records' if record_codec.is_record_data(f.read(len(record_codec.MAGIC))) else 'json'
+    except FileNotFoundError:
+        return None
+
+@instrumentation.timed
 def load_data(file_path):
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        instrumentation.count_read(len(raw))
+        data = CODECS['records' if record_codec.is_record_data(raw) else 'json'][1](raw)
+    except (FileNotFoundError, ValueError):  # Includes json.JSONDecodeError
         data = []
     return data
 
-def save_data(file_path, data):
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4, default=json_default_converter)
+@instrumentation.timed
+def save_data(file_path, data, storage_format=None):
+    """Writes in storage_format if given, else in the file's current format (STORAGE_FORMAT for a new file)."""
+    payload = CODECS[storage_format or _file_format(file_path) or STORAGE_FORMAT][0](data)
+    # Write a temporary file and swap it in, so readers never see a half-written file.
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(payload)
+    instrumentation.count_written(len(payload))
+    os.replace(temp_path, file_path)
+
+@instrumentation.timed
+def get_record(file_path, key):
+    """
+    One entry of a document file: a dict value by key, or a list item by its id or username
+    (see record_codec.KEY_FIELDS). None if absent. Record files decode only that entry.
+    """
+    try:
+        with record_codec.open_records(file_path) as records:
+            record = records.get(key)
+            instrumentation.count_read(records.bytes_read)
+            return record
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        pass  # Indented JSON (or empty): parse the whole document
+    data = load_data(file_path)
+    if isinstance(data, dict):
+        return data.get(key)
+    return next((item for item in data if record_codec.record_key(item) == key), None)
+
+# --- Write Locking ---
+# Every read-modify-write of the JSON files runs under one lock: a thread lock for the Streamlit
+# sessions and API workers in this process, plus an OS file lock for other processes.
+_thread_lock = threading.RLock()
+_lock_depth = 0
+_changed = set()  # Collections written under the current lock, bumped in the change feed on release
+
+def _lock_file(f):
+    if os.name == 'nt':
+        import msvcrt
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK gives up after ~10 seconds; keep waiting
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+@contextmanager
+def storage_lock():
+    global _lock_depth
+    with _thread_lock:
+        lock_file = None
+        if _lock_depth == 0:
+            lock_file = open(LOCK_FILE, 'a+')
+            _lock_file(lock_file)
+        _lock_depth += 1
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            if lock_file:
+                try:
+                    if _changed:
+                        _bump_versions(_changed)
+                finally:
+                    _changed.clear()
+                    lock_file.close()  # Closing releases the OS lock
+
+def _locked(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with storage_lock():
+            return func(*args, **kwargs)
+    return wrapper
+
+# --- Change Feed ---
+# A monotonic version per collection lets every session, in any process, tell whether the views it
+# holds are stale without reloading them. Writers mark what they touched; one bump per lock release.
+FEED_COLLECTIONS = ("expenses", "advances", "comments", "activity_log")
+
+def _mark_changed(*collections):
+    """Call under the lock."""
+    _changed.update(collections)
+
+def _bump_versions(collections):
+    versions = get_versions()
+    for collection in collections:
+        versions[collection] += 1
+    save_data(CHANGE_FEED_FILE, versions)
+
+def get_versions():
+    """{collection: version} for FEED_COLLECTIONS. Versions only grow; a session holding a view can keep it until they move."""
+    versions = load_data(CHANGE_FEED_FILE) or {}
+    return {collection: versions.get(collection, 0) for collection in FEED_COLLECTIONS}
+
+def _save_upload(uploaded_file):
+    """
+    Stores an uploaded file under UPLOADS_DIR with a unique name and returns its path. Images are
+    normalized first (see receipt_ingest.py). Call outside the lock: re-encoding a photo takes a moment.
+    """
+    import receipt_ingest  # Pillow, loaded by the first upload
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    safe_name = os.path.basename(uploaded_file.name) or "upload"
+    unique = f"{int(datetime.datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}_"
+    data = bytes(uploaded_file.getbuffer())
+    file_name, payload = receipt_ingest.ingest(safe_name, data)
+    if receipt_ingest.KEEP_ORIGINALS and payload is not data:
+        os.makedirs(UPLOAD_ORIGINALS_DIR, exist_ok=True)
+        with open(os.path.join(UPLOAD_ORIGINALS_DIR, unique + safe_name), "wb") as f:
+            f.write(data)
+    path = os.path.join(UPLOADS_DIR, unique + file_name)
+    with open(path, "wb") as f:
+        f.write(payload)
+    return path
+
+# --- Workflow Store ---
+# Expenses and advances are folded from create/update events plus periodic snapshots (see
+# event_store.py), partitioned by event id (see partitions.py), so a status change or comment
+# costs one appended line and one fest's reads never load another fest's records.
+COLLECTIONS = ("expenses", "advances")
+
+def _partition_loaded(event_id, store):
+    verify_pending_counters(event_id)  # Once per partition per process, now that its records are in memory
+
+_partitions = PartitionedStore(PARTITIONS_DIR, COLLECTIONS, on_load=_partition_loaded)
+_archive = ArchiveStore(ARCHIVE_DIR)
+
+# Allowed status changes per collection; None is "not created yet". Every transition is checked here.
+WORKFLOWS = {
+    "expenses": {None: {"Pending Team Lead"}, "Pending Team Lead": {"Pending Treasurer", "Rejected"},
+                 "Pending Treasurer": {"Approved", "Rejected"}, "Approved": {"Reimbursed"}},
+    "advances": {None: {"Pending"}, "Pending": {"Approved by Team Lead", "Rejected"},
+                 "Approved by Team Lead": {"Paid"}, "Paid": {"Closed"}},
+}
+
+def _copy_record(record):
+    record = dict(record)
+    record.pop('comments', None)  # Threads live in the comment store; archived records may still carry a copy
+    return record
+
+def _records(collection, event_id=None, include_archived=False):
+    """
+    The event's records, or every event's when event_id is None; archived ones too if asked,
+    merged in id order. Shared objects; copy before handing out.
+    """
+    if event_id is None:
+        return [r for partition_id in _partitions.partitions() for r in _records(collection, partition_id, include_archived)]
+    store = _partitions.store(event_id)
+    hot = store.records(collection) if store else []
+    if not include_archived:
+        return hot
+    hot_ids = {r['id'] for r in hot}
+    archived = [r for r in _archive.records(collection, event_id) if r['id'] not in hot_ids]
+    return sorted(hot + archived, key=lambda r: r['id']) if archived else hot
+
+def _iter_records(collection, event_id=None, include_archived=False):
+    """
+    Like _records, but one event at a time, with archived records streamed from their segments
+    instead of loaded. Shared objects; read only.
+    """
+    for partition_id in _partitions.partitions() if event_id is None else [event_id]:
+        store = _partitions.store(partition_id)
+        hot = store.records(collection) if store else []
+        if not include_archived:
+            yield from hot
+            continue
+        hot_ids = {r['id'] for r in hot}
+        archived = (r for r in _archive.iter_records(collection, partition_id) if r['id'] not in hot_ids)
+        yield from heapq.merge(hot, archived, key=lambda r: r['id'])
+
+def _allocate_ids(collection, event_id, count):
+    """New ids for the event's records; ids of archived records are never reused. Call under the lock."""
+    return _partitions.allocate_ids(collection, event_id, count, used_up_to=_archive.last_id(collection, event_id))
+
+def _find_record(collection, record_id):
+    """Returns (event_id, record) for an id, or (None, None)."""
+    event_id = _partitions.partition_of(collection, record_id)
+    store = _partitions.store(event_id) if event_id is not None else None
+    record = store.get(collection, record_id) if store else None
+    return (event_id, record) if record else (None, None)
+
+@instrumentation.timed
+def get_expenses(event_id=None, include_archived=False):
+    """
+    The event's expenses (all events' if event_id is None) in id order, as copies the caller may
+    modify. Archived (settled, read-only) expenses are left out unless include_archived is set.
+    """
+    return [_copy_record(r) for r in _records("expenses", event_id, include_archived)]
+
+def iter_expenses(event_id=None, include_archived=False):
+    """
+    Like get_expenses, but yields the expenses one at a time, reading one event's records at a
+    time, for a single pass over a large ledger. The records are shared: do not modify them.
+    """
+    return _iter_records("expenses", event_id, include_archived)
+
+@instrumentation.timed
+def get_advances(event_id=None, include_archived=False):
+    """Like get_expenses, for advances."""
+    return [_copy_record(r) for r in _records("advances", event_id, include_archived)]
+
+def get_expense(expense_id):
+    """One expense, not archived, as a copy; None if there is no such expense."""
+    _, record = _find_record("expenses", expense_id)
+    return _copy_record(record) if record else None
+
+def get_advance(advance_id):
+    """Like get_expense, for advances."""
+    _, record = _find_record("advances", advance_id)
+    return _copy_record(record) if record else None
+
+def _log_fields(user, action, timestamp=None):
+    return {'timestamp': timestamp or datetime.datetime.now(), 'user': user['name'], 'action': action}
+
+@instrumentation.timed
+def _write_events(event_id, events):
+    """
+    Appends workflow events to the event's partition in one write, copies their log fields to the
+    activity log, and keeps this process's search indexes in step. Call under the lock.
+    """
+    store = _partitions.store(event_id, create=True)
+    store.append(events)
+    _append_log_entries([{key: event[key] for key in ('timestamp', 'user', 'action')} for event in events])
+    _mark_changed(*{event['collection'] for event in events})
+    for collection in {event['collection'] for event in events}:
+        _update_index(event_id, collection)
+
+@_locked
+def _create_records(collection, event_id, user, records, actions):
+    """Adds new records to the event's partition with one create event each, all in one append."""
+    for record in records:
+        if record['status'] not in WORKFLOWS[collection][None]:
+            raise ValueError(f"{collection} cannot start in status '{record['status']}'")
+    _write_events(event_id, [EventStore.create_event(collection, record, **_log_fields(user, action, record.get('submitted_at')))
+                             for record, action in zip(records, actions)])
+    _track_status_changes(collection, event_id, [(None, record['status']) for record in records])
+
+# --- Full-text Search Index ---
+# One index per event and collection, archived records included, built on first search and then
+# kept current by the write paths.
+# Its stamp is the (log generation, event log offset, comment store offset) it reflects, so
+# changes from other processes are caught up from the tails of both files.
+_search_indexes = {}
+
+def _index_stamp(store, comments):
+    return (store.generation, store.offset, comments.offset)
+
+def _catch_up_index(index, event_id, collection):
+    """
+    Re-indexes the records touched by events, and adds the comments, appended since the index's
+    stamp. Returns False if the log was compacted or replaced since, so the index must be rebuilt.
+    Call under the lock, so neither file grows while the tails are read.
+    """
+    store, comments = _partitions.store(event_id), _comments(event_id)
+    store.refresh()
+    comments.refresh()
+    generation, log_offset, comment_offset = index.source_stamp
+    if store.generation != generation or store.offset < log_offset or comments.offset < comment_offset:
+        return False
+    record_ids = {record_id for event in store.events_since(log_offset) if event.get('collection') == collection
+                  for record_id in event.get('ids', [event.get('id')])}
+    threads = comments.threads(collection, record_ids)
+    for record_id in record_ids:
+        record = store.get(collection, record_id)
+        if record is not None:  # Archived records stay indexed as they were: they no longer change
+            index.add_document(record_id, _searchable_fields(collection, record, threads[record_id]))
+    for comment in comments.comments_since(comment_offset):
+        if comment['collection'] == collection and comment['parent_id'] not in record_ids:
+            index.add_text(comment['parent_id'], comment.get('text', ''))
+    index.source_stamp = _index_stamp(store, comments)
+    return True
+
+def _update_index(event_id, collection):
+    """Catches a built index up with a write, or drops it so the next search rebuilds it. Call under the lock."""
+    index = _search_indexes.get((event_id, collection))
+    if index is not None and not _catch_up_index(index, event_id, collection):
+        del _search_indexes[(event_id, collection)]
+
+def _searchable_fields(collection, record, thread=()):
+    comments = [(c.get('text', ''), 1) for c in thread]
+    if collection == "advances":
+        return [(record.get('vendor', ''), 3), (record.get('purpose', ''), 2)] + comments
+    return [(record.get('description', ''), 3), (record.get('category', ''), 1), (record.get('ocr_text', ''), 1)] + comments
+
+def _get_search_index(collection, event_id):
+    """
+    Returns the index, caught up with changes made since by other processes; it is only rebuilt
+    from scratch on first use and after the log was compacted or replaced.
+    """
+    store = _partitions.store(event_id)
+    if store is None:
+        return SearchIndex()
+    comments = _comments(event_id)
+    store.refresh()
+    comments.refresh()
+    index = _search_indexes.get((event_id, collection))
+    if index is not None and index.source_stamp != _index_stamp(store, comments):
+        with storage_lock():
+            if not _catch_up_index(index, event_id, collection):
+                index = None
+    if index is None:
+        stamp = _index_stamp(store, comments)
+        threads = comments.threads(collection)
+        index = SearchIndex()
+        for record in _records(collection, event_id, include_archived=True):
+            index.add_document(record['id'], _searchable_fields(collection, record, threads.get(record['id'], ())))
+        index.source_stamp = stamp
+        _search_indexes[(event_id, collection)] = index
+    return index
+
+def _search(collection, query, limit, event_id):
+    if event_id is not None:
+        return _get_search_index(collection, event_id).search(query, limit)
+    # Across events: each event's hits in rank order, newest event first.
+    hits = [doc_id for partition_id in reversed(_partitions.partitions())
+            for doc_id in _get_search_index(collection, partition_id).search(query, limit)]
+    return hits[:limit] if limit else hits
+
+@instrumentation.timed
+def search_expenses(query, limit=None, event_id=None):
+    return _search("expenses", query, limit, event_id)
+
+@instrumentation.timed
+def search_advances(query, limit=None, event_id=None):
+    return _search("advances", query, limit, event_id)
+
+# --- Pending Action Counters ---
+# Statuses that put a record in a role's action queue, per collection.
+PENDING_STATUSES = {
+    "expenses": {"team_lead": {"Pending Team Lead"}, "treasurer": {"Pending Treasurer", "Approved"}},
+    "advances": {"team_lead": {"Pending"}, "treasurer": {"Approved by Team Lead"}},
+}
+
+def _count_pending(collection, records):
+    return {role: sum(1 for r in records if r.get('status') in statuses)
+            for role, statuses in PENDING_STATUSES[collection].items()}
+
+def _compute_pending_counters(event_id):
+    totals = {collection: _count_pending(collection, _records(collection, event_id)) for collection in PENDING_STATUSES}
+    return {role: {collection: totals[collection][role] for collection in totals} for role in ("team_lead", "treasurer")}
+
+def _load_counters():
+    """Counters as {event id: {role: {collection: n}}}; anything else (e.g. the older unpartitioned layout) reads as empty."""
+    counters = load_data(PENDING_COUNTERS_FILE)
+    if not isinstance(counters, dict) or not all(key.lstrip('-').isdigit() for key in counters):
+        return {}
+    return counters
+
+@_locked
+def rebuild_pending_counters(event_id):
+    """Recomputes the event's counters from its current expenses and advances."""
+    counters = _load_counters()
+    counters[str(event_id)] = _compute_pending_counters(event_id)
+    save_data(PENDING_COUNTERS_FILE, counters)
+    return counters
+
+@_locked
+def verify_pending_counters(event_id, repair=True):
+    """Consistency check: returns True if the event's stored counters match its data, rebuilding them if not."""
+    counters = _load_counters()
+    expected = _compute_pending_counters(event_id)
+    consistent = counters.get(str(event_id)) == expected
+    if not consistent and repair:
+        counters[str(event_id)] = expected
+        save_data(PENDING_COUNTERS_FILE, counters)
+    return consistent
+
+def _track_status_changes(collection, event_id, changes):
+    """Moves records between action queues, given (old_status, new_status) pairs. Called by every status transition."""
+    counters = None
+    for old_status, new_status in changes:
+        for role, statuses in PENDING_STATUSES[collection].items():
+            delta = (new_status in statuses) - (old_status in statuses)
+            if delta:
+                if counters is None:
+                    counters = _load_counters()
+                    if str(event_id) not in counters:
+                        counters = rebuild_pending_counters(event_id)
+                event_counters = counters[str(event_id)].setdefault(role, {})
+                event_counters[collection] = max(event_counters.get(collection, 0) + delta, 0)
+    if counters is not None:
+        save_data(PENDING_COUNTERS_FILE, counters)
 
+@instrumentation.timed
+def get_pending_counts(user_role, event_id=None):
+    """Returns {'expenses': n, 'advances': n} waiting on the role in the event (all events if None), from the maintained counters."""
+    counters = _load_counters()
+    event_ids = [str(event_id)] if event_id is not None else list(counters)
+    totals = {"expenses": 0, "advances": 0}
+    for key in event_ids:
+        role_counters = counters.get(key, {}).get(user_role, {})
+        for collection in totals:
+            totals[collection] += role_counters.get(collection, 0)
+    return totals
+
+@instrumentation.timed
 def add_advance_request(user, event_id, vendor, purpose, amount, quote_file):
-    advances = load_data("db_advances.json")
-    quote_url = ''
-    if quote_file:
-        if not os.path.exists("uploads"): os.makedirs("uploads")
-        quote_url = os.path.join("uploads", f"{int(datetime.datetime.now().timestamp())}_{quote_file.name}")
-        with open(quote_url, "wb") as f:
-            f.write(quote_file.getbuffer())
+    quote_url = _save_upload(quote_file) if quote_file else ''
+    with storage_lock():
+        return _create_advance(user, event_id, vendor, purpose, amount, quote_url)
 
+def _create_advance(user, event_id, vendor, purpose, amount, quote_url):
     new = {
-        "id": advances[-1]['id'] + 1 if advances else 1,
+        "id": _allocate_ids("advances", event_id, 1)[0],
         "user": user['username'],
         "event_id": event_id,
         "vendor": vendor,
@@ -45,31 +488,69 @@ def add_advance_request(user, event_id, vendor, purpose, amount, quote_file):
         "quote_url": quote_url,
         "status": "Pending",
         "submitted_at": datetime.datetime.now(),
-        "receipt_url": None,
-        "comments": []
+        "receipt_url": None
     }
-    
-    advances.append(new)
-    save_data("db_advances.json", advances)
-    log_activity(user['name'], f"requested advance of ₹{amount:.2f} for {vendor}")
+    _create_records("advances", event_id, user, [new], [f"requested advance of ₹{amount:.2f} for {vendor}"])
     return new
 
-def get_advances_for_user(username):
-    return [a for a in parse_datetimes(load_data("db_advances.json")) if a['user'] == username]
+def get_advances_for_user(username, event_id=None):
+    return parse_datetimes([a for a in get_advances(event_id, include_archived=True) if a['user'] == username])
 
 def close_advance(adv_id, user, receipt_file):
-    advances = load_data("db_advances.json")
-    for adv in advances:
-        if adv['id'] == adv_id:
-            receipt_path = os.path.join("uploads", f"{int(datetime.datetime.now().timestamp())}_{receipt_file.name}")
-            with open(receipt_path, "wb") as f:
-                f.write(receipt_file.getbuffer())
-            adv['receipt_url'] = receipt_path
-            adv['status'] = "Closed"
-            log_activity(user['name'], f"closed advance #{adv_id}")
-            break
-    save_data("db_advances.json", advances)
+    _, adv = _find_record("advances", adv_id)
+    if adv is None or adv['status'] != "Paid":
+        return False
+    receipt_path = _save_upload(receipt_file)
+    def close(adv):
+        if adv['status'] != "Paid":
+            return False, f"advance is '{adv['status']}', not paid"  # Changed while the receipt was saved
+        adv['receipt_url'], adv['status'] = receipt_path, "Closed"
+        return True, f"closed advance #{adv['id']}"
+    return _apply_batch("advances", [adv_id], user, close)[0]['ok']
+
+def approve_advances(advance_ids, user):
+    def approve(adv):
+        if adv['status'] != "Pending":
+            return False, f"advance is '{adv['status']}', not pending"
+        adv['status'], adv['approved_by'] = "Approved by Team Lead", user['name']
+        return True, f"approved advance #{adv['id']}"
+    return _apply_batch("advances", advance_ids, user, approve)
+
+@_locked
+def reject_advances(advance_ids, user, reason=None):
+    def reject(adv):
+        if adv['status'] != "Pending":
+            return False, f"advance is '{adv['status']}', not pending"
+        adv['status'] = "Rejected"
+        if reason:
+            return True, f"rejected advance #{adv['id']}: '{reason}'"
+        return True, f"rejected advance #{adv['id']}"
+    results = _apply_batch("advances", advance_ids, user, reject)
+    if reason:
+        _write_comments("advances", {r['id']: _new_comment(user, reason) for r in results if r['ok']})
+    return results
+
+def pay_advances(transactions, user):
+    """transactions maps advance id -> transaction id / UPI reference."""
+    paid_time = datetime.datetime.now().isoformat()
+    def pay(adv):
+        if adv['status'] != "Approved by Team Lead":
+            return False, f"advance is '{adv['status']}', not approved"
+        txn_id = transactions[adv['id']]
+        adv.update(status="Paid", paid_txn_id=txn_id, paid_time=paid_time, paid_by=user['name'])
+        return True, f"marked advance #{adv['id']} as paid (txn: {txn_id})"
+    return _apply_batch("advances", list(transactions), user, pay)
+
+def approve_advance(advance_id, user):
+    return approve_advances([advance_id], user)[0]['ok']
+
+def reject_advance(advance_id, user, reason=None):
+    return reject_advances([advance_id], user, reason)[0]['ok']
+
+def pay_advance(advance_id, user, transaction_id):
+    return pay_advances({advance_id: transaction_id}, user)[0]['ok']
 
+@instrumentation.timed
 def setup_database():
     """Creates the JSON database files with default data if they don't exist."""
     if not os.path.exists(USERS_FILE) or os.path.getsize(USERS_FILE) == 0:
@@ -82,16 +563,58 @@ def setup_database():
         ])
     if not os.path.exists(EVENTS_FILE):
         save_data(EVENTS_FILE, [{"id": 1, "name": "TechFest 2024", "budget": 50000, "start_date": "2024-04-01"}])
-    if not os.path.exists(EXPENSES_FILE):
-        save_data(EXPENSES_FILE, [])
     if not os.path.exists(LOG_FILE):
-        save_data(LOG_FILE, [{'timestamp': datetime.datetime.now(), 'user': 'System', 'action': 'Database initialized.'}])
+        if os.path.exists(LEGACY_LOG_FILE):
+            # The old log was a JSON list kept newest first; the append-only log is oldest first.
+            _append_log_entries(load_data(LEGACY_LOG_FILE)[::-1])
+        else:
+            log_activity('System', 'Database initialized.')
     if not os.path.exists(HISTORICAL_FILE):
         save_data(HISTORICAL_FILE, {
             "TechFest 2023": [(1, 500), (2, 800), (3, 1200), (5, 1500), (7, 2500), (10, 4000), (12, 6000), (14, 8500),
             (15, 10000), (18, 15000), (20, 22000), (22, 28000), (25, 35000), (28, 41000), (30, 44000)]
         })
+    if not _partitions.exists():
+        with storage_lock():
+            if not _partitions.exists():
+                _migrate_to_partitions()
+    for event_id in _partitions.partitions():
+        if not os.path.exists(_comments(event_id).file_path):
+            with storage_lock():
+                if not os.path.exists(_comments(event_id).file_path):
+                    _migrate_comments(event_id)
 
+def _migrate_to_partitions():
+    """Splits the records of the older single-store (or whole-file) layout into per-event partitions."""
+    if os.path.exists(SNAPSHOT_FILE):
+        store = EventStore(LOG_FILE, SNAPSHOT_FILE, COLLECTIONS)
+        records = {collection: store.records(collection) for collection in COLLECTIONS}
+    else:
+        records = {"expenses": load_data(EXPENSES_FILE), "advances": load_data(ADVANCES_FILE)}
+    _partitions.import_records(records, lambda record: record.get('event_id') or 0)
+
+def _migrate_comments(event_id):
+    """Moves the comment threads nested in an event's records into its comment store."""
+    store = _partitions.store(event_id)
+    threads = {collection: {} for collection in COLLECTIONS}
+    unset = []
+    for collection in COLLECTIONS:
+        for record in _archive.records(collection, event_id) + store.records(collection):
+            if record.get('comments'):
+                threads[collection][record['id']] = record['comments']
+        unset += [EventStore.update_event(collection, r['id'], unset=['comments']) for r in store.records(collection) if 'comments' in r]
+    comments = _comments(event_id)
+    temp_path = f"{comments.file_path}.{os.getpid()}.tmp"
+    open(temp_path, 'w').close()
+    staging = CommentStore(temp_path)
+    for collection, collection_threads in threads.items():
+        staging.add(collection, collection_threads)
+    os.replace(temp_path, comments.file_path)  # Its presence marks the event as migrated
+    if unset:
+        store.append(unset)
+        store.snapshot()
+
+@instrumentation.timed
 def parse_datetimes(data_list, date_keys=['submitted_at', 'reimbursed_at', 'timestamp']):
     """Converts date strings in a list of dicts back to datetime objects."""
     if not data_list:
@@ -112,38 +635,101 @@ def parse_datetimes(data_list, date_keys=['submitted_at', 'reimbursed_at', 'time
                         comment['timestamp'] = None
     return data_list
 
-# --- Core API Functions ---
+# --- Activity Log ---
+_activity_log = ActivityLogIndex(LOG_FILE)
+
+@_locked
+def _append_log_entries(entries):
+    lines = ''.join(json.dumps(entry, default=json_default_converter) + '\n' for entry in entries)
+    with open(LOG_FILE, 'a', encoding='utf-8') as f:
+        f.write(lines)
+    instrumentation.count_written(len(lines))
+    _mark_changed("activity_log")
+
+def _append_log_entry(entry):
+    _append_log_entries([entry])
+
 def log_activity(user_name, action):
-    logs = load_data(LOG_FILE)
-    logs.insert(0, {'timestamp': datetime.datetime.now(), 'user': user_name, 'action': action})
-    save_data(LOG_FILE, logs)
+    _append_log_entry({'timestamp': datetime.datetime.now(), 'user': user_name, 'action': action})
 
-def add_comment_to_advance(advance_id, user, comment_text):
-    advances = load_data("db_advances.json")
-    for adv in advances:
-        if adv['id'] == advance_id:
-            new_comment = {
-                "user": user['name'],
-                "role": user['role'],
-                "text": comment_text,
-                "timestamp": datetime.datetime.now()
-            }
-            adv.setdefault('comments', []).append(new_comment)
-            save_data("db_advances.json", advances)
-            log_activity(user['name'], f"commented on advance #{advance_id}: '{comment_text}'")
-            return True
-    return False
+@instrumentation.timed
+def query_activity_log(user=None, start=None, end=None, text=None, cursor=None, limit=25):
+    """Returns one page of the log, newest first. See ActivityLogIndex.query for the cursor format."""
+    return _activity_log.query(user, start, end, text, cursor, limit)
+
+def get_activity_log_users():
+    _activity_log.refresh()
+    return _activity_log.users()
+
+# --- Core API Functions ---
+
+def _new_comment(user, comment_text):
+    return {
+        "user": user['name'],
+        "role": user['role'],
+        "text": comment_text,
+        "timestamp": datetime.datetime.now()
+    }
 
+# --- Comments ---
+# Threads are kept out of the records, in one append-only comment store per event partition,
+# and fetched in batches for the records on screen.
+_comment_stores = {}
+
+def _comments(event_id):
+    store = _comment_stores.get(event_id)
+    if store is None:
+        store = _comment_stores[event_id] = CommentStore(os.path.join(PARTITIONS_DIR, f"event_{event_id}.comments.jsonl"))
+    return store
+
+@instrumentation.timed
+def get_comments(collection, parent_ids):
+    """Batch fetch: {parent id: comments, oldest first} for the given expense or advance ids."""
+    by_event = {}
+    for parent_id in parent_ids:
+        by_event.setdefault(_partitions.partition_of(collection, parent_id), []).append(parent_id)
+    threads = {}
+    for event_id, ids in by_event.items():
+        if event_id is None:
+            threads.update({parent_id: [] for parent_id in ids})
+            continue
+        for parent_id, thread in _comments(event_id).threads(collection, ids).items():
+            threads[parent_id] = parse_datetimes([dict(c) for c in thread])
+    return threads
+
+@instrumentation.timed
+@_locked
+def _write_comments(collection, comments_by_parent):
+    """Appends one comment per parent id ({id: comment}), one write per event, and updates the search indexes."""
+    by_event = {}
+    for parent_id, comment in comments_by_parent.items():
+        by_event.setdefault(_partitions.partition_of(collection, parent_id), {})[parent_id] = [comment]
+    for event_id, thread_items in by_event.items():
+        _comments(event_id).add(collection, thread_items)
+        _mark_changed("comments")
+        _update_index(event_id, collection)
+
+@_locked
+def _add_comment(collection, record_id, user, comment_text, action):
+    _, record = _find_record(collection, record_id)
+    if record is None:
+        return False
+    _write_comments(collection, {record_id: _new_comment(user, comment_text)})
+    _append_log_entries([_log_fields(user, action)])
+    return True
+
+def add_comment_to_advance(advance_id, user, comment_text):
+    return _add_comment("advances", advance_id, user, comment_text, f"commented on advance #{advance_id}: '{comment_text}'")
 
 def get_activity_log():
-    return parse_datetimes(load_data(LOG_FILE))
+    return _activity_log.newest_first()
 
 def authenticate_user(username, password):
-    users = load_data(USERS_FILE)
-    return next((user for user in users if user['username'] == username and user['password'] == password), None)
+    user = get_record(USERS_FILE, username)
+    return user if user and user['password'] == password else None
 
 def get_user_details(username):
-    return next((user for user in load_data(USERS_FILE) if user['username'] == username), None)
+    return get_record(USERS_FILE, username)
 
 def get_all_usernames():
     users = load_data(USERS_FILE)
@@ -153,87 +739,298 @@ def get_events_for_user(user):
     return load_data(EVENTS_FILE)
 
 def get_event_by_id(event_id):
-    return next((e for e in load_data(EVENTS_FILE) if e['id'] == event_id), None)
+    return get_record(EVENTS_FILE, event_id)
 
 def get_historical_data():
     return load_data(HISTORICAL_FILE)
 
-def get_expenses_for_user(username):
-    all_expenses = load_data(EXPENSES_FILE)
-    user_expenses = list(filter(lambda e: e.get('user') == username, all_expenses))
-    return parse_datetimes(user_expenses)
-
-def get_pending_requests(user_role):
-    all_expenses = load_data(EXPENSES_FILE)
-    pending_expenses = []
-    if user_role == "team_lead":
-        pending_expenses = [e for e in all_expenses if e.get('status') == 'Pending Team Lead']
-    if user_role == "treasurer":
-        pending_expenses = [e for e in all_expenses if e.get('status') in ['Pending Treasurer', 'Approved']]
-    return parse_datetimes(pending_expenses)
-
-def add_expense(event_id, user, amount, category, description, receipt_file):
-    expenses = load_data(EXPENSES_FILE)
-    if not os.path.exists("uploads"): os.makedirs("uploads")
-    receipt_url = os.path.join("uploads", f"{int(datetime.datetime.now().timestamp())}_{receipt_file.name}")
-    with open(receipt_url, "wb") as f: f.write(receipt_file.getbuffer())
-    new_expense = {
-        "id": (expenses[-1]['id'] + 1) if expenses else 1, "event_id": event_id, "user": user['username'],
-        "amount": amount, "category": category, "description": description, "submitted_at": datetime.datetime.now(),
-        "receipt_url": receipt_url, "status": "Pending Team Lead",
-        "approvals": [{"role": "team_lead", "approved": False, "approved_by": None, "timestamp": None},
-                      {"role": "treasurer", "approved": False, "approved_by": None, "timestamp": None}],
-        "comments": []
-    }
-    expenses.append(new_expense)
-    save_data(EXPENSES_FILE, expenses)
-    log_activity(user['name'], f"submitted an expense of ₹{amount} for '{description}'.")
-    return new_expense
+def get_expenses_for_user(username, event_id=None):
+    return parse_datetimes([e for e in get_expenses(event_id, include_archived=True) if e.get('user') == username])
+
+@instrumentation.timed
+def get_reimbursed_expenses(event_id=None):
+    return parse_datetimes([e for e in get_expenses(event_id, include_archived=True) if e.get('status') == 'Reimbursed'])
+
+@instrumentation.timed
+def get_pending_requests(user_role, event_id=None):
+    statuses = PENDING_STATUSES["expenses"].get(user_role, set())
+    return parse_datetimes([e for e in get_expenses(event_id) if e.get('status') in statuses])
+
+# --- Analytics Snapshot ---
+# The dashboard, forecast and reports compute on a columnar copy of the expenses per event (see
+# analytics_store.py), which converts only the records changed since it was last read.
+_expense_columns = {}
+
+@instrumentation.timed
+def get_expense_frame(event_id=None):
+    """
+    The event's expenses, archived ones included (every event's if event_id is None), as a typed
+    DataFrame: categorical user/category/status, float amounts, datetime64 timestamps. Read-only.
+    """
+    import analytics_store  # NumPy and pandas, loaded by the analytics pages only
+    table = _expense_columns.get(event_id)
+    if table is None:
+        table = _expense_columns.setdefault(event_id, analytics_store.ExpenseColumns())
+    return table.sync(_records("expenses", event_id, include_archived=True)).frame()
+
+def get_reimbursed_frame(event_id=None):
+    """Like get_reimbursed_expenses, as rows of get_expense_frame."""
+    df = get_expense_frame(event_id)
+    return df[df['status'] == 'Reimbursed'].reset_index(drop=True)
+
+@instrumentation.timed
+def add_expenses(event_id, user, items):
+    """
+    Submits several expenses with one write. Each item is a dict with amount, category,
+    description, receipt_file and optionally ocr_text. Returns the new expense records.
+    """
+    receipt_urls = [_save_upload(item['receipt_file']) for item in items]
+    with storage_lock():
+        return _create_expenses(event_id, user, items, receipt_urls)
+
+def _create_expenses(event_id, user, items, receipt_urls):
+    created = []
+    for item, receipt_url, expense_id in zip(items, receipt_urls, _allocate_ids("expenses", event_id, len(items))):
+        created.append({
+            "id": expense_id, "event_id": event_id, "user": user['username'],
+            "amount": item['amount'], "category": item['category'], "description": item['description'],
+            "submitted_at": datetime.datetime.now(), "receipt_url": receipt_url,
+            "ocr_text": item.get('ocr_text', ''), "status": "Pending Team Lead",
+            "approvals": [{"role": "team_lead", "approved": False, "approved_by": None, "timestamp": None},
+                          {"role": "treasurer", "approved": False, "approved_by": None, "timestamp": None}]
+        })
+    _create_records("expenses", event_id, user, created, [f"submitted an expense of ₹{e['amount']} for '{e['description']}'." for e in created])
+    return created
+
+def add_expense(event_id, user, amount, category, description, receipt_file, ocr_text=''):
+    return add_expenses(event_id, user, [{"amount": amount, "category": category, "description": description,
+                                          "receipt_file": receipt_file, "ocr_text": ocr_text}])[0]
 
 def add_comment_to_expense(expense_id, user, comment_text):
-    expenses = load_data(EXPENSES_FILE)
-    for expense in expenses:
-        if expense['id'] == expense_id:
-            new_comment = {
-                "user": user['name'],
-                "role": user['role'],
-                "text": comment_text,
-                "timestamp": datetime.datetime.now()
-            }
-            expense.setdefault('comments', []).append(new_comment)
-            save_data(EXPENSES_FILE, expenses)
-            log_activity(user['name'], f"commented on expense #{expense_id}: '{comment_text}'")
-            return True
-    return False
+    return _add_comment("expenses", expense_id, user, comment_text, f"commented on expense #{expense_id}: '{comment_text}'")
+
+# --- Batch Transitions ---
+@instrumentation.timed
+@_locked
+def _apply_batch(collection, record_ids, user, transition):
+    """
+    Applies transition(record) -> (ok, message) to a working copy of each record and appends one
+    update event per success (the changed fields only), with one write and one counter update per
+    event partition touched. `message` is the activity log text on success and the error otherwise.
+    Status changes must follow WORKFLOWS. Returns one {'id', 'ok', 'error'} result per id, in order.
+    """
+    results, changes, events, working = [], {}, {}, {}
+    now = datetime.datetime.now()
+    for record_id in record_ids:
+        if record_id in working:
+            event_id, record = working[record_id]
+        else:
+            event_id, record = _find_record(collection, record_id)
+        if record is None:
+            owner = _partitions.partition_of(collection, record_id)
+            archived = owner is not None and _archive.get(collection, owner, record_id) is not None
+            results.append({'id': record_id, 'ok': False, 'error': "archived (read-only)" if archived else "not found"})
+            continue
+        updated = copy.deepcopy(record)
+        ok, message = transition(updated)
+        old_status, new_status = record.get('status'), updated.get('status')
+        if ok and new_status != old_status and new_status not in WORKFLOWS[collection].get(old_status, ()):
+            ok, message = False, f"cannot move from '{old_status}' to '{new_status}'"
+        results.append({'id': record_id, 'ok': ok, 'error': None if ok else message})
+        if ok:
+            working[record_id] = (event_id, updated)
+            changes.setdefault(event_id, []).append((old_status, new_status))
+            changed, appended = diff_record(record, updated)
+            events.setdefault(event_id, []).append(
+                EventStore.update_event(collection, record_id, changed, appended, **_log_fields(user, message, now)))
+    for event_id, event_list in events.items():
+        _write_events(event_id, event_list)
+        _track_status_changes(collection, event_id, changes[event_id])
+    return results
+
+def _next_expense_status(expense, role):
+    for i, step in enumerate(expense['approvals']):
+        if step['role'] == role and not step['approved']:
+            if i + 1 < len(expense['approvals']):
+                return step, f"Pending {expense['approvals'][i+1]['role'].replace('_', ' ').title()}"
+            return step, "Approved"
+    return None, None
+
+def approve_expenses(expense_ids, approver_user):
+    def approve(expense):
+        if not expense['status'].startswith("Pending"):
+            return False, f"expense is '{expense['status']}', not pending"
+        step, next_status = _next_expense_status(expense, approver_user['role'])
+        if step is None:
+            return False, f"no open {approver_user['role']} approval step"
+        step['approved'], step['approved_by'], step['timestamp'] = True, approver_user['name'], datetime.datetime.now()
+        expense['status'] = next_status
+        return True, f"approved expense #{expense['id']} at the {approver_user['role']} level."
+    return _apply_batch("expenses", expense_ids, approver_user, approve)
+
+@_locked
+def reject_expenses(expense_ids, user, reason):
+    def reject(expense):
+        if not expense['status'].startswith("Pending"):
+            return False, f"expense is '{expense['status']}', not pending"
+        expense['status'] = "Rejected"
+        return True, f"rejected expense #{expense['id']}: '{reason}'"
+    results = _apply_batch("expenses", expense_ids, user, reject)
+    _write_comments("expenses", {r['id']: _new_comment(user, reason) for r in results if r['ok']})
+    return results
+
+def reimburse_expenses(transactions, approver_user):
+    """transactions maps expense id -> transaction id / UPI reference entered by the treasurer."""
+    users = {u['username']: u for u in load_data(USERS_FILE)}
+    reimbursed_at = datetime.datetime.now()
+    def reimburse(expense):
+        if expense['status'] != 'Approved':
+            return False, f"expense is '{expense['status']}', not approved"
+        transaction_id = transactions[expense['id']]
+        expense['status'] = 'Reimbursed'
+        expense['reimbursed_at'] = reimbursed_at
+        expense['transaction_id'] = transaction_id
+        submitter_details = users.get(expense['user'], {})
+        upi_id = submitter_details.get('upi_id', 'N/A')
+        return True, f"reimbursed expense #{expense['id']} (₹{expense['amount']}) via UPI to {submitter_details.get('name', expense['user'])} ({upi_id}). Transaction ID: {transaction_id}"
+    return _apply_batch("expenses", list(transactions), approver_user, reimburse)
 
 def approve_expense_step(expense_id, approver_user):
-    expenses = load_data(EXPENSES_FILE)
-    for expense in expenses:
-        if expense['id'] == expense_id:
-            for i, step in enumerate(expense['approvals']):
-                if step['role'] == approver_user['role'] and not step['approved']:
-                    step['approved'], step['approved_by'], step['timestamp'] = True, approver_user['name'], datetime.datetime.now()
-                    if i + 1 < len(expense['approvals']):
-                        next_step_role = expense['approvals'][i+1]['role']
-                        expense['status'] = f"Pending {next_step_role.replace('_', ' ').title()}"
-                    else:
-                        expense['status'] = "Approved"
-                    log_activity(approver_user['name'], f"approved expense #{expense_id} at the {approver_user['role']} level.")
-                    save_data(EXPENSES_FILE, expenses)
-                    return True
-    return False
+    return approve_expenses([expense_id], approver_user)[0]['ok']
+
+def reject_expense(expense_id, user, reason):
+    return reject_expenses([expense_id], user, reason)[0]['ok']
 
 def reimburse_expense(expense_id, approver_user, transaction_id):
-    expenses = load_data(EXPENSES_FILE)
-    for expense in expenses:
-        if expense['id'] == expense_id and expense['status'] == 'Approved':
-            expense['status'] = 'Reimbursed'
-            expense['reimbursed_at'] = datetime.datetime.now()
-            expense['transaction_id'] = transaction_id  # Use the transaction ID entered by treasurer
-            save_data(EXPENSES_FILE, expenses)
-            submitter_details = get_user_details(expense['user'])
-            upi_id = submitter_details.get('upi_id', 'N/A')
-            log_message = f"reimbursed expense #{expense_id} (₹{expense['amount']}) via UPI to {submitter_details['name']} ({upi_id}). Transaction ID: {transaction_id}"
-            log_activity(approver_user['name'], log_message)
-            return True
-    return False
+    return reimburse_expenses({expense_id: transaction_id}, approver_user)[0]['ok']
+
+# --- Archival & Compaction ---
+# Final statuses; records in them never change again and can move to the cold archive.
+SETTLED_STATUSES = {"expenses": {"Reimbursed", "Rejected"}, "advances": {"Closed", "Rejected"}}
+
+def _settled_at(record):
+    for key in ('reimbursed_at', 'paid_time', 'submitted_at'):
+        value = record.get(key)
+        if isinstance(value, str):
+            try:
+                return datetime.datetime.fromisoformat(value)
+            except ValueError:
+                continue
+        if isinstance(value, datetime.datetime):
+            return value
+    return None
+
+@instrumentation.timed
+@_locked
+def archive_settled(older_than_days=ARCHIVE_AFTER_DAYS, event_ids=None):
+    """
+    Moves settled records older than older_than_days out of each event's hot partition into a new
+    compressed archive segment, where history views and reports still find them.
+    Returns {event id: {collection: records archived}}.
+    """
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+    summary = {}
+    for event_id in event_ids or _partitions.partitions():
+        store = _partitions.store(event_id)
+        if store is None:
+            continue
+        settled = {}
+        for collection in COLLECTIONS:
+            records = [r for r in store.records(collection) if r.get('status') in SETTLED_STATUSES[collection]
+                       and (_settled_at(r) or cutoff) < cutoff]
+            if records:
+                settled[collection] = records
+        if not settled:
+            continue
+        segment = _archive.add_segment(event_id, settled, json_default_converter)
+        system = {'name': 'System'}
+        _write_events(event_id, [EventStore.archive_event(collection, [r['id'] for r in records], segment=segment,
+                                                          **_log_fields(system, f"archived {len(records)} settled {collection} of event #{event_id}"))
+                                 for collection, records in settled.items()])
+        store.snapshot()  # So the hot snapshot sheds the archived records now, not at the next interval
+        summary[event_id] = {collection: len(records) for collection, records in settled.items()}
+    return summary
+
+@instrumentation.timed
+@_locked
+def compact_storage():
+    """
+    Folds each event's log into its snapshot, starting a fresh log, and merges its archive
+    segments into one. Returns {event id: {'log_bytes': reclaimed, 'segments_merged': n}}.
+    """
+    return {event_id: {'log_bytes': _partitions.store(event_id).compact(), 'segments_merged': _archive.merge_segments(event_id)}
+            for event_id in _partitions.partitions()}
+
+UPLOAD_FIELDS = {"expenses": ("receipt_url",), "advances": ("quote_url", "receipt_url")}
+
+def normalize_uploads():
+    """
+    Normalizes the images already in UPLOADS_DIR as new uploads are (see receipt_ingest.py) and
+    points the records at the re-encoded files. Files that archived records refer to are left as
+    they are, since archive segments are read-only. Returns counts and the bytes before and after.
+    """
+    import receipt_ingest
+    archived = {os.path.normpath(r[field]) for event_id in _partitions.partitions() for collection, fields in UPLOAD_FIELDS.items()
+                for r in _archive.records(collection, event_id) for field in fields if r.get(field)}
+    summary = {'normalized': 0, 'unchanged': 0, 'archived': 0, 'records_updated': 0, 'bytes_before': 0, 'bytes_after': 0}
+    renamed = {}  # old path -> new path
+    for name in sorted(os.listdir(UPLOADS_DIR)) if os.path.isdir(UPLOADS_DIR) else []:
+        path = os.path.join(UPLOADS_DIR, name)
+        if not os.path.isfile(path):
+            continue
+        if os.path.normpath(path) in archived:
+            summary['archived'] += 1
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        new_name, payload = receipt_ingest.ingest(name, data)
+        if payload is data:
+            summary['unchanged'] += 1
+            continue
+        new_path = os.path.join(UPLOADS_DIR, new_name)
+        if new_path != path and os.path.exists(new_path):
+            new_path = os.path.join(UPLOADS_DIR, name + os.path.splitext(new_name)[1])
+        temp_path = f"{new_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        if receipt_ingest.KEEP_ORIGINALS:
+            os.makedirs(UPLOAD_ORIGINALS_DIR, exist_ok=True)
+            os.replace(path, os.path.join(UPLOAD_ORIGINALS_DIR, name))
+        os.replace(temp_path, new_path)
+        renamed[os.path.normpath(path)] = new_path
+        summary['normalized'] += 1
+        summary['bytes_before'] += len(data)
+        summary['bytes_after'] += len(payload)
+
+    def repoint(record):
+        for field in UPLOAD_FIELDS[collection]:
+            if record.get(field) and os.path.normpath(record[field]) in renamed:
+                record[field] = renamed[os.path.normpath(record[field])]
+        return True, f"normalized the uploads of {collection[:-1]} #{record['id']}"
+    with storage_lock():
+        for collection, fields in UPLOAD_FIELDS.items():
+            ids = [r['id'] for r in _records(collection) if any(r.get(field) and os.path.normpath(r[field]) in renamed for field in fields)]
+            summary['records_updated'] += sum(r['ok'] for r in _apply_batch(collection, ids, {'name': 'System'}, repoint))
+    for path, new_path in renamed.items():
+        if path != os.path.normpath(new_path) and os.path.exists(path):
+            os.remove(path)
+    return summary
+
+@_locked
+def convert_storage(storage_format):
+    """
+    Rewrites every document file in storage_format, after checking it reads back unchanged.
+    Returns {path: (bytes before, bytes after)}.
+    """
+    encode, decode = CODECS[storage_format]
+    sizes = {}
+    for file_path in DOCUMENT_FILES:
+        if not os.path.exists(file_path):
+            continue
+        data = load_data(file_path)
+        if decode(encode(data)) != data:
+            raise ValueError(f"{file_path} does not round-trip through the {storage_format} format")
+        before = os.path.getsize(file_path)
+        save_data(file_path, data, storage_format)
+        sizes[file_path] = (before, os.path.getsize(file_path))
+    return sizes
@@ -1,12 +1,14 @@
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
 import re
 import io
+import instrumentation
 
 # --- IMPORTANT ---
 # On Windows, you might need to set the path to the Tesseract executable.
 # Uncomment and update the line below if you get a "Tesseract not found" error.
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+@instrumentation.timed
 def process_receipt(image_file):
     """
     Uses OCR to extract amount, date, and potential vendor from a receipt image.
@@ -16,7 +18,7 @@ def process_receipt(image_file):
         A dictionary with extracted data: {'amount': float, 'date': str}.
     """
     try:
-        image = Image.open(io.BytesIO(image_file.getvalue()))
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_file.getvalue())))  # Phone photos read upright
         text = pytesseract.image_to_string(image)
 
         # Regex to find amounts (e.g., 12.34, 1,234.56, 1500)
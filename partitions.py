@@ -0,0 +1,146 @@
+import json
+import os
+
+from event_store import EventStore
+
+ID_BLOCK_SIZE = 1000  # Record ids are handed to partitions in blocks of this size
+
+class PartitionedStore:
+    """
+    Records split by event id into one EventStore (its own log and snapshot) per partition, so
+    reading or writing one fest never touches another fest's files. A small catalog lists the
+    partitions and which partition owns each block of ID_BLOCK_SIZE record ids, so a record id
+    alone can be routed to its partition. Writers must hold the caller's write lock.
+    """
+
+    def __init__(self, directory, collections, block_size=ID_BLOCK_SIZE, on_load=None):
+        self.directory = directory
+        self.collections = tuple(collections)
+        self.block_size = block_size
+        self.on_load = on_load  # on_load(partition_id, store), called once per partition per process
+        self.catalog_path = os.path.join(directory, 'catalog.json')
+        self._stores = {}
+        self._catalog = None
+        self._catalog_stamp = None
+
+    # --- Catalog ---
+    def exists(self):
+        return os.path.exists(self.catalog_path)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.catalog_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def catalog(self):
+        """The catalog, re-read only when another process has changed it."""
+        stamp = self._stamp()
+        if self._catalog is None or stamp != self._catalog_stamp:
+            try:
+                with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                    self._catalog = json.load(f)
+            except FileNotFoundError:
+                self._catalog = {"partitions": {},
+                                 "ids": {c: {"next_block": 1, "blocks": {}, "overrides": {}} for c in self.collections}}
+            self._catalog_stamp = stamp
+        return self._catalog
+
+    def _save_catalog(self, catalog):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self.catalog_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, indent=4)
+        os.replace(temp_path, self.catalog_path)
+        self._catalog, self._catalog_stamp = catalog, self._stamp()
+
+    def partitions(self):
+        return sorted(int(p) for p in self.catalog()['partitions'])
+
+    def _paths(self, partition_id):
+        base = os.path.join(self.directory, f"event_{partition_id}")
+        return f"{base}.jsonl", f"{base}.snapshot.json"
+
+    def store(self, partition_id, create=False):
+        """The partition's EventStore, or None if it does not exist and create is False."""
+        store = self._stores.get(partition_id)
+        if store is not None:
+            return store
+        if str(partition_id) not in self.catalog()['partitions']:
+            if not create:
+                return None
+            catalog = self.catalog()
+            catalog['partitions'][str(partition_id)] = {}
+            self._save_catalog(catalog)
+        store = EventStore(*self._paths(partition_id), self.collections)
+        self._stores[partition_id] = store
+        if self.on_load:
+            self.on_load(partition_id, store)
+        return store
+
+    # --- Id Routing ---
+    def _block_start(self, record_id):
+        return (record_id - 1) // self.block_size * self.block_size + 1
+
+    def _block_owner(self, collection, record_id):
+        return self.catalog()['ids'][collection]['blocks'].get(str(self._block_start(record_id)))
+
+    def partition_of(self, collection, record_id):
+        """The partition holding the record id, or None if no partition owns it."""
+        ids = self.catalog()['ids'][collection]
+        owner = ids['overrides'].get(str(record_id))
+        return owner if owner is not None else self._block_owner(collection, record_id)
+
+    def allocate_ids(self, collection, partition_id, count, used_up_to=0):
+        """
+        Returns `count` new ids for the partition, reserving a fresh block whenever its current one is
+        used up. Ids up to used_up_to are never handed out again, e.g. those of archived records that
+        the partition no longer holds.
+        """
+        last = max(self.store(partition_id, create=True).next_id(collection) - 1, used_up_to)
+        new_ids = []
+        while len(new_ids) < count:
+            candidate = last + 1
+            if (last < 1 or self._block_start(candidate) != self._block_start(last)
+                    or self._block_owner(collection, last) != partition_id):
+                catalog = self.catalog()
+                ids = catalog['ids'][collection]
+                candidate = ids['next_block']
+                ids['blocks'][str(candidate)] = partition_id
+                ids['next_block'] = candidate + self.block_size
+                self._save_catalog(catalog)
+            new_ids.append(candidate)
+            last = candidate
+        return new_ids
+
+    # --- Migration ---
+    def import_records(self, records_by_collection, partition_key):
+        """
+        Splits existing records into partitions by partition_key(record) and writes the catalog.
+        Blocks of existing ids shared by several partitions are routed per id through 'overrides'.
+        """
+        catalog = {"partitions": {}, "ids": {}}
+        by_partition = {}
+        for collection in self.collections:
+            records = records_by_collection.get(collection, [])
+            owners = {}
+            for record in records:
+                partition_id = partition_key(record)
+                by_partition.setdefault(partition_id, {c: [] for c in self.collections})[collection].append(record)
+                owners.setdefault(self._block_start(record['id']), {})[record['id']] = partition_id
+            ids = {"next_block": 1, "blocks": {}, "overrides": {}}
+            for block, members in owners.items():
+                partition_ids = set(members.values())
+                if len(partition_ids) == 1:
+                    ids['blocks'][str(block)] = partition_ids.pop()
+                else:
+                    ids['blocks'][str(block)] = None
+                    ids['overrides'].update({str(record_id): p for record_id, p in members.items()})
+                ids['next_block'] = max(ids['next_block'], block + self.block_size)
+            catalog['ids'][collection] = ids
+        os.makedirs(self.directory, exist_ok=True)
+        for partition_id, records in by_partition.items():
+            catalog['partitions'][str(partition_id)] = {}
+            EventStore(*self._paths(partition_id), self.collections).import_records(records)
+        self._save_catalog(catalog)  # Written last: its presence marks the migration as done
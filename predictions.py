@@ -4,7 +4,10 @@ import numpy as np
 import datetime
 import mock_api as api
 import plotly.graph_objects as go
+import chart_data
+import instrumentation
 
+@instrumentation.timed
 def generate_forecast_chart(current_event, current_expenses_df):
     """
     Generates a Plotly chart with current, predicted, and historical spending.
@@ -14,6 +17,13 @@ def generate_forecast_chart(current_event, current_expenses_df):
     historical_data_all = api.get_historical_data()
     historical_data = historical_data_all.get("TechFest 2023", [])
 
+    # Reruns with the same expenses, event and history reuse the figure built last time.
+    chart_columns = [c for c in ('submitted_at', 'status', 'amount') if c in current_expenses_df.columns]
+    cache_key = chart_data.fingerprint('forecast', current_event['id'], current_event['name'], current_event.get('start_date'), historical_data,
+                                       current_expenses_df[chart_columns])
+    return chart_data.cached_figure(cache_key, lambda: _build_forecast_chart(current_event, current_expenses_df, historical_data))
+
+def _build_forecast_chart(current_event, current_expenses_df, historical_data):
     if not historical_data:
         hist_df = pd.DataFrame(columns=['day', 'cumulative_spend'])
     else:
@@ -33,9 +43,9 @@ def generate_forecast_chart(current_event, current_expenses_df):
     event_start_date = datetime.datetime.fromisoformat(event_start_date_str).date()
 
     if not current_expenses_df.empty:
-        # ✅ FIXED: Compute day difference correctly
+        # ✅ FIXED: Compute day difference correctly (calendar days, vectorized over the datetime64 column)
         current_expenses_df['day'] = (
-            current_expenses_df['submitted_at'].dt.date.apply(lambda d: (d - event_start_date).days + 1)
+            (current_expenses_df['submitted_at'].dt.normalize() - pd.Timestamp(event_start_date)).dt.days + 1
         )
 
         approved_spend = current_expenses_df[current_expenses_df['status'].isin(['Approved', 'Reimbursed'])]
@@ -78,22 +88,22 @@ def generate_forecast_chart(current_event, current_expenses_df):
     fig = go.Figure()
 
     if not daily_cumulative.empty:
-        fig.add_trace(go.Scatter(
-            x=daily_cumulative['day'], y=daily_cumulative['cumulative_spend'],
+        fig.add_trace(chart_data.line_trace(
+            daily_cumulative['day'], daily_cumulative['cumulative_spend'],
             mode='lines+markers', name=f'{current_event["name"]} (Actual)',
             line=dict(color='royalblue', width=3)
         ))
 
     if not future_df.empty:
-        fig.add_trace(go.Scatter(
-            x=future_df['day'], y=future_df['predicted_spend'],
+        fig.add_trace(chart_data.line_trace(
+            future_df['day'], future_df['predicted_spend'],
             mode='lines', name='Forecast',
             line=dict(color='firebrick', width=2, dash='dash')
         ))
 
     if not hist_df.empty:
-        fig.add_trace(go.Scatter(
-            x=hist_df['day'], y=hist_df['cumulative_spend'],
+        fig.add_trace(chart_data.line_trace(
+            hist_df['day'], hist_df['cumulative_spend'],
             mode='lines', name='TechFest 2023 (Historical)',
             line=dict(color='grey', width=2, dash='dot')
         ))
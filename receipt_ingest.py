@@ -0,0 +1,56 @@
+import io
+import os
+
+from PIL import Image, ImageOps
+
+# --- Receipt Normalization Settings ---
+MAX_DIMENSION = 2000  # Longest side in pixels after normalizing; plenty for OCR and for viewing
+OUTPUT_FORMAT = 'WEBP'  # 'WEBP' or 'JPEG'
+QUALITY = 80
+KEEP_ORIGINALS = False  # Also keep each image as uploaded, under mock_api.UPLOAD_ORIGINALS_DIR
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+METADATA_KEYS = ('exif', 'icc_profile', 'xmp', 'XML:com.adobe.xmp')
+
+def _is_normalized(image, output_format, max_dimension):
+    return (image.format == output_format and max(image.size) <= max_dimension
+            and not any(image.info.get(key) for key in METADATA_KEYS))
+
+def _for_output(image, output_format):
+    """Converts to a mode the output format takes; JPEG has no alpha, so transparency goes onto white."""
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    if has_alpha and output_format == 'WEBP':
+        return image.convert('RGBA')
+    if has_alpha:
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, 'white')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image if image.mode in ('RGB', 'L') else image.convert('RGB')
+
+def normalize(data, output_format=OUTPUT_FORMAT, quality=QUALITY, max_dimension=MAX_DIMENSION):
+    """
+    Re-encodes image bytes upright (EXIF orientation applied), at most max_dimension pixels on the
+    longest side and without metadata. Returns (bytes, extension), or None for data that is not an
+    image Pillow can read (e.g. a PDF quote) or is already normalized.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        if _is_normalized(image, output_format, max_dimension):
+            return None
+        image.draft('RGB', (max_dimension, max_dimension))  # JPEGs decode straight at a reduced scale
+        image = ImageOps.exif_transpose(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    # Only pixels are written: without exif= or icc_profile= Pillow saves no metadata.
+    _for_output(image, output_format).save(out, output_format, quality=quality)
+    return out.getvalue(), EXTENSIONS[output_format]
+
+def ingest(file_name, data):
+    """The (file name, bytes) to store for an upload: the normalized image under its new extension, or the upload unchanged."""
+    normalized = normalize(data)
+    if normalized is None:
+        return file_name, data
+    payload, extension = normalized
+    return os.path.splitext(file_name)[0] + extension, payload
@@ -0,0 +1,111 @@
+import json
+import mmap
+import struct
+from contextlib import contextmanager
+
+# Layout: header, then each record as a 4-byte length and its compact JSON, then the offset table
+# (one 8-byte offset per record) and the record keys as one length-prefixed JSON list.
+MAGIC = b'FFRC'
+VERSION = 1
+KIND_LIST, KIND_DICT = 0, 1
+KEY_FIELDS = ('id', 'username')  # A list item's key is the first of these it has
+HEADER = struct.Struct('<4sBBxxIQ')  # magic, version, kind, record count, offset table position
+LENGTH = struct.Struct('<I')
+OFFSET = struct.Struct('<Q')
+
+def is_record_data(head):
+    """True if the bytes start like a record file."""
+    return bytes(head[:len(MAGIC)]) == MAGIC
+
+def record_key(value):
+    """The key a list item is found by: its first KEY_FIELDS value, or None."""
+    if isinstance(value, dict):
+        return next((value[field] for field in KEY_FIELDS if field in value), None)
+    return None
+
+def _json_key(key):
+    """The string json.dump writes for a dict key."""
+    return key if isinstance(key, str) else json.loads(json.dumps({key: 0})[1:-4])
+
+def _encode(value, default=None):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=default).encode('utf-8')
+
+def dumps(document, default=None):
+    """Encodes a list or dict of JSON values; reads back equal to a json.dump/json.load round trip."""
+    if isinstance(document, dict):
+        kind, keys, values = KIND_DICT, [_json_key(k) for k in document], list(document.values())
+    elif isinstance(document, (list, tuple)):
+        kind, values = KIND_LIST, list(document)
+        keys = [record_key(v) for v in values]
+    else:
+        raise TypeError(f"only lists and dicts can be stored as records, not {type(document).__name__}")
+    out = bytearray(HEADER.size)
+    offsets = []
+    for value in values:
+        payload = _encode(value, default)
+        offsets.append(len(out))
+        out += LENGTH.pack(len(payload)) + payload
+    table_offset = len(out)
+    out += struct.pack(f'<{len(offsets)}Q', *offsets)
+    key_bytes = _encode(keys, default)
+    out += LENGTH.pack(len(key_bytes)) + key_bytes
+    HEADER.pack_into(out, 0, MAGIC, VERSION, kind, len(values), table_offset)
+    return bytes(out)
+
+class RecordReader:
+    """Decodes records from a record-format buffer (bytes or an mmap) one at a time, on demand."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        try:
+            magic, version, self.kind, self.count, self._table = HEADER.unpack_from(buffer, 0)
+        except struct.error:
+            raise ValueError("not a record file: too short") from None
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a record file, or written by a newer version")
+        self._keys = None
+        self.bytes_read = 0  # Payload bytes decoded so far
+
+    def __len__(self):
+        return self.count
+
+    def _chunk(self, offset):
+        try:
+            (length,) = LENGTH.unpack_from(self._buffer, offset)
+        except struct.error:
+            raise ValueError("truncated record file") from None
+        data = self._buffer[offset + LENGTH.size:offset + LENGTH.size + length]
+        if len(data) != length:
+            raise ValueError("truncated record file")
+        self.bytes_read += length
+        return json.loads(data)
+
+    def record(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        (offset,) = OFFSET.unpack_from(self._buffer, self._table + index * OFFSET.size)
+        return self._chunk(offset)
+
+    def keys(self):
+        if self._keys is None:
+            self._keys = self._chunk(self._table + self.count * OFFSET.size)
+        return self._keys
+
+    def get(self, key, default=None):
+        """The record with this key (a dict entry, or a list item's id/username) without decoding the others."""
+        keys = self.keys()
+        return self.record(keys.index(key)) if key in keys else default
+
+    def document(self):
+        values = [self.record(i) for i in range(self.count)]
+        return dict(zip(self.keys(), values)) if self.kind == KIND_DICT else values
+
+def loads(data):
+    return RecordReader(data).document()
+
+@contextmanager
+def open_records(path):
+    """A RecordReader over the file, memory-mapped for the duration of the block."""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield RecordReader(buffer)
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import shutil
+import time
+
+import pandas as pd
+
+REPORT_CACHE_DIR = os.path.join('reports', 'cache')
+MAX_ARTIFACT_AGE_DAYS = 30
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+# Columns the reports are built from; a change to any of them changes the fingerprint.
+REPORT_COLUMNS = ['id', 'user', 'description', 'amount', 'category', 'transaction_id', 'reimbursed_at']
+
+def report_fingerprint(event_data, reimbursed_df, template_version):
+    """
+    Content hash of everything a report depends on: the reimbursed rows (ids plus a per-row
+    content hash standing in for a version), the event's name and budget, and the template version.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((template_version, event_data.get('id'), event_data['name'], event_data['budget'])).encode())
+    columns = [c for c in REPORT_COLUMNS if c in reimbursed_df.columns]
+    rows = reimbursed_df[columns].sort_values('id') if 'id' in columns else reimbursed_df[columns]
+    digest.update(repr(columns).encode())
+    digest.update(pd.util.hash_pandas_object(rows, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def _artifact_path(fingerprint, extension):
+    return os.path.join(REPORT_CACHE_DIR, f"{fingerprint}.{extension}")
+
+def lookup(fingerprint, extension):
+    """Returns the stored artifact's path, or None. A hit refreshes the artifact's age."""
+    path = _artifact_path(fingerprint, extension)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None  # Never stored, or evicted by another session
+    return path
+
+def link_file(source_path, path):
+    """Makes path a hard link to source_path, or a copy where links are not supported."""
+    try:
+        os.link(source_path, path)
+    except FileNotFoundError:
+        raise  # The source is gone; a copy would fail the same way
+    except OSError:
+        shutil.copyfile(source_path, path)
+
+def store_file(fingerprint, extension, source_path, keep_source=False):
+    """
+    Moves a finished artifact into the store and returns its new path. With keep_source the
+    artifact is linked in instead, so source_path stays valid whatever eviction removes.
+    """
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = _artifact_path(fingerprint, extension)
+    if keep_source:
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        link_file(source_path, temp_path)
+        source_path = temp_path
+    os.replace(source_path, path)
+    evict()
+    return path
+
+def store_bytes(fingerprint, extension, data):
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    temp_path = _artifact_path(fingerprint, extension) + f".{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    return store_file(fingerprint, extension, temp_path)
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def evict(max_age_days=MAX_ARTIFACT_AGE_DAYS, max_bytes=MAX_CACHE_BYTES):
+    """Deletes artifacts unused for max_age_days, then the least recently used until under max_bytes."""
+    if not os.path.isdir(REPORT_CACHE_DIR):
+        return
+    artifacts = []
+    for name in os.listdir(REPORT_CACHE_DIR):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(REPORT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # Evicted by another session meanwhile
+        artifacts.append((stat.st_mtime, stat.st_size, path))
+    cutoff = time.time() - max_age_days * 86400
+    total = 0
+    for mtime, size, path in sorted(artifacts, reverse=True):  # Most recently used first
+        if mtime < cutoff or total + size > max_bytes:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        else:
+            total += size
@@ -2,8 +2,16 @@
 
 from fpdf import FPDF
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import pandas as pd
 import json
+import mock_api as api
+import instrumentation
+
+# Bump when the layout or content of the PDF/JSON reports changes, so cached reports are rebuilt.
+REPORT_TEMPLATE_VERSION = 2
 
 class PDF(FPDF):
     # (No changes needed in the PDF class itself)
@@ -23,21 +31,41 @@ class PDF(FPDF):
         self.set_font('Arial', '', 12)
         self.multi_cell(0, 10, body)
         self.ln()
-    def add_table(self, df):
+    def add_table(self, df, col_widths=(40, 80, 40), font_size=10, progress=None):
         self.set_font('Arial', 'B', 10)
-        col_widths = [40, 80, 40]
         for i, col_name in enumerate(df.columns):
             self.cell(col_widths[i], 10, col_name, 1, 0, 'C')
         self.ln()
-        self.set_font('Arial', '', 10)
-        for index, row in df.iterrows():
-            for i, item in enumerate(row):
-                self.cell(col_widths[i], 10, str(item), 1)
-            self.ln()
-        self.ln(10)
+        self.set_font('Arial', '', font_size)
+        written = 0
+        for rows in iter_table_chunks(df):
+            for row in rows:
+                for i, item in enumerate(row):
+                    self.cell(col_widths[i], 10, item, 1)
+                self.ln()
+            written += len(rows)
+            if progress:
+                progress(written, len(df))
 
-def generate_report(event_data, reimbursed_df):
-    # This function now receives a DataFrame with ONLY reimbursed expenses
+# Rows are converted to text one chunk at a time, with vectorized column casts instead of per-row Series.
+REPORT_CHUNK_ROWS = 2000
+
+def iter_table_chunks(df, chunk_rows=REPORT_CHUNK_ROWS):
+    """Yields lists of row tuples (all values as str) for consecutive slices of df."""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield list(zip(*(chunk[col].astype(str).tolist() for col in chunk.columns)))
+
+def _ignore_progress(fraction, message):
+    pass
+
+@instrumentation.timed
+def build_report_pdf(event_data, reimbursed_df, progress=None):
+    """
+    Lays out the report. progress(fraction, message) is called as the transaction log is
+    written, so a background job can report how far it has got.
+    """
+    report = progress or _ignore_progress
     pdf = PDF()
     pdf.add_page()
     pdf.chapter_title('1. Executive Summary')
@@ -54,36 +82,43 @@ def generate_report(event_data, reimbursed_df):
     pdf.chapter_body(summary_text)
     
     pdf.chapter_title('2. Spending by Category')
-    category_spend = reimbursed_df.groupby('category')['amount'].sum().reset_index()
+    category_spend = reimbursed_df.groupby('category', observed=True)['amount'].sum().reset_index()
     pdf.add_table(category_spend)
+    pdf.ln(10)
+    report(0.05, "Summary written")
 
     pdf.chapter_title('3. Reimbursed Transaction Log')
     report_table_df = reimbursed_df[['user', 'description', 'amount', 'transaction_id']]
-    pdf.set_font('Arial', 'B', 10)
-    col_widths = [30, 80, 30, 40]
-    for i, col_name in enumerate(report_table_df.columns): 
-        pdf.cell(col_widths[i], 10, col_name, 1, 0, 'C')
-    pdf.ln()
-    pdf.set_font('Arial', '', 9)
-    for _, row in report_table_df.iterrows():
-        for i, item in enumerate(row): 
-            pdf.cell(col_widths[i], 10, str(item), 1)
-        pdf.ln()
-
-    return bytes(pdf.output())
+    pdf.add_table(report_table_df, col_widths=(30, 80, 30, 40), font_size=9,
+                  progress=lambda done, total: report(0.05 + 0.85 * done / max(total, 1), f"{done:,} of {total:,} transactions"))
+    return pdf
 
+@instrumentation.timed
+def generate_report(event_data, reimbursed_df):
+    # This function now receives a DataFrame with ONLY reimbursed expenses
+    return bytes(build_report_pdf(event_data, reimbursed_df).output())
+
+@instrumentation.timed
+def write_report(event_data, reimbursed_df, path, progress=None):
+    """Builds the PDF report straight into a file at `path` and returns the path."""
+    pdf = build_report_pdf(event_data, reimbursed_df, progress)
+    if progress:
+        progress(0.95, "Writing PDF file")
+    pdf.output(path)
+    return path
+
+@instrumentation.timed
 def generate_json_report(event_data, reimbursed_df):
     # This function now receives a DataFrame with ONLY reimbursed expenses
     total_spent = reimbursed_df['amount'].sum()
     
-    # Create a copy to safely modify
-    transactions_df = reimbursed_df.copy()
-    
-    # Convert datetime to string for JSON compatibility
-    transactions_df['reimbursed_at'] = transactions_df['reimbursed_at'].dt.strftime('%Y-%m-%dT%H:%M:%S')
-    transactions_list = transactions_df[
-        ['user', 'description', 'amount', 'category', 'transaction_id', 'reimbursed_at']
-    ].to_dict('records')
+    # Only the exported columns are copied; datetimes become strings for JSON compatibility.
+    # Full-ledger exports should use ledger_export, which streams instead of building one string.
+    transactions_list = reimbursed_df[
+        ['user', 'description', 'amount', 'category', 'transaction_id']
+    ].assign(
+        reimbursed_at=pd.to_datetime(reimbursed_df['reimbursed_at']).dt.strftime('%Y-%m-%dT%H:%M:%S')
+    ).to_dict('records')
 
     report_data = {
         "event_summary": {
@@ -93,8 +128,115 @@ def generate_json_report(event_data, reimbursed_df):
             "total_reimbursed": float(total_spent),
             "final_surplus_deficit": float(event_data['budget'] - total_spent)
         },
-        "spending_by_category": {k: float(v) for k, v in reimbursed_df.groupby('category')['amount'].sum().to_dict().items()},
+        "spending_by_category": {k: float(v) for k, v in reimbursed_df.groupby('category', observed=True)['amount'].sum().to_dict().items()},
         "reimbursed_transactions": transactions_list
     }
     
-    return json.dumps(report_data, indent=4)
\ No newline at end of file
+    return json.dumps(report_data, indent=4)
+
+# --- Consolidated Multi-Event Reports ---
+def summarize_event(event_data):
+    """
+    Totals and category breakdown for one event's reimbursed expenses. Runs in a worker
+    process, so it loads its own event's data and returns only plain, picklable values.
+    """
+    reimbursed_df = api.get_reimbursed_frame(event_data['id'])[['amount', 'category']]
+    total_spent = float(reimbursed_df['amount'].sum())
+    return {
+        "event_id": event_data['id'],
+        "event_name": event_data['name'],
+        "total_budget": event_data['budget'],
+        "total_reimbursed": total_spent,
+        "final_surplus_deficit": float(event_data['budget'] - total_spent),
+        "transaction_count": len(reimbursed_df),
+        "spending_by_category": {k: float(v) for k, v in reimbursed_df.groupby('category', observed=True)['amount'].sum().items()},
+    }
+
+def summarize_events(events, max_workers=None):
+    """Summarizes each event in its own process; wall-clock time tracks the slowest event, not the sum."""
+    if len(events) <= 1:
+        return [summarize_event(e) for e in events]
+    # Spawned, not forked: the app is multithreaded, and a forked child can inherit a lock held by another thread.
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(events), os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(summarize_event, events))
+
+def merge_summaries(summaries):
+    by_category = {}
+    for summary in summaries:
+        for category, amount in summary['spending_by_category'].items():
+            by_category[category] = by_category.get(category, 0.0) + amount
+    total_budget = sum(s['total_budget'] for s in summaries)
+    total_spent = sum(s['total_reimbursed'] for s in summaries)
+    return {
+        "event_count": len(summaries),
+        "total_budget": total_budget,
+        "total_reimbursed": total_spent,
+        "final_surplus_deficit": total_budget - total_spent,
+        "transaction_count": sum(s['transaction_count'] for s in summaries),
+        "spending_by_category": by_category,
+    }
+
+@instrumentation.timed
+def build_consolidated_pdf(summaries, progress=None):
+    report = progress or _ignore_progress
+    totals = merge_summaries(summaries)
+    pdf = PDF()
+    pdf.add_page()
+    pdf.chapter_title('1. Consolidated Summary')
+    pdf.chapter_body(
+        f"Events Covered: {totals['event_count']}\n"
+        f"Report Generated On: {datetime.now().strftime('%d %b %Y')}\n\n"
+        f"Total Budget Allotted: INR {totals['total_budget']:,.2f}\n"
+        f"Total Expenses Reimbursed: INR {totals['total_reimbursed']:,.2f}\n"
+        f"Reimbursed Transactions: {totals['transaction_count']:,}\n"
+        f"Final Surplus / Deficit: INR {totals['final_surplus_deficit']:,.2f}"
+    )
+    pdf.chapter_title('2. Per-Event Totals')
+    pdf.add_table(pd.DataFrame(
+        [(s['event_name'], f"{s['total_reimbursed']:,.2f}", f"{s['final_surplus_deficit']:,.2f}") for s in summaries],
+        columns=['event', 'reimbursed', 'surplus_deficit']))
+    pdf.ln(10)
+    pdf.chapter_title('3. Spending by Category (All Events)')
+    pdf.add_table(pd.DataFrame(list(totals['spending_by_category'].items()), columns=['category', 'amount']))
+    pdf.ln(10)
+    for i, summary in enumerate(summaries, start=1):
+        pdf.chapter_title(f"4.{i} {summary['event_name']}")
+        pdf.chapter_body(
+            f"Total Budget Allotted: INR {summary['total_budget']:,.2f}\n"
+            f"Total Expenses Reimbursed: INR {summary['total_reimbursed']:,.2f}\n"
+            f"Final Surplus / Deficit: INR {summary['final_surplus_deficit']:,.2f}"
+        )
+        if summary['spending_by_category']:
+            pdf.add_table(pd.DataFrame(list(summary['spending_by_category'].items()), columns=['category', 'amount']))
+            pdf.ln(10)
+        report(0.5 + 0.4 * i / len(summaries), f"{i} of {len(summaries)} event sections written")
+    return pdf
+
+def write_consolidated_report(events, path, progress=None):
+    report = progress or _ignore_progress
+    report(0.0, f"Summarizing {len(events)} events")
+    summaries = summarize_events(events)
+    report(0.5, "Writing PDF")
+    build_consolidated_pdf(summaries, progress).output(path)
+    return path
+
+@instrumentation.timed
+def generate_consolidated_json_report(summaries):
+    report_data = {
+        "consolidated_summary": {
+            "report_generated_on_utc": datetime.utcnow().isoformat(),
+            **merge_summaries(summaries),
+        },
+        "events": summaries,
+    }
+    return json.dumps(report_data, indent=4)
+
+def write_consolidated_json_report(events, path, progress=None):
+    report = progress or _ignore_progress
+    report(0.0, f"Summarizing {len(events)} events")
+    json_data = generate_consolidated_json_report(summarize_events(events))
+    report(0.9, "Writing JSON file")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json_data)
+    return path
@@ -0,0 +1,125 @@
+import datetime
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import report_cache
+import report_generator
+
+REPORTS_DIR = 'reports'
+MAX_CONCURRENT_REPORTS = 2
+JOB_FILE_MAX_AGE_HOURS = 24  # Finished jobs' files older than this are deleted when a new job starts
+_JOB_FILE_NAME = re.compile(r"[0-9a-f]{32}_")
+
+# Jobs outlive the Streamlit rerun (and session) that started them; the page polls get_job().
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REPORTS, thread_name_prefix="report")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        _jobs[job_id].update(fields)
+
+def _run(job_id, build, path, on_done):
+    _update(job_id, status="running", message="Starting")
+    try:
+        build(path, lambda fraction, message: _update(job_id, progress=min(fraction, 1.0), message=message))
+        path = on_done(path) if on_done else path
+    except Exception as e:
+        _update(job_id, status="failed", error=str(e), message="Failed", finished_at=datetime.datetime.now())
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    _update(job_id, status="done", path=path, progress=1.0, message="Done", finished_at=datetime.datetime.now())
+
+def _new_job(file_name, path, **fields):
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {"id": job_id, "status": "queued", "progress": 0.0, "message": "Queued", "path": path,
+                         "file_name": file_name, "error": None, "submitted_at": datetime.datetime.now(), **fields}
+    return job_id
+
+def _forget_old_jobs():
+    """Drops finished jobs older than JOB_FILE_MAX_AGE_HOURS, whose files are due for deletion too."""
+    cutoff = datetime.datetime.now() - datetime.timedelta(hours=JOB_FILE_MAX_AGE_HOURS)
+    with _jobs_lock:
+        for job_id in [job_id for job_id, job in _jobs.items() if job['status'] in ("done", "failed")
+                       and (job.get('finished_at') or job['submitted_at']) < cutoff]:
+            del _jobs[job_id]
+
+def _job_path(file_name):
+    """A new file under REPORTS_DIR owned by one job, clearing out old job files and jobs first."""
+    _forget_old_jobs()
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    cutoff = time.time() - JOB_FILE_MAX_AGE_HOURS * 3600
+    for name in os.listdir(REPORTS_DIR):
+        path = os.path.join(REPORTS_DIR, name)
+        try:
+            if _JOB_FILE_NAME.match(name) and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass  # Removed by another session meanwhile
+    return os.path.join(REPORTS_DIR, f"{uuid.uuid4().hex}_{file_name}")
+
+def submit_job(build, file_name, on_done=None):
+    """
+    Runs build(path, progress) on the report worker pool, where progress(fraction, message)
+    reports how far it has got. on_done(path), if given, may move the result and returns its
+    final path. Returns a job id for get_job().
+    """
+    path = _job_path(file_name)
+    job_id = _new_job(file_name, path)
+    _executor.submit(_run, job_id, build, path, on_done)
+    return job_id
+
+def submit_pdf_report(event_data, reimbursed_df):
+    """
+    Starts a PDF report job, or returns an already finished one if an identical report is cached.
+    Either way the job's file is its own (a link to the cached artifact), so cache eviction by
+    another session cannot delete it before the download.
+    """
+    file_name = f"{event_data['name']}_Financial_Report.pdf"
+    fingerprint = report_cache.report_fingerprint(event_data, reimbursed_df, report_generator.REPORT_TEMPLATE_VERSION)
+    cached_path = report_cache.lookup(fingerprint, 'pdf')
+    if cached_path:
+        path = _job_path(file_name)
+        try:
+            report_cache.link_file(cached_path, path)
+        except FileNotFoundError:
+            pass  # Evicted since the lookup: build it again
+        else:
+            return _new_job(file_name, path, status="done", progress=1.0, message="Served from cache", cached=True)
+    def on_done(path):
+        report_cache.store_file(fingerprint, 'pdf', path, keep_source=True)
+        return path
+    return submit_job(lambda path, progress: report_generator.write_report(event_data, reimbursed_df, path, progress),
+                      file_name, on_done=on_done)
+
+def submit_consolidated_report(events):
+    return submit_job(lambda path, progress: report_generator.write_consolidated_report(events, path, progress),
+                      "Consolidated_Financial_Report.pdf")
+
+def submit_consolidated_json_report(events):
+    return submit_job(lambda path, progress: report_generator.write_consolidated_json_report(events, path, progress),
+                      "Consolidated_Financial_Report.json")
+
+def generate_json_report_cached(event_data, reimbursed_df):
+    """Returns the JSON report, from the artifact store when the reimbursed set is unchanged."""
+    fingerprint = report_cache.report_fingerprint(event_data, reimbursed_df, report_generator.REPORT_TEMPLATE_VERSION)
+    cached_path = report_cache.lookup(fingerprint, 'json')
+    if cached_path:
+        try:
+            return report_cache.read_bytes(cached_path).decode('utf-8')
+        except FileNotFoundError:
+            pass  # Evicted since the lookup: build it again
+    json_data = report_generator.generate_json_report(event_data, reimbursed_df)
+    report_cache.store_bytes(fingerprint, 'json', json_data.encode('utf-8'))
+    return json_data
+
+def get_job(job_id):
+    """Returns a snapshot of the job's state, or None if the id is unknown (e.g. after a restart)."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
@@ -0,0 +1,102 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MAX_PREFIX_TERMS = 64  # Cap on vocabulary terms a single prefix may expand to
+PREFIX_MATCH_WEIGHT = 0.5  # Prefix hits count for less than exact token hits
+
+def tokenize(text):
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+class SearchIndex:
+    """
+    In-memory inverted index with prefix matching.
+    Documents are keyed by record id and made of weighted text fields, e.g.
+    [("printing banner", 3), ("receipt ocr text", 1)]. Text can be appended to an
+    existing document (new comments) without re-indexing the whole record.
+    Safe to search from several threads while another one updates it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # token -> {doc_id: weighted term frequency}
+        self._doc_terms = defaultdict(set)  # doc_id -> tokens, used when a document is removed
+        self._vocab = []  # sorted tokens, for prefix lookups via bisect
+        self.source_stamp = None  # Set by the owner: the state of the source data the index reflects
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add_text(self, doc_id, text, weight=1):
+        with self._lock:
+            for token in tokenize(text):
+                postings = self._postings[token]
+                if not postings:
+                    bisect.insort(self._vocab, token)
+                postings[doc_id] = postings.get(doc_id, 0) + weight
+                self._doc_terms[doc_id].add(token)
+
+    def add_document(self, doc_id, fields):
+        with self._lock:
+            self.remove_document(doc_id)
+            for text, weight in fields:
+                self.add_text(doc_id, text, weight)
+
+    def remove_document(self, doc_id):
+        with self._lock:
+            for token in self._doc_terms.pop(doc_id, ()):
+                postings = self._postings[token]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+                    position = bisect.bisect_left(self._vocab, token)
+                    if position < len(self._vocab) and self._vocab[position] == token:
+                        self._vocab.pop(position)
+
+    def _expand(self, token):
+        """Returns [(term, weight multiplier)] for an exact match plus prefix completions."""
+        terms = [(token, 1.0)] if token in self._postings else []
+        start = bisect.bisect_right(self._vocab, token)
+        for term in self._vocab[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            terms.append((term, PREFIX_MATCH_WEIGHT))
+        return terms
+
+    def search(self, query, limit=None):
+        """
+        Returns document ids matching every query token (as a word or word prefix),
+        best matches first (newest first on ties). Scores are weighted term frequency
+        times inverse document frequency.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            return self._search(tokens, limit)
+
+    def _search(self, tokens, limit):
+        total_docs = max(len(self._doc_terms), 1)
+        scores = None
+        for token in dict.fromkeys(tokens):
+            token_scores = {}
+            for term, multiplier in self._expand(token):
+                postings = self._postings[term]
+                idf = math.log(1 + total_docs / len(postings))
+                for doc_id, frequency in postings.items():
+                    score = frequency * idf * multiplier
+                    if score > token_scores.get(doc_id, 0):
+                        token_scores[doc_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items() if doc_id in token_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], -doc_id))
+        return ranked[:limit] if limit else ranked
@@ -0,0 +1,33 @@
+import importlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+    def __init__(self, name, data=b'%PDF-1.4 receipt'):
+        super().__init__(data)
+        self.name = name
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """mock_api over a fresh database in a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    import mock_api
+    mock_api = importlib.reload(mock_api)  # The stores cache files by relative path
+    mock_api.setup_database()
+    return mock_api
+
+@pytest.fixture
+def users(api):
+    return {u['username']: u for u in api.load_data(api.USERS_FILE)}
+
+@pytest.fixture
+def add_expense(api, users):
+    def add(description='banner print job', amount=100.0, event_id=1):
+        return api.add_expense(event_id, users['student1'], amount, 'Printing', description, Upload('receipt.pdf'))
+    return add
@@ -0,0 +1,23 @@
+def test_archived_ids_are_not_reused(api, users, add_expense):
+    add_expense('banner print job')
+    second = add_expense('stage lights')
+    api.reject_expense(second['id'], users['team_lead'], 'Duplicate of #1')
+    assert api.archive_settled(-1) == {1: {'expenses': 1}}
+
+    third = add_expense('sound check')
+    assert third['id'] > second['id']
+    expenses = {e['id']: e for e in api.get_expenses(1, include_archived=True)}
+    assert expenses[second['id']]['description'] == 'stage lights'
+    assert expenses[third['id']]['description'] == 'sound check'
+    assert api.get_comments("expenses", [third['id']])[third['id']] == []
+
+def test_archived_records_stay_searchable(api, users, add_expense):
+    expense = add_expense('banner print job')
+    api.add_comment_to_expense(expense['id'], users['team_lead'], 'blurry receipt')
+    api.reject_expense(expense['id'], users['team_lead'], 'Duplicate')
+    assert api.search_expenses('banner', event_id=1) == [expense['id']]  # Index built before archiving
+    api.archive_settled(-1)
+    assert api.search_expenses('banner', event_id=1) == [expense['id']]
+    api._search_indexes.clear()  # And rebuilt after
+    assert api.search_expenses('blurry', event_id=1) == [expense['id']]
+    assert api.search_expenses('banner') == [expense['id']]
@@ -0,0 +1,98 @@
+import json
+import sys
+import threading
+
+from activity_log import ActivityLogIndex
+from comment_store import CommentStore
+from event_store import EventStore
+from search_index import SearchIndex
+
+READER_THREADS = 8
+
+def race(read, write, rounds, reads_per_round=3):
+    """
+    Each round runs write(round) while READER_THREADS threads, released at once, call read() a few
+    times, then releases them all again to read once more after the write, so they overlap the
+    writer and each other. Returns the readers' errors.
+    """
+    errors = []
+    barrier = threading.Barrier(READER_THREADS + 1)
+
+    def read_logged():
+        try:
+            read()
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        for _ in range(rounds):
+            barrier.wait()
+            for _ in range(reads_per_round):
+                read_logged()
+            barrier.wait()
+            read_logged()
+
+    threads = [threading.Thread(target=reader) for _ in range(READER_THREADS)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)  # Switch threads often, so unguarded sections interleave
+    try:
+        for thread in threads:
+            thread.start()
+        for i in range(rounds):
+            barrier.wait()
+            write(i)
+            barrier.wait()
+    finally:
+        sys.setswitchinterval(interval)
+        for thread in threads:
+            thread.join()
+    read()  # Catch up on the last round
+    return errors
+
+def test_event_store_refreshes_from_many_threads(tmp_path):
+    paths = (str(tmp_path / 'events.jsonl'), str(tmp_path / 'events.snapshot.json'))
+    shared = EventStore(*paths, ['expenses'])
+    other_process = EventStore(*paths, ['expenses'], snapshot_every=10 ** 9)  # Its own offsets, like another process
+
+    def write(i):
+        other_process.append([EventStore.create_event('expenses', {'id': i * 100 + n + 1, 'description': 'x' * 200})
+                              for n in range(100)])
+
+    assert race(lambda: shared.get('expenses', 1), write, 20) == []
+    assert [r['id'] for r in shared.records('expenses')] == list(range(1, 2001))
+
+def test_activity_log_refreshes_from_many_threads(tmp_path):
+    path = str(tmp_path / 'activity_log.jsonl')
+    index = ActivityLogIndex(path)
+
+    def write(i):
+        with open(path, 'a', encoding='utf-8') as f:  # As another process appends
+            f.writelines(json.dumps({'timestamp': '2024-04-01T10:00:00', 'user': f"user{n % 5}", 'action': f"action {i * 100 + n}"}) + '\n'
+                         for n in range(100))
+
+    assert race(lambda: index.query(limit=5), write, 20) == []
+    actions = [entry['action'] for entry in index.newest_first()]
+    assert actions == [f"action {n}" for n in reversed(range(2000))]
+    assert sum(len(index.query(user=f"user{n}", limit=2000)['entries']) for n in range(5)) == 2000
+
+def test_comment_store_refreshes_from_many_threads(tmp_path):
+    path = str(tmp_path / 'event_1.comments.jsonl')
+    shared, other_process = CommentStore(path), CommentStore(path)
+
+    def write(i):
+        other_process.add('expenses', {i * 10 + n + 1: [{'text': 'x' * 200}] * 10 for n in range(10)})
+
+    assert race(lambda: shared.threads('expenses'), write, 20) == []
+    threads = shared.threads('expenses')
+    assert sorted(threads) == list(range(1, 201))
+    assert all(len(thread) == 10 for thread in threads.values())
+
+def test_search_index_searches_while_updated():
+    index = SearchIndex()
+
+    def write(i):
+        for doc_id in range(i * 500 + 1, i * 500 + 501):
+            index.add_document(doc_id, [(f"banner print job {doc_id}", 3)])
+
+    assert race(lambda: index.search('banner'), write, 10) == []
+    assert len(index.search('banner')) == 5000
@@ -0,0 +1,48 @@
+import base64
+import json
+
+import pytest
+
+@pytest.fixture
+def http_api(api):
+    import http_api
+    return http_api
+
+def request(http_api, method, target, username, body=None):
+    credentials = base64.b64encode(f"{username}:pw".encode()).decode()
+    raw_body = json.dumps(body).encode() if body is not None else b''
+    return http_api._run_request(method, target, {'authorization': f"Basic {credentials}"}, raw_body)
+
+def test_non_object_items_are_rejected(http_api):
+    status, payload = request(http_api, "POST", "/expenses", "student1", {"event_id": 1, "items": [5]})
+    assert status == 400
+    assert "'items'" in payload['error']
+
+def test_unexpected_errors_are_not_leaked(http_api, monkeypatch):
+    monkeypatch.setattr(http_api.api, "get_events_for_user", lambda user: 1 / 0)
+    assert request(http_api, "GET", "/events", "student1") == (500, {"error": "Internal server error"})
+
+def test_pending_queue_is_paginated(http_api, add_expense):
+    for i in range(5):
+        add_expense(f"banner print job {i}")
+    status, payload = request(http_api, "GET", "/expenses/pending?event_id=1&offset=1&limit=2", "team_lead")
+    assert status == 200
+    assert [e['id'] for e in payload['items']] == [2, 3]
+    assert (payload['total'], payload['next_offset']) == (5, 3)
+
+def test_only_team_leads_decide_advances(http_api, api, users):
+    advance = api.add_advance_request(users['student1'], 1, 'Sound Co', 'speakers', 500.0, None)
+    for path in ("/advances/approve", "/advances/reject"):
+        status, payload = request(http_api, "POST", path, "treasurer", {"ids": [advance['id']]})
+        assert status == 403
+    assert request(http_api, "POST", "/advances/approve", "team_lead", {"ids": [advance['id']]})[0] == 200
+
+def test_students_comment_only_on_their_own_records(http_api, api, users, add_expense):
+    expense = add_expense('banner print job')
+    advance = api.add_advance_request(users['student1'], 1, 'Sound Co', 'speakers', 500.0, None)
+    for path in (f"/expenses/{expense['id']}/comments", f"/advances/{advance['id']}/comments"):
+        assert request(http_api, "POST", path, "student2", {"text": "mine now"})[0] == 404
+        assert request(http_api, "POST", path, "student1", {"text": "receipt attached"})[0] == 201
+        assert request(http_api, "POST", path, "team_lead", {"text": "looks fine"})[0] == 201
+    threads = api.get_comments("expenses", [expense['id']])
+    assert [c['text'] for c in threads[expense['id']]] == ["receipt attached", "looks fine"]
@@ -0,0 +1,24 @@
+import csv
+import io
+
+import ledger_export
+
+def reimburse(api, users, expense):
+    api.approve_expense_step(expense['id'], users['team_lead'])
+    api.approve_expense_step(expense['id'], users['treasurer'])
+    assert api.reimburse_expense(expense['id'], users['treasurer'], f"TXN{expense['id']}")
+
+def test_export_covers_hot_and_archived_expenses_in_id_order(api, users, add_expense):
+    expenses = [add_expense(f"banner print job {i}", amount=100.0 + i) for i in range(4)]
+    for expense in expenses[:2]:
+        reimburse(api, users, expense)
+    api.archive_settled(-1)
+    reimburse(api, users, expenses[3])
+    api._archive._segment_cache.clear()
+
+    out = io.BytesIO()
+    assert ledger_export.export_ledger(out, 'csv', event_id=1) == 3
+    rows = list(csv.DictReader(io.StringIO(out.getvalue().decode('utf-8'))))
+    assert [int(r['id']) for r in rows] == [expenses[0]['id'], expenses[1]['id'], expenses[3]['id']]
+    assert [r['transaction_id'] for r in rows] == [f"TXN{e['id']}" for e in (expenses[0], expenses[1], expenses[3])]
+    assert not api._archive._segment_cache  # Streamed, not loaded
@@ -0,0 +1,66 @@
+import datetime
+import json
+import time
+
+import pandas as pd
+
+import report_cache
+import report_generator
+import report_jobs
+
+EVENT = {"id": 1, "name": "TechFest 2024", "budget": 50000}
+
+def reimbursed_frame():
+    return pd.DataFrame([{"id": 1, "user": "student1", "description": "banner", "amount": 100.0, "category": "Printing",
+                          "transaction_id": "TXN1", "reimbursed_at": pd.Timestamp("2024-04-02")}])
+
+def wait_for(job_id):
+    for _ in range(200):
+        job = report_jobs.get_job(job_id)
+        if job['status'] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("report job did not finish")
+
+def test_cached_report_survives_eviction(api):
+    df = reimbursed_frame()
+    fingerprint = report_cache.report_fingerprint(EVENT, df, report_generator.REPORT_TEMPLATE_VERSION)
+    report_cache.store_bytes(fingerprint, 'pdf', b'%PDF-1.4 cached report')
+
+    job = report_jobs.get_job(report_jobs.submit_pdf_report(EVENT, df))
+    assert job['cached'] and job['status'] == "done"
+    report_cache.evict(max_bytes=0)
+    assert report_cache.lookup(fingerprint, 'pdf') is None
+    with open(job['path'], 'rb') as f:
+        assert f.read() == b'%PDF-1.4 cached report'
+
+def test_evicted_artifact_is_rebuilt(api, monkeypatch):
+    monkeypatch.setattr(report_cache, "lookup", lambda fingerprint, extension: "reports/cache/evicted.pdf")
+    monkeypatch.setattr(report_generator, "write_report", lambda event, df, path, progress: open(path, 'wb').write(b'%PDF new'))
+    job = wait_for(report_jobs.submit_pdf_report(EVENT, reimbursed_frame()))
+    assert job['status'] == "done" and not job.get('cached')
+    report_cache.evict(max_bytes=0)
+    with open(job['path'], 'rb') as f:
+        assert f.read() == b'%PDF new'
+
+def test_consolidated_json_report_runs_as_a_job(api):
+    events = [EVENT, {**EVENT, "id": 2, "name": "CultFest 2024"}]  # More than one, so they are summarized in spawned workers
+    job = wait_for(report_jobs.submit_consolidated_json_report(events))
+    assert job['status'] == "done", job['error']
+    with open(job['path'], encoding='utf-8') as f:
+        report = json.load(f)
+    assert [e['event_id'] for e in report['events']] == [e['id'] for e in events]
+
+def test_evicted_json_artifact_is_rebuilt(api, monkeypatch):
+    assert report_cache.lookup("missing", 'json') is None
+    monkeypatch.setattr(report_cache, "lookup", lambda fingerprint, extension: "reports/cache/evicted.json")
+    report = json.loads(report_jobs.generate_json_report_cached(EVENT, reimbursed_frame()))
+    assert report['event_summary']['event_name'] == EVENT['name']
+
+def test_old_finished_jobs_are_forgotten(api, monkeypatch):
+    monkeypatch.setattr(report_generator, "write_report", lambda event, df, path, progress: open(path, 'wb').write(b'%PDF new'))
+    old_job = wait_for(report_jobs.submit_pdf_report(EVENT, reimbursed_frame()))['id']
+    report_jobs._update(old_job, finished_at=datetime.datetime.now() - datetime.timedelta(hours=report_jobs.JOB_FILE_MAX_AGE_HOURS + 1))
+    new_job = report_jobs.submit_job(lambda path, progress: open(path, 'wb').close(), "new.pdf")
+    assert report_jobs.get_job(old_job) is None
+    assert report_jobs.get_job(new_job) is not None
@@ -0,0 +1,26 @@
+from comment_store import CommentStore
+from event_store import EventStore
+
+def test_index_catches_up_with_other_processes(api, users, add_expense):
+    expense = add_expense('banner print job')
+    assert api.search_expenses('banner', event_id=1) == [expense['id']]
+    index = api._search_indexes[(1, 'expenses')]
+
+    store = api._partitions.store(1)  # Another process's view of the same files
+    other_store = EventStore(store.base_log_path, store.snapshot_path, api.COLLECTIONS)
+    other_store.append([EventStore.update_event('expenses', expense['id'], {'description': 'stage lights'},
+                                                timestamp='2024-04-01T10:00:00', user='Team Lead', action='edited')])
+    CommentStore(api._comments(1).file_path).add('expenses', {expense['id']: [{'user': 'Team Lead', 'text': 'blurry receipt'}]})
+
+    assert api.search_expenses('stage', event_id=1) == [expense['id']]
+    assert api.search_expenses('banner', event_id=1) == []
+    assert api.search_expenses('blurry', event_id=1) == [expense['id']]
+    assert api._search_indexes[(1, 'expenses')] is index  # Caught up, not rebuilt
+
+def test_index_is_rebuilt_after_compaction(api, add_expense):
+    expense = add_expense('banner print job')
+    assert api.search_expenses('banner', event_id=1) == [expense['id']]
+    index = api._search_indexes[(1, 'expenses')]
+    api.compact_storage()
+    assert api.search_expenses('banner', event_id=1) == [expense['id']]
+    assert api._search_indexes[(1, 'expenses')] is not index
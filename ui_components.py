@@ -21,7 +21,7 @@ def status_chip(status):
             f"padding:6px 18px;border-radius:999px;font-weight:700;"
             f"font-size:1.01em;letter-spacing:0.01em;margin-left:8px;'>{status}</span>")
 
-def render_expense_card(expense, user, on_update):
+def render_expense_card(expense, user, on_update, comments=None):
     import datetime
     submitter = api.get_user_details(expense['user'])
     status = expense.get('status', 'Unknown')
@@ -61,10 +61,7 @@ def render_expense_card(expense, user, on_update):
                         if not comment.strip():
                             st.warning("You must provide a reason to reject.")
                         else:
-                            api.add_comment_to_expense(expense['id'], user, comment.strip())
-                            expense['status'] = "Rejected"
-                            api.save_data(api.EXPENSES_FILE, api.load_data(api.EXPENSES_FILE))
-                            api.log_activity(user['name'], f"rejected expense #{expense['id']}")
+                            api.reject_expense(expense['id'], user, comment.strip())
                             st.warning("Rejected.")
                             on_update()
 
@@ -92,13 +89,15 @@ def render_expense_card(expense, user, on_update):
         with st.expander("💬 Comments", expanded=False):
             comment_input = st.text_input(f"Add a comment for expense #{expense['id']}", key=f"cmt_exp_{expense['id']}")
             if st.button("Post Comment", key=f"btn_cmt_exp_{expense['id']}"):
-                if comment_input.strip():
-                    api.add_comment_to_expense(expense['id'], user, comment_input.strip())
+                if not comment_input.strip():
+                    st.warning("Comment cannot be empty.")
+                elif api.add_comment_to_expense(expense['id'], user, comment_input.strip()):
                     st.success("Comment added.")
                     on_update()
                 else:
-                    st.warning("Comment cannot be empty.")
-            comments = expense.get("comments", [])
+                    st.error("This expense is archived and read-only; comments can no longer be added.")
+            if comments is None:
+                comments = api.get_comments("expenses", [expense['id']])[expense['id']]
             if comments:
                 for comment in comments:
                     ts = comment['timestamp'].strftime('%d-%b %I:%M %p') if isinstance(comment['timestamp'], datetime.datetime) else str(comment['timestamp'])
@@ -107,7 +106,7 @@ def render_expense_card(expense, user, on_update):
                 st.caption("No comments yet. Add one above!")
 
 
-def render_advance_card(advance, show_actions=False, user=None, on_update=None):
+def render_advance_card(advance, show_actions=False, user=None, on_update=None, comments=None):
     import datetime
     status = advance.get('status', 'Unknown')
     if on_update is None:
@@ -151,20 +150,14 @@ def render_advance_card(advance, show_actions=False, user=None, on_update=None):
                         comment = st.text_input("Reason for rejection (required)", key=f"reject_comment_{advance['id']}")
                         msg = ""
                         if approve_btn:
-                            advance['status'] = "Approved by Team Lead"
-                            advance['approved_by'] = user['name']
-                            api.save_data("db_advances.json", api.load_data("db_advances.json"))
-                            api.log_activity(user['name'], f"approved advance #{advance['id']}")
+                            api.approve_advance(advance['id'], user)
                             st.success("Approved.")
                             on_update()
                         elif reject_btn:
                             if not comment.strip():
                                 st.warning("You must provide a reason to reject.")
                             else:
-                                advance['status'] = "Rejected"
-                                api.add_comment_to_advance(advance['id'], user, comment.strip())
-                                api.save_data("db_advances.json", api.load_data("db_advances.json"))
-                                api.log_activity(user['name'], f"rejected advance #{advance['id']}")
+                                api.reject_advance(advance['id'], user, comment.strip())
                                 st.warning("Rejected.")
                                 on_update()
                 elif user['role'] == "treasurer" and status == "Approved by Team Lead":
@@ -174,12 +167,7 @@ def render_advance_card(advance, show_actions=False, user=None, on_update=None):
                         if not txn_id.strip():
                             st.warning("Please provide a transaction ID.")
                         else:
-                            advance['status'] = "Paid"
-                            advance['paid_txn_id'] = txn_id.strip()
-                            advance['paid_time'] = datetime.datetime.now().isoformat()
-                            advance['paid_by'] = user['name']
-                            api.save_data("db_advances.json", api.load_data("db_advances.json"))
-                            api.log_activity(user['name'], f"marked advance #{advance['id']} as paid (txn: {txn_id})")
+                            api.pay_advance(advance['id'], user, txn_id.strip())
                             st.success("Marked as Paid.")
                             on_update()
 
@@ -190,15 +178,17 @@ def render_advance_card(advance, show_actions=False, user=None, on_update=None):
                 if st.button("Post Comment", key=f"btn_cmt_adv_{advance['id']}"):
                     if user is None:
                         st.error("⚠️ Logged-in user not found. Cannot add comment.")
-                    elif comment_input.strip():
-                        api.add_comment_to_advance(advance['id'], user, comment_input.strip())
+                    elif not comment_input.strip():
+                        st.warning("Comment cannot be empty.")
+                    elif api.add_comment_to_advance(advance['id'], user, comment_input.strip()):
                         st.success("Comment added.")
                         on_update()
                     else:
-                        st.warning("Comment cannot be empty.")
+                        st.error("This advance is archived and read-only; comments can no longer be added.")
 
-                comments = advance.get("comments", [])
-                if isinstance(comments, list) and comments:
+                if comments is None:
+                    comments = api.get_comments("advances", [advance['id']])[advance['id']]
+                if comments:
                     for comment in comments:
                         ts = comment['timestamp'].strftime('%d-%b %I:%M %p') if isinstance(comment['timestamp'], datetime.datetime) else str(comment['timestamp'])
                         st.caption(f"- {comment['user']} ({comment['role']}, {ts}): {comment['text']}")